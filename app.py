@@ -1,8 +1,31 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import (Flask, Response, render_template, request, jsonify, session, redirect,
+                   stream_with_context, url_for)
 from flask_cors import CORS
-from datetime import datetime, timedelta
-import sqlite3
+import click
+from datetime import datetime
+import csv
+import io
+import itertools
+import json
 import os
+import sqlite3
+import time
+
+import change_log
+import db
+import employees
+import encoding
+import events
+import metrics
+import onboarding_templates
+import migrations
+import pagination
+import progress
+import reminders
+import search
+from classification import AUTO_STATUSES, auto_status_filter, auto_status_sql, today_sql
+from db import ONBOARDING_COMPLETE, get_db
+from response_cache import cached_response, get_cache
 
 app = Flask(__name__)
 app.secret_key = 'employee-onboarding-secret-key-2023'
@@ -12,72 +35,18 @@ CORS(
     supports_credentials=True,
     origins=["http://127.0.0.1:5000", "http://localhost:5000"]
 )
+db.init_app(app)
+encoding.init_app(app)
+metrics.init_app(app)
 
 
-# Database initialization
 # Database initialization
 def init_db():
     with app.app_context():
         conn = get_db()
+        with metrics.untracked():
+            migrations.migrate(conn)
         cursor = conn.cursor()
-        
-        # Create users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                role TEXT NOT NULL
-            )
-        ''')
-        
-        # Create employees table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS employees (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                emp_id TEXT UNIQUE NOT NULL,
-                first_name TEXT NOT NULL,
-                last_name TEXT NOT NULL,
-                email TEXT NOT NULL,
-                position TEXT NOT NULL,
-                department TEXT NOT NULL,
-                start_date TEXT NOT NULL,
-                forms_completed INTEGER DEFAULT 0,
-                total_forms INTEGER DEFAULT 1,
-                videos_completed INTEGER DEFAULT 0,
-                total_videos INTEGER DEFAULT 1,
-                documents_uploaded INTEGER DEFAULT 0,
-                total_documents INTEGER DEFAULT 1
-            )
-        ''')
-        
-        # Create tasks table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                emp_id TEXT NOT NULL,
-                emp_name TEXT NOT NULL,
-                task_name TEXT NOT NULL,
-                category TEXT NOT NULL,
-                assigned_by TEXT NOT NULL,
-                assigned_date TEXT NOT NULL,
-                due_date TEXT NOT NULL,
-                status TEXT DEFAULT 'Assigned',
-                FOREIGN KEY (emp_id) REFERENCES employees (emp_id) ON DELETE CASCADE
-            )
-        ''')
-        
-        # Create training_videos table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS training_videos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                duration TEXT NOT NULL,
-                category TEXT NOT NULL,
-                upload_date TEXT NOT NULL,
-                url TEXT DEFAULT ''   -- added url column
-            )
-        ''')
 
         # ✅ Insert default users only if empty
         cursor.execute("SELECT COUNT(*) FROM users")
@@ -92,13 +61,6 @@ def init_db():
 
         conn.commit()
 
-# Database connection helper
-def get_db():
-    conn = sqlite3.connect(app.config['DATABASE'])
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")  
-    return conn
-
 # Authentication decorator
 def login_required(f):
     def decorated_function(*args, **kwargs):
@@ -123,7 +85,6 @@ def login():
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM users WHERE username = ? AND password = ?", (username, password))
         user = cursor.fetchone()
-        conn.close()
         
         if user:
             session['username'] = user['username']
@@ -146,17 +107,79 @@ def admin_dashboard():
     
     return render_template('admin_dashboard.html')
 
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/jsonl', 'application/json-lines')
+app.config.setdefault('BULK_IMPORT_MAX_ROWS', 200000)
+
+# Paginated list helpers
+app.config.setdefault('API_PAGE_SIZE', 100)
+app.config.setdefault('API_MAX_PAGE_SIZE', 1000)
+app.config.setdefault('API_UNPAGINATED_CAP', 5000)
+
+def parse_list_page(args=None):
+    return pagination.parse_page(
+        request.args if args is None else args,
+        default_limit=app.config['API_PAGE_SIZE'],
+        max_limit=app.config['API_MAX_PAGE_SIZE'],
+        unpaginated_cap=app.config['API_UNPAGINATED_CAP'],
+    )
+
+def parse_auto_status(args=None):
+    """Read a comma-separated ``auto_status`` filter from the query string."""
+    raw = (request.args if args is None else args).get('auto_status')
+    if not raw:
+        return None
+    wanted = raw.split(',')
+    unknown = [status for status in wanted if status not in AUTO_STATUSES]
+    if unknown:
+        raise pagination.ListArgError(f"Unknown auto_status: {', '.join(unknown)}")
+    return wanted
+
+def list_response(items, next_cursor, page):
+    # Paginated calls get an envelope; legacy unpaginated calls keep the
+    # bare list and learn about truncation from a header.
+    if page.paginated:
+        return jsonify({'items': items, 'next_cursor': next_cursor})
+    response = jsonify(items)
+    if next_cursor:
+        response.headers['X-Truncated'] = 'true'
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
 # API Routes for Employees
 @app.route('/api/employees', methods=['GET'])
 @login_required
+@cached_response('employees')
 def get_employees():
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM employees")
-    employees = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    try:
+        page = parse_list_page()
+        rows, next_cursor = query_employees(get_db(), request.args, page)
+    except pagination.ListArgError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify(employees)
+    return list_response(rows, next_cursor, page)
+
+def query_employees(conn, args, page):
+    """One page of employees filtered by ``args``; raises ListArgError."""
+    fields = pagination.parse_fields(args, pagination.table_columns(conn, 'employees'))
+    where, params = [], []
+    if args.get('department'):
+        where.append("department = ?")
+        params.append(args['department'])
+    status = args.get('status')
+    if status == 'completed':
+        where.append(ONBOARDING_COMPLETE)
+    elif status == 'in_progress':
+        where.append(f"NOT {ONBOARDING_COMPLETE}")
+    elif status:
+        raise pagination.ListArgError("'status' must be 'completed' or 'in_progress'")
+    for arg, op in (('start_from', '>='), ('start_to', '<=')):
+        value = pagination.parse_date(args, arg)
+        if value:
+            where.append(f"start_date {op} ?")
+            params.append(value)
+
+    rows, next_cursor = pagination.fetch_page(conn, 'employees', fields or ['*'], where, params, page)
+    return [pagination.project(dict(row), fields) for row in rows], next_cursor
 
 # @app.route('/api/employees/<emp_id>', methods=['GET'])
 # @login_required
@@ -189,29 +212,63 @@ def get_employees():
 def add_employee():
     data = request.get_json()
     
-    # Generate a new employee ID
+    # Generate a new employee ID from the sequence table
     conn = get_db()
     cursor = conn.cursor()
-    cursor.execute("SELECT MAX(CAST(SUBSTR(emp_id, 4) AS INTEGER)) FROM employees")
-    max_id = cursor.fetchone()[0] or 0
-    new_emp_id = f"EMP{str(max_id + 1).zfill(3)}"
+    new_emp_id = employees.format_emp_id(employees.reserve_emp_ids(conn, 1))
     
-    cursor.execute('''
-        INSERT INTO employees 
-        (emp_id, first_name, last_name, email, position, department, start_date)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (new_emp_id, data['firstName'], data['lastName'], data['email'], 
-         data['position'], data['department'], data['startDate']))
+    cursor.execute(employees.INSERT_EMPLOYEE + " RETURNING *",
+                   (new_emp_id, data['firstName'], data['lastName'], data['email'],
+                    data['position'], data['department'], data['startDate']))
+    new_employee = dict(cursor.fetchone())
     
     conn.commit()
     
-    # Get the newly created employee
-    cursor.execute("SELECT * FROM employees WHERE emp_id = ?", (new_emp_id,))
-    new_employee = dict(cursor.fetchone())
-    conn.close()
-    
     return jsonify(new_employee), 201
 
+@app.route('/api/employees/bulk', methods=['POST'])
+@login_required
+def bulk_add_employees():
+    """
+    Import employees from CSV (text/csv, header row), JSON lines or a JSON
+    array. Rows are validated in one streaming pass; valid rows get a
+    contiguous emp_id range and are inserted in a single transaction.
+    With ?atomic=1 nothing is inserted if any row is invalid.
+    """
+    max_rows = app.config['BULK_IMPORT_MAX_ROWS']
+    try:
+        if request.mimetype == 'text/csv':
+            rows = employees.iter_csv(request.stream)
+        elif request.mimetype in NDJSON_MIMETYPES:
+            rows = employees.iter_ndjson(request.stream)
+        else:
+            data = request.get_json(silent=True)
+            if not isinstance(data, list):
+                return jsonify({'error': 'Expected CSV, JSON lines or a JSON array'}), 400
+            rows = enumerate(data, start=1)
+        valid, errors = employees.validate_stream(rows, max_rows)
+    except OverflowError:
+        return jsonify({'error': f'At most {max_rows} rows per import'}), 413
+    except (UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'error': f'Unreadable upload: {e}'}), 400
+
+    if errors and request.args.get('atomic') in ('1', 'true'):
+        return jsonify({'inserted': 0, 'errors': errors}), 422
+
+    conn = get_db()
+    try:
+        emp_ids = employees.insert_employees(conn, valid)
+    except sqlite3.IntegrityError as e:
+        conn.rollback()
+        return jsonify({'error': f'Import failed: {e}'}), 409
+
+    return jsonify({
+        'inserted': len(emp_ids),
+        'first_emp_id': emp_ids[0] if emp_ids else None,
+        'last_emp_id': emp_ids[-1] if emp_ids else None,
+        'errors': errors,
+    }), 201 if emp_ids else 200
+
 @app.route('/api/employees/<emp_id>', methods=['PUT'])
 @login_required
 def update_employee(emp_id):
@@ -233,7 +290,6 @@ def update_employee(emp_id):
     # Get the updated employee
     cursor.execute("SELECT * FROM employees WHERE emp_id = ?", (emp_id,))
     updated_employee = dict(cursor.fetchone())
-    conn.close()
     
     return jsonify(updated_employee)
 
@@ -244,37 +300,59 @@ def delete_employee(emp_id):
     cursor = conn.cursor()
     cursor.execute("DELETE FROM employees WHERE emp_id = ?", (emp_id,))
     conn.commit()
-    conn.close()
     
     return jsonify({'message': 'Employee deleted'})
 
 # API Routes for Tasks
 @app.route('/api/tasks', methods=['GET'])
 @login_required
+@cached_response('tasks', 'employees', by_date=True)
 def get_tasks():
-    emp_id = request.args.get('emp_id')
-    
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    if emp_id:
-        cursor.execute("SELECT * FROM tasks WHERE emp_id = ?", (emp_id,))
-    else:
-        cursor.execute("SELECT * FROM tasks")
-    
-    tasks = [dict(row) for row in cursor.fetchall()]
-
-    for task in tasks:
-        # Use try/except to prevent crashing
-        try:
-            task['auto_status'] = classify_task(task)
-        except Exception as e:
-            print(f"[ERROR] Task ID {task.get('id')} classification failed:", e)
-            task['auto_status'] = "Unknown"
-    
-    conn.close()
+    try:
+        page = parse_list_page()
+        tasks, next_cursor = query_tasks(get_db(), request.args, page)
+    except pagination.ListArgError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify(tasks)
+    return list_response(tasks, next_cursor, page)
+
+def query_tasks(conn, args, page):
+    """One page of tasks, with auto_status, filtered by ``args``; raises ListArgError."""
+    fields = pagination.parse_fields(
+        args, pagination.table_columns(conn, 'tasks'), computed=('auto_status',)
+    )
+    where, params = [], []
+    if args.get('emp_id'):
+        where.append("emp_id = ?")
+        params.append(args['emp_id'])
+    if args.get('status'):
+        where.append("status = ?")
+        params.append(args['status'])
+    if args.get('risk_label'):
+        where.append("risk_label = ?")
+        params.append(args['risk_label'])
+    if args.get('department'):
+        where.append("emp_id IN (SELECT emp_id FROM employees WHERE department = ?)")
+        params.append(args['department'])
+    wanted = parse_auto_status(args)
+    if wanted:
+        status_where, status_params = auto_status_filter(wanted)
+        where += status_where
+        params += status_params
+    for arg, column, op in (('due_from', 'due_date', '>='), ('due_to', 'due_date', '<='),
+                            ('assigned_from', 'assigned_date', '>='),
+                            ('assigned_to', 'assigned_date', '<=')):
+        value = pagination.parse_date(args, arg)
+        if value:
+            where.append(f"{column} {op} ?")
+            params.append(value)
+
+    # auto_status is computed (and filtered on) inside the query.
+    columns = ['*'] if fields is None else [f for f in fields if f != 'auto_status']
+    if fields is None or 'auto_status' in fields:
+        columns.append(f"{auto_status_sql()} AS auto_status")
+    rows, next_cursor = pagination.fetch_page(conn, 'tasks', columns, where, params, page)
+    return [pagination.project(dict(row), fields) for row in rows], next_cursor
 
 
 @app.route('/api/tasks', methods=['POST'])
@@ -297,31 +375,9 @@ def add_task():
     task_id = cursor.lastrowid
     cursor.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
     new_task = dict(cursor.fetchone())
-    conn.close()
     
     return jsonify(new_task), 201
 
-# def classify_task(task):
-#     """
-#     Classifies task based on status and days since assigned
-#     Returns: 'On Track', 'At Risk', or 'Delayed'
-#     """
-#     from datetime import datetime, timedelta
-
-#     assigned_date = datetime.strptime(task['assigned_date'], '%Y-%m-%d').date()
-#     today = datetime.now().date()
-#     days_passed = (today - assigned_date).days
-
-#     if task['status'] == 'Completed':
-#         return 'On Track'  # or 'Completed'
-#     elif days_passed > 5:
-#         return 'Delayed'
-#     elif days_passed > 2:
-#         return 'At Risk'
-#     else:
-#         return 'On Track'
-
-
 @app.route('/api/tasks/<int:task_id>', methods=['PUT'])
 @login_required
 def update_task(task_id):
@@ -356,7 +412,6 @@ def update_task(task_id):
     
     cursor.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
     updated_task = dict(cursor.fetchone())
-    conn.close()
     
     return jsonify(updated_task)
 
@@ -368,70 +423,140 @@ def delete_task(task_id):
     cursor = conn.cursor()
     cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
     conn.commit()
-    conn.close()
     
     return jsonify({'message': 'Task deleted'})
 
-# API Routes for Training Videos
-@app.route('/api/training-videos', methods=['GET'])
+# API Routes for Onboarding Templates
+@app.route('/api/templates', methods=['GET'])
 @login_required
-def get_training_videos():
+@cached_response('templates', 'template_items')
+def get_templates():
+    return jsonify(onboarding_templates.list_templates(get_db()))
+
+@app.route('/api/templates', methods=['POST'])
+@login_required
+def add_template():
+    try:
+        name, description, items = onboarding_templates.validate_template(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    conn = get_db()
+    try:
+        template_id = onboarding_templates.create_template(conn, name, description, items)
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        return jsonify({'error': f"Template '{name}' already exists"}), 409
+
+    return jsonify(onboarding_templates.list_templates(conn, template_id)[0]), 201
+
+@app.route('/api/templates/<int:template_id>', methods=['GET'])
+@login_required
+@cached_response('templates', 'template_items')
+def get_template(template_id):
+    templates = onboarding_templates.list_templates(get_db(), template_id)
+    if not templates:
+        return jsonify({'error': 'Template not found'}), 404
+    return jsonify(templates[0])
+
+@app.route('/api/templates/<int:template_id>', methods=['DELETE'])
+@login_required
+def delete_template(template_id):
     conn = get_db()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM training_videos")
-    videos = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    cursor.execute("DELETE FROM templates WHERE id = ?", (template_id,))
+    conn.commit()
     
-    return jsonify(videos)
+    return jsonify({'message': 'Template deleted'})
+
+@app.route('/api/templates/<int:template_id>/apply', methods=['POST'])
+@login_required
+def apply_template(template_id):
+    """
+    Create a template's tasks for one or many employees: body
+    {"emp_ids": [...]} (or {"emp_id": "..."}), optional "assigned_by".
+    Due dates are offset from each employee's start_date.
+    """
+    data = request.get_json(silent=True) or {}
+    emp_ids = data.get('emp_ids', [data['emp_id']] if 'emp_id' in data else None)
+    if not isinstance(emp_ids, list) or not emp_ids or not all(isinstance(e, str) for e in emp_ids):
+        return jsonify({'error': "'emp_ids' must be a non-empty list of employee IDs"}), 400
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM templates WHERE id = ?", (template_id,))
+    if not cursor.fetchone():
+        return jsonify({'error': 'Template not found'}), 404
+
+    created, missing = onboarding_templates.apply_template(
+        conn, template_id, emp_ids,
+        assigned_by=data.get('assigned_by') or session.get('username'),
+        assigned_date=datetime.now().strftime('%Y-%m-%d'),
+    )
+    return jsonify({
+        'template_id': template_id,
+        'tasks_created': created,
+        'missing_emp_ids': missing,
+    }), 201 if created else 200
+
+# API Routes for Training Videos
+@app.route('/api/training-videos', methods=['GET'])
+@login_required
+@cached_response('training_videos')
+def get_training_videos():
+    return jsonify(query_training_videos(get_db()))
+
+def query_training_videos(conn):
+    return [dict(row) for row in conn.execute("SELECT * FROM training_videos")]
 
 # API Route for Stats
 @app.route('/api/stats', methods=['GET'])
 @login_required
+@cached_response('employees', 'tasks', by_date=True)
 def get_stats():
-    conn = get_db()
+    return jsonify(query_stats(get_db()))
+
+def query_stats(conn):
     cursor = conn.cursor()
+    today = today_sql()
     
-    # Get active employees count
-    cursor.execute("SELECT COUNT(*) FROM employees")
-    active_employees = cursor.fetchone()[0]
-    
-    # Get completed onboardings (all tasks completed)
-    cursor.execute('''
-        SELECT COUNT(*) FROM employees 
-        WHERE forms_completed = total_forms 
-        AND videos_completed = total_videos 
-        AND documents_uploaded = total_documents
+    # Counters are kept current by triggers (see migration 4); overdue tasks
+    # and this week's hires are short range sums over per-date buckets.
+    cursor.execute(f'''
+        SELECT s.*,
+            (SELECT COALESCE(SUM(open_count), 0) FROM open_task_buckets
+             WHERE due_date < {today}) AS overdue_tasks,
+            (SELECT COALESCE(SUM(employee_count), 0) FROM employee_start_buckets
+             WHERE start_date > date({today}, '-7 days') AND start_date <= {today}) AS started_this_week
+        FROM stats s WHERE s.id = 1
     ''')
-    completed_onboardings = cursor.fetchone()[0]
-    
-    # Get pending tasks
-    cursor.execute("SELECT COUNT(*) FROM tasks WHERE status != 'Completed'")
-    pending_tasks = cursor.fetchone()[0]
-    
-    # Get overdue tasks (simplified logic)
-    cursor.execute("SELECT COUNT(*) FROM tasks WHERE due_date < date('now') AND status != 'Completed'")
-    overdue_tasks = cursor.fetchone()[0]
+    stats = cursor.fetchone()
     
-    conn.close()
+    employees_total = stats['employees_total']
+    completion_rate = round(100 * stats['onboardings_completed'] / employees_total) if employees_total else 0
+    avg_completion = (
+        round(stats['completion_days_total'] / stats['tasks_completed'], 1)
+        if stats['tasks_completed'] else 0
+    )
     
-    return jsonify({
-        'activeEmployees': active_employees,
-        'activeChange': 2,  # Example data
-        'completedThisMonth': completed_onboardings,
-        'completionRate': 75,  # Example data
-        'pendingTasks': pending_tasks,
-        'overdueTasks': overdue_tasks,
-        'avgCompletionTime': 14  # Example data in days
-    })
+    return {
+        'activeEmployees': employees_total,
+        'activeChange': stats['started_this_week'],
+        'completedThisMonth': stats['onboardings_completed'],
+        'completionRate': completion_rate,
+        'pendingTasks': stats['tasks_open'],
+        'overdueTasks': stats['overdue_tasks'],
+        'avgCompletionTime': avg_completion  # days from assignment to completion
+    }
 
 @app.route('/api/employees/<emp_id>', methods=['GET'])
 @login_required
+@cached_response('employees')
 def get_employee(emp_id):
     conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM employees WHERE emp_id = ?", (emp_id,))
     employee = cursor.fetchone()
-    conn.close()
     
     if employee:
         emp_dict = dict(employee)
@@ -455,31 +580,68 @@ def get_employee(emp_id):
     return jsonify({'error': 'Employee not found'}), 404
 
 
+# Progress updates
+app.config.setdefault('PROGRESS_BATCH_MAX_UPDATES', 1000)
+# Coalesce single progress updates arriving within this many ms into one
+# commit (0 = commit each on its own), at most PROGRESS_GROUP_COMMIT_MAX.
+app.config.setdefault('PROGRESS_GROUP_COMMIT_MS', 0)
+app.config.setdefault('PROGRESS_GROUP_COMMIT_MAX', 500)
+
+def get_progress_committer():
+    """The group committer for single progress updates, or None when disabled."""
+    window_ms = app.config['PROGRESS_GROUP_COMMIT_MS']
+    if not window_ms:
+        return None
+    committer = app.extensions.get('progress_committer')
+    if committer is None:
+        committer = app.extensions.setdefault('progress_committer', progress.GroupCommit(
+            window_ms / 1000, max_batch=app.config['PROGRESS_GROUP_COMMIT_MAX'],
+        ))
+    return committer
+
 @app.route('/api/employees/<emp_id>/progress', methods=['PUT'])
 @login_required
 def update_progress(emp_id):
-    data = request.get_json()
+    try:
+        # A field left out is reset to 0, as the dashboard has always relied on.
+        fields = progress.parse_fields(request.get_json(silent=True), defaults=0)
+    except progress.ProgressError as e:
+        return jsonify({'error': str(e)}), 400
 
     conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('''
-        UPDATE employees 
-        SET forms_completed = ?, videos_completed = ?, documents_uploaded = ?
-        WHERE emp_id = ?
-    ''', (
-        data.get('forms_completed', 0),
-        data.get('videos_completed', 0),
-        data.get('documents_uploaded', 0),
-        emp_id
-    ))
-
-    conn.commit()
-
-    cursor.execute("SELECT forms_completed, total_forms, videos_completed, total_videos, documents_uploaded, total_documents FROM employees WHERE emp_id = ?", (emp_id,))
-    progress = dict(cursor.fetchone())
-    conn.close()
+    committer = get_progress_committer()
+    if committer is not None:
+        row = committer.submit(conn, emp_id, fields)
+    else:
+        row = progress.apply_updates(conn, [(emp_id, fields)]).get(emp_id)
+    if row is None:
+        return jsonify({'error': 'Employee not found'}), 404
+    return jsonify(row)
 
-    return jsonify(progress)
+@app.route('/api/progress', methods=['PATCH'])
+@login_required
+def update_progress_batch():
+    """
+    Set the progress of many employees in one transaction. Takes
+    ``{"updates": [{"emp_id": ..., "forms_completed": ..., ...}, ...]}``;
+    fields an update leaves out are unchanged, and a later update to the
+    same employee wins. Returns the updated rows in request order and
+    the emp_ids that do not exist.
+    """
+    try:
+        updates = progress.parse_updates(request.get_json(silent=True),
+                                         app.config['PROGRESS_BATCH_MAX_UPDATES'])
+    except progress.ProgressError as e:
+        return jsonify({'error': str(e)}), 400
+
+    rows = progress.apply_updates(get_db(), updates)
+    updated, not_found = [], []
+    for emp_id in dict.fromkeys(emp_id for emp_id, _ in updates):
+        if emp_id in rows:
+            updated.append(dict(rows[emp_id], emp_id=emp_id))
+        else:
+            not_found.append(emp_id)
+    return jsonify({'updated': updated, 'not_found': not_found})
 
 # API Route to add a new training video
 @app.route('/api/training-videos', methods=['POST'])
@@ -506,7 +668,6 @@ def add_training_video():
     video_id = cursor.lastrowid
     cursor.execute("SELECT * FROM training_videos WHERE id = ?", (video_id,))
     new_video = dict(cursor.fetchone())
-    conn.close()
     
     return jsonify(new_video), 201
 
@@ -518,196 +679,644 @@ def check_auth():
         return jsonify({'authenticated': True, 'username': session['username']})
     return jsonify({'authenticated': False}), 401
 
+# Connection pool diagnostics
+@app.route('/api/db/pool-stats', methods=['GET'])
+@login_required
+def pool_stats():
+    return jsonify(db.get_pool().stats())
+
+# Prometheus metrics
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text exposition; set METRICS_TOKEN to require a bearer token."""
+    token = app.config.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'Authentication required'}), 401
+    extra = (
+        metrics.gauges('onboarding_db_pool', db.get_pool().stats(), 'Connection pool statistic.')
+        + metrics.gauges('onboarding_response_cache', get_cache().stats(), 'Response cache statistic.')
+    )
+    broker = app.extensions.get('event_broker')
+    if broker is not None:
+        extra += metrics.gauges('onboarding_events', broker.stats(), 'Event stream statistic.')
+    store = app.extensions.get('progress_store')
+    if store is not None:
+        extra += metrics.gauges('onboarding_model', store.stats(), 'Prediction model statistic.')
+    committer = app.extensions.get('progress_committer')
+    if committer is not None:
+        extra += metrics.gauges('onboarding_progress_group_commit', committer.stats(),
+                                'Progress group commit statistic.')
+    return Response(metrics.render(extra), mimetype='text/plain; version=0.0.4')
+
+# Response cache diagnostics
+@app.route('/api/cache/stats', methods=['GET'])
+@login_required
+def cache_stats():
+    return jsonify(get_cache().stats())
+
 # Insert default training videos if table is empty
 def insert_default_videos():
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM training_videos")
-    if cursor.fetchone()[0] == 0:
-        cursor.executemany(
-            "INSERT INTO training_videos (title, duration, category, upload_date, url) VALUES (?, ?, ?, ?, ?)",
-            [
-                ("Ultimez-A journey to build beyond", "5:35", "Onboarding", "2025-08-01", "https://www.youtube.com/embed/11tQ6PwrlIM"),
-                ("Workplace Ethics", "2:12", "Culture", "2025-08-05", "https://www.youtube.com/embed/b_n6i1ug0tQ"),
-                ("Software development life cycle", "2:47", "Software development", "2025-08-10", "https://www.youtube.com/embed/GxmfcnU3feo")
-            ]
+    with app.app_context():
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM training_videos")
+        if cursor.fetchone()[0] == 0:
+            cursor.executemany(
+                "INSERT INTO training_videos (title, duration, category, upload_date, url) VALUES (?, ?, ?, ?, ?)",
+                [
+                    ("Ultimez-A journey to build beyond", "5:35", "Onboarding", "2025-08-01", "https://www.youtube.com/embed/11tQ6PwrlIM"),
+                    ("Workplace Ethics", "2:12", "Culture", "2025-08-05", "https://www.youtube.com/embed/b_n6i1ug0tQ"),
+                    ("Software development life cycle", "2:47", "Software development", "2025-08-10", "https://www.youtube.com/embed/GxmfcnU3feo")
+                ]
+            )
+        conn.commit()
+
+app.config.setdefault('REMINDER_WORKERS', 2)
+app.config.setdefault('REMINDER_BATCH_SIZE', 50)
+app.config.setdefault('REMINDER_MAX_ATTEMPTS', 5)
+app.config.setdefault('REMINDER_BACKOFF_SECONDS', 30)
+
+def get_reminder_dispatcher():
+    dispatcher = app.extensions.get('reminder_dispatcher')
+    if dispatcher is None:
+        dispatcher = app.extensions['reminder_dispatcher'] = reminders.ReminderDispatcher(
+            db.get_pool(app),
+            reminders.sender_from_config(app.config),
+            workers=app.config['REMINDER_WORKERS'],
+            batch_size=app.config['REMINDER_BATCH_SIZE'],
+            max_attempts=app.config['REMINDER_MAX_ATTEMPTS'],
+            backoff_seconds=app.config['REMINDER_BACKOFF_SECONDS'],
         )
-    conn.commit()
-    conn.close()
+    dispatcher.start()
+    return dispatcher
+
+@app.route('/api/tasks/send-reminders', methods=['POST'])
+@login_required
+def send_reminders():
+    conn = get_db()
+    job_id, queued = reminders.enqueue_reminders(conn, created_by=session.get('username'))
+    get_reminder_dispatcher().wake()
+    
+    return jsonify({
+        'message': 'Reminders queued',
+        'job_id': job_id,
+        'queued': queued,
+        'status_url': url_for('reminder_job_status', job_id=job_id),
+    }), 202
+
+@app.route('/api/reminders/jobs/<int:job_id>', methods=['GET'])
+@login_required
+def reminder_job_status(job_id):
+    job_state = reminders.job_progress(get_db(), job_id)
+    if job_state is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job_state['status'] == 'running':
+        get_reminder_dispatcher()
+    return jsonify(job_state)
+
+def report_task(row):
+    """Build one task entry of /api/report from a joined employee/task row."""
+    return {
+        "task_name": row['task_name'],
+        "assigned_date": row['assigned_date'],
+        "due_date": row['due_date'],
+        "current_status": row['status'] if row['status'] else "Not Started",
+        "report_status": row['auto_status'],
+        "risk_label": row['risk_label'],
+        "risk_prob": row['risk_prob'],
+    }
+
+
+REPORT_FETCH_SIZE = 500
+
+
+def iter_report(cursor):
+    """
+    Yield (emp_id, employee_name, tasks) per employee from a cursor over
+    rows ordered by emp_id, emitting each employee as soon as its last row
+    has been read.
+    """
+    current = None
+    for row in itertools.chain.from_iterable(iter(lambda: cursor.fetchmany(REPORT_FETCH_SIZE), [])):
+        if current is None or row['emp_id'] != current[0]:
+            if current is not None:
+                yield current
+            current = (row['emp_id'], f"{row['first_name']} {row['last_name']}", [])
+        if row['task_name']:  # only if employee has a task
+            current[2].append(report_task(row))
+    if current is not None:
+        yield current
+
+
+REPORT_CSV_COLUMNS = ['emp_id', 'employee_name', 'task_name', 'assigned_date', 'due_date',
+                      'current_status', 'report_status', 'risk_label', 'risk_prob']
+
+
+def report_json(grouped):
+    yield b'['
+    for i, (_, name, tasks) in enumerate(grouped):
+        block = encoding.dumps_compact({"employee_name": name, "tasks": tasks})
+        yield block if i == 0 else b',' + block
+    yield b']\n'
+
+
+def report_ndjson(grouped):
+    for emp_id, name, tasks in grouped:
+        yield encoding.dumps_compact({"emp_id": emp_id, "employee_name": name, "tasks": tasks}) + b'\n'
+
+
+def report_csv(grouped):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.writerow(REPORT_CSV_COLUMNS)
+    yield flush()
+    for emp_id, name, tasks in grouped:
+        # Employees without tasks still get a row, like in the JSON report.
+        for task in tasks or [dict.fromkeys(REPORT_CSV_COLUMNS[2:], '')]:
+            writer.writerow([emp_id, name] + [task[col] for col in REPORT_CSV_COLUMNS[2:]])
+        yield flush()
+
+
+REPORT_FORMATS = {
+    'json': (report_json, 'application/json'),
+    'ndjson': (report_ndjson, 'application/x-ndjson'),
+    'csv': (report_csv, 'text/csv'),
+}
+
 
-from datetime import datetime, timedelta
+def report_sql(auto_statuses=None):
+    """
+    The report query, optionally limited to tasks whose auto_status is one
+    of ``auto_statuses``, as (sql, params). Unparseable assigned dates fall
+    back to today, as before; the report's due date is five days after
+    assignment.
+    """
+    assigned = f"COALESCE(date(t.assigned_date, '+0 days'), {today_sql()})"
+    where, params = [], []
+    if auto_statuses:
+        where, params = auto_status_filter(auto_statuses, table='t')
+    return f'''
+        SELECT e.emp_id, e.first_name, e.last_name, t.task_name, t.status,
+               {assigned} AS assigned_date,
+               date({assigned}, '+5 days') AS due_date,
+               {auto_status_sql('t')} AS auto_status,
+               t.risk_label, t.risk_prob
+        FROM employees e
+        LEFT JOIN tasks t ON e.emp_id = t.emp_id {''.join(' AND ' + w for w in where)}
+        ORDER BY e.emp_id, t.id
+    ''', params
+
+
+def query_report(conn, args):
+    """
+    Cursor over the report rows, ordered by employee so each one can be
+    emitted as soon as its rows end; callers iterate it lazily rather than
+    fetching it in full.
+    """
+    return conn.execute(*report_sql(parse_auto_status(args)))
+
+
+@app.route('/api/report', methods=['GET'])
+@login_required
+def task_report():
+    fmt = request.args.get('format', 'json')
+    if fmt not in REPORT_FORMATS:
+        return jsonify({'error': f"'format' must be one of {', '.join(REPORT_FORMATS)}"}), 400
+    render, mimetype = REPORT_FORMATS[fmt]
 
-def classify_task(task):
     try:
-        assigned_date_str = task.get('assigned_date')
-        if not assigned_date_str:
-            assigned_date = datetime.now().date()
-        else:
-            assigned_date = datetime.strptime(assigned_date_str, '%Y-%m-%d').date()
-        
-        status = task.get('status') or 'Assigned'
-        today = datetime.now().date()
-        days_passed = (today - assigned_date).days
-
-        if status == 'Completed':
-            return 'Completed'
-        elif days_passed < 0:
-            return 'Not yet started'
-        elif days_passed > 5:
-            return 'Delayed'
-        elif days_passed > 2:
-            return 'At Risk'
-        else:
-            return 'On Track'
-    
-    except Exception:
-        return "Unknown"
+        cursor = query_report(get_db(), request.args)
+    except pagination.ListArgError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        app.logger.exception("Error in /api/report")
+        return jsonify({"error": str(e)}), 500
+
+    body = stream_with_context(render(iter_report(cursor)))
+    response = Response(body, mimetype=mimetype)
+    if fmt == 'csv':
+        response.headers['Content-Disposition'] = 'attachment; filename=report.csv'
+    return response
 
+DASHBOARD_SECTIONS = ('employees', 'tasks', 'training_videos', 'stats', 'report')
+DASHBOARD_DEFAULT_SECTIONS = ('employees', 'tasks', 'training_videos', 'stats')
 
-def send_reminder(task):
+def section_args(name):
+    """Query parameters prefixed with ``<name>.``, prefix stripped."""
+    prefix = name + '.'
+    return {key[len(prefix):]: value for key, value in request.args.items() if key.startswith(prefix)}
+
+@app.route('/api/dashboard', methods=['GET'])
+@login_required
+@cached_response('employees', 'tasks', 'training_videos', by_date=True)
+def get_dashboard():
     """
-    Mock sending reminder: prints to console
+    Everything the admin dashboard shows in one round trip, read in a
+    single transaction on one connection so the sections agree with each
+    other. ``sections`` is a comma-separated subset of DASHBOARD_SECTIONS
+    (default: all but the report). List sections accept their endpoint's
+    parameters prefixed with the section name, e.g.
+    ``tasks.limit=50&tasks.auto_status=Delayed``, and always come back as
+    ``{"items": [...], "next_cursor": ..., "truncated": ...}``; without a
+    ``limit`` or ``cursor`` a section stops at API_UNPAGINATED_CAP rows and
+    ``truncated`` is true if there were more. Follow ``next_cursor`` on the
+    section's own endpoint for the rest. ``version`` is the change log
+    version the sections were read at, to resume /api/events or
+    /api/changes from.
     """
-    print(f"[Reminder] Task '{task['task_name']}' for {task['emp_name']} is {task['auto_status']}")
+    raw = request.args.get('sections')
+    sections = list(dict.fromkeys(raw.split(','))) if raw else list(DASHBOARD_DEFAULT_SECTIONS)
+    unknown = [name for name in sections if name not in DASHBOARD_SECTIONS]
+    if unknown:
+        return jsonify({'error': f"Unknown section(s): {', '.join(unknown)}"}), 400
 
-@app.route('/api/tasks/send-reminders', methods=['POST'])
+    conn = get_db()
+    result = {}
+    conn.execute("BEGIN")
+    try:
+        result['version'] = change_log.current_version(conn)
+        for name in sections:
+            args = section_args(name)
+            if name in ('employees', 'tasks'):
+                query = query_employees if name == 'employees' else query_tasks
+                page = parse_list_page(args)
+                items, next_cursor = query(conn, args, page)
+                result[name] = {'items': items, 'next_cursor': next_cursor,
+                                'truncated': not page.paginated and next_cursor is not None}
+            elif name == 'training_videos':
+                result[name] = query_training_videos(conn)
+            elif name == 'stats':
+                result[name] = query_stats(conn)
+            elif name == 'report':
+                result[name] = [
+                    {"employee_name": employee_name, "tasks": tasks}
+                    for _, employee_name, tasks in iter_report(query_report(conn, args))
+                ]
+    except pagination.ListArgError as e:
+        return jsonify({'error': f"{name}: {e}"}), 400
+    finally:
+        conn.commit()
+
+    return jsonify(result)
+
+# Full-text search
+app.config.setdefault('SEARCH_LIMIT', 20)
+app.config.setdefault('SEARCH_MAX_LIMIT', 100)
+app.config.setdefault('SEARCH_RANK_MAX_MATCHES', search.RANK_MAX_MATCHES)
+
+@app.route('/api/search', methods=['GET'])
 @login_required
-def send_reminders():
+def search_records():
+    """
+    Employees, tasks and training videos matching every word of ``q`` as
+    a prefix, best first, at most ``limit`` per table; optionally only the
+    comma-separated ``tables``. Matches of a query too broad to rank come
+    newest first with a null ``score``.
+    """
+    try:
+        limit = int(request.args.get('limit', app.config['SEARCH_LIMIT']))
+    except ValueError:
+        return jsonify({'error': "'limit' must be an integer"}), 400
+    if not 1 <= limit <= app.config['SEARCH_MAX_LIMIT']:
+        return jsonify({'error': f"'limit' must be between 1 and {app.config['SEARCH_MAX_LIMIT']}"}), 400
+    tables = request.args.get('tables')
+    tables = tables.split(',') if tables else None
+    unknown = [table for table in tables or () if table not in migrations.SEARCH_COLUMNS]
+    if unknown:
+        return jsonify({'error': f"Unknown table(s): {', '.join(unknown)}"}), 400
+
+    query = request.args.get('q', '')
+    results = search.search(get_db(), query, limit, tables, app.config['SEARCH_RANK_MAX_MATCHES'])
+    if results is None:
+        return jsonify({'error': "'q' must contain at least one word"}), 400
+    return jsonify({'query': query, 'results': results})
+
+# Incremental sync
+app.config.setdefault('CHANGE_LOG_RETENTION_DAYS', 30)
+app.config.setdefault('CHANGE_LOG_COMPACT_INTERVAL', 3600)
+
+@app.after_request
+def compact_change_log_if_due(response):
+    """
+    Expire old tombstones at most once per CHANGE_LOG_COMPACT_INTERVAL
+    seconds per process, after a successful write, so reads never write.
+    ``flask compact-changes`` does the same on a schedule.
+    """
+    if request.method not in ('POST', 'PUT', 'PATCH', 'DELETE') or response.status_code >= 400:
+        return response
+    now = time.monotonic()
+    last = app.extensions.get('change_log_compacted_at')
+    if last is not None and now - last < app.config['CHANGE_LOG_COMPACT_INTERVAL']:
+        return response
+    app.extensions['change_log_compacted_at'] = now
+    try:
+        change_log.compact(get_db(), app.config['CHANGE_LOG_RETENTION_DAYS'])
+    except sqlite3.Error:
+        # The write already succeeded; the next one tries again.
+        app.extensions['change_log_compacted_at'] = None
+        app.logger.exception("Change log compaction failed")
+    return response
+
+@app.route('/api/changes', methods=['GET'])
+@login_required
+def get_changes():
+    """
+    Rows upserted or deleted after version ``since`` (default 0, i.e.
+    everything), oldest first, ``limit`` at a time; optionally only the
+    comma-separated ``tables``. Responds 410 when ``since`` predates the
+    compacted log and the client must reload.
+    """
+    try:
+        since = int(request.args.get('since', 0))
+        limit = int(request.args.get('limit', app.config['API_PAGE_SIZE']))
+    except ValueError:
+        return jsonify({'error': "'since' and 'limit' must be integers"}), 400
+    if since < 0 or not 1 <= limit <= app.config['API_MAX_PAGE_SIZE']:
+        return jsonify({'error': f"'since' must be >= 0 and 'limit' between 1 and "
+                                 f"{app.config['API_MAX_PAGE_SIZE']}"}), 400
+    tables = request.args.get('tables')
+    tables = tables.split(',') if tables else None
+    unknown = [table for table in tables or () if table not in migrations.CHANGE_LOG_TABLES]
+    if unknown:
+        return jsonify({'error': f"Unknown table(s): {', '.join(unknown)}"}), 400
+
     conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM tasks WHERE status != 'Completed'")
-    tasks = [dict(row) for row in cursor.fetchall()]
+    conn.execute("BEGIN")
+    try:
+        result = change_log.changes_since(conn, since, limit, tables)
+    except change_log.ChangesExpired as e:
+        return jsonify({
+            'error': 'Changes since this version were compacted away; reload, then sync from version',
+            'version': e.version,
+        }), 410
+    finally:
+        conn.commit()
 
-    for task in tasks:
-        task['auto_status'] = classify_task(task)
-        if task['auto_status'] in ['At Risk', 'Delayed']:
-            send_reminder(task)
-    
-    conn.close()
-    return jsonify({'message': 'Reminders sent (mocked/logged)'}), 200
+    return jsonify(result)
 
-@app.route('/api/report', methods=['GET'])
+@app.cli.command('compact-changes')
+def compact_changes_command():
+    """Remove change log tombstones older than CHANGE_LOG_RETENTION_DAYS."""
+    with app.app_context():
+        removed = change_log.compact(get_db(), app.config['CHANGE_LOG_RETENTION_DAYS'])
+    print(f"Removed {removed} tombstone(s).")
+
+# Live updates
+app.config.setdefault('SSE_HEARTBEAT_SECONDS', 15)
+app.config.setdefault('SSE_POLL_INTERVAL', 0.5)
+app.config.setdefault('SSE_QUEUE_SIZE', 256)
+app.config.setdefault('SSE_MAX_SUBSCRIBERS', 1000)
+
+def get_event_broker():
+    broker = app.extensions.get('event_broker')
+    if broker is None:
+        broker = app.extensions['event_broker'] = events.EventBroker(
+            db.get_pool(app),
+            poll_interval=app.config['SSE_POLL_INTERVAL'],
+            max_queued=app.config['SSE_QUEUE_SIZE'],
+            max_subscribers=app.config['SSE_MAX_SUBSCRIBERS'],
+        )
+    return broker
+
+@app.after_request
+def wake_event_broker(response):
+    # Publish this process's writes now rather than at the next poll.
+    if request.method in ('POST', 'PUT', 'PATCH', 'DELETE') and response.status_code < 400:
+        broker = app.extensions.get('event_broker')
+        if broker is not None:
+            broker.wake()
+    return response
+
+@app.route('/api/events', methods=['GET'])
 @login_required
-def task_report():
+def event_stream():
+    """
+    Server-Sent Events: one ``change`` event per row upserted or deleted,
+    shaped like an /api/changes entry and identified by its version, plus
+    periodic heartbeat comments. Reconnects resume after ``Last-Event-ID``
+    (or ``?last_event_id=``); a ``reset`` event means the client must
+    reload. ``tables`` limits the stream as for /api/changes.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
     try:
-        conn = get_db()
-        cursor = conn.cursor()
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({'error': "'Last-Event-ID' must be an integer"}), 400
+    tables = request.args.get('tables')
+    tables = tables.split(',') if tables else None
+    unknown = [table for table in tables or () if table not in migrations.CHANGE_LOG_TABLES]
+    if unknown:
+        return jsonify({'error': f"Unknown table(s): {', '.join(unknown)}"}), 400
+
+    broker = get_event_broker()
+    try:
+        subscription = broker.subscribe(last_event_id, tables)
+    except events.TooManySubscribers:
+        return jsonify({'error': 'Too many event subscribers'}), 503
+    # The stream reads through the pool, not the request's connection,
+    # so it needs no request context and pins no connection while idle.
+    return Response(
+        broker.stream(subscription, heartbeat=app.config['SSE_HEARTBEAT_SECONDS']),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+@app.route('/api/events/stats', methods=['GET'])
+@login_required
+def event_stats():
+    return jsonify(get_event_broker().stats())
 
-        cursor.execute('''
-            SELECT e.emp_id, e.first_name, e.last_name, t.task_name, t.assigned_date, t.status
-            FROM employees e
-            LEFT JOIN tasks t ON e.emp_id = t.emp_id
-        ''')
-        rows = cursor.fetchall()
-
-        report = {}
-        today = datetime.now().date()
-
-        for row in rows:
-            emp_id = row['emp_id']
-            emp_name = f"{row['first_name']} {row['last_name']}"
-
-            if emp_id not in report:
-                report[emp_id] = {
-                    "employee_name": emp_name,
-                    "tasks": []
-                }
-
-            if row['task_name']:  # only if employee has a task
-                # ✅ Handle assigned_date safely
-                try:
-                    if row['assigned_date']:
-                        # works if assigned_date is already a date
-                        if isinstance(row['assigned_date'], str):
-                            assigned_date = datetime.strptime(row['assigned_date'], '%Y-%m-%d').date()
-                        else:
-                            assigned_date = row['assigned_date']
-                    else:
-                        assigned_date = today
-                except Exception:
-                    assigned_date = today
-
-                due_date = assigned_date + timedelta(days=5)
-
-                # ✅ Handle status safely
-                status = row['status'] if row['status'] else "Not Started"
-                days_passed = (today - assigned_date).days
-
-                # ✅ Classification logic
-                if status == "Completed":
-                    auto_status = "Completed"
-                elif days_passed > 5:
-                    auto_status = "Delayed"
-                elif days_passed > 2 and status == "Not Started":
-                    auto_status = "At Risk"
-                else:
-                    auto_status = "On Track"
-
-                # if auto_status in ["At Risk", "Delayed"]:
-                #     print(f"[MOCK EMAIL] Reminder sent to {emp_name} for task '{row['task_name']}' - Status: {auto_status}")
-
-                reminder_sent = auto_status in ["At Risk", "Delayed"]
-                report[emp_id]["tasks"].append({
-                    "task_name": row['task_name'],
-                    "assigned_date": assigned_date.strftime('%Y-%m-%d'),
-                    "due_date": due_date.strftime('%Y-%m-%d'),
-                    "current_status": status,
-                    "report_status": auto_status
-                })
-
-        conn.close()
-        return jsonify(list(report.values()))
+app.config.setdefault('PREDICT_BATCH_MAX_RECORDS', 10000)
+app.config.setdefault('MODEL_PATH', 'progress_model.pkl')
+app.config.setdefault('MODEL_MEMO_SIZE', 4096)
+app.config.setdefault('MODEL_WARMUP', True)
 
-    except Exception as e:
-        import traceback
-        print("---- ERROR IN /api/report ----")
-        print(traceback.format_exc())   # full traceback in terminal
-        return jsonify({"error": str(e)}), 500
 
-import joblib
-import numpy as np
+def get_progress_store():
+    """
+    The model store, created on first use: importing this module does not
+    import NumPy, joblib or scikit-learn, and the model itself loads on the
+    first prediction or in the background via ``warm_up_model``. The store
+    serves in-range inputs from a precomputed table, memoizes the rest, and
+    rebuilds both when the model file changes on disk.
+    """
+    store = app.extensions.get('progress_store')
+    if store is None:
+        from inference import ModelStore
+        store = app.extensions.setdefault('progress_store', ModelStore(
+            app.config['MODEL_PATH'], memo_size=app.config['MODEL_MEMO_SIZE']
+        ))
+    return store
+
+
+def warm_up_model():
+    """Start loading the model in the background once the server is up."""
+    if app.config['MODEL_WARMUP']:
+        get_progress_store().warm_up()
 
-# --- Load your trained model once ---
-progress_model = joblib.load("progress_model.pkl")
-print("Model loaded:", progress_model)
 
-import pandas as pd
+def predict_records(records):
+    with metrics.timed('inference'):
+        model, proba = get_progress_store().predict_proba(records)
+    classes = model.classes
+    preds = classes[proba.argmax(axis=1)]
+    delayed = proba[:, list(classes).index(1)]
+    return [
+        ("Delayed" if pred == 1 else "On Track", float(p))
+        for pred, p in zip(preds, delayed)
+    ]
+
 
 @app.route('/api/predict-progress', methods=['POST'])
 def predict_progress():
+    from inference import RecordError
+
     data = request.get_json()
-    time_spent = data.get('time_spent_hours', 0)
-    task_type = data.get('task_type', 'Other')
-    previous_delays = data.get('previous_delays', 0)
+    try:
+        pred_label, _ = predict_records([data])[0]
+    except RecordError as e:
+        return jsonify({'error': str(e)}), 400
 
-    # Build a dataframe with same structure as training
-    df = pd.DataFrame([{
-        "time_spent_hours": time_spent,
-        "previous_delays": previous_delays,
-        "task_type": task_type
-    }])
+    return jsonify({"prediction": pred_label})
 
-    # One-hot encode like training (drop_first=True)
-    df = pd.get_dummies(df, columns=['task_type'], drop_first=True)
 
-    # Align with model’s training columns
-    for col in progress_model.feature_names_in_:  
-        if col not in df.columns:
-            df[col] = 0  # add missing columns
+@app.route('/api/predict-progress/stats', methods=['GET'])
+@login_required
+def predict_progress_stats():
+    return jsonify(get_progress_store().stats())
 
-    df = df[progress_model.feature_names_in_]  # reorder
 
-    pred = progress_model.predict(df)[0]
-    pred_label = "Delayed" if pred == 1 else "On Track"
+def read_batch_records(max_records):
+    """
+    Read prediction records from a JSON array, a ``{"records": [...]}``
+    object, or a JSON-lines body (``application/x-ndjson``), which is
+    parsed line by line straight off the request stream.
+    """
+    if request.mimetype in NDJSON_MIMETYPES:
+        records = []
+        for line_no, line in enumerate(request.stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if len(records) >= max_records:
+                raise OverflowError
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                raise ValueError(f"line {line_no}: invalid JSON")
+        return records
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('records')
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array of records or a 'records' list")
+    if len(data) > max_records:
+        raise OverflowError
+    return data
+
+
+@app.route('/api/predict-progress/batch', methods=['POST'])
+@login_required
+def predict_progress_batch():
+    from inference import RecordError
 
-    return jsonify({"prediction": pred_label})
+    max_records = app.config['PREDICT_BATCH_MAX_RECORDS']
+    try:
+        records = read_batch_records(max_records)
+        results = [
+            {'prediction': label, 'probability': round(p, 4)}
+            for label, p in predict_records(records)
+        ] if records else []
+    except OverflowError:
+        return jsonify({'error': f'At most {max_records} records per batch'}), 413
+    except RecordError as e:
+        return jsonify({'error': str(e), 'index': e.index}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'count': len(results), 'results': results})
+
+
+app.config.setdefault('MODEL_PRELOAD', True)
+
+@app.cli.command('train-model')
+@click.option('--n-jobs', type=int, default=-1, show_default=True,
+              help='Trees fitted in parallel (-1: every core).')
+@click.option('--estimators', type=int, default=100, show_default=True)
+@click.option('--if-changed', is_flag=True,
+              help='Skip when tasks and employees have not changed since the last version.')
+def train_model_command(n_jobs, estimators, if_changed):
+    """Train the progress model on the database and publish it as a new version."""
+    import training
+
+    with app.app_context():
+        result = training.train_from_database(
+            get_db(), app.config['MODEL_PATH'], n_estimators=estimators, n_jobs=n_jobs,
+            if_changed=if_changed,
+        )
+    if result is None:
+        print("Data unchanged since the last trained version; nothing to do.")
+        return
+    print(json.dumps(result, indent=2))
+
+@app.cli.command('score-risk')
+@click.option('--chunk-size', type=int, default=10000, show_default=True,
+              help='Tasks scored and written per transaction.')
+def score_risk_command(chunk_size):
+    """Score every open task with the progress model and store risk_label/risk_prob."""
+    import risk
+
+    with app.app_context():
+        result = risk.score_open_tasks(get_db(), get_progress_store().get(), chunk_size=chunk_size)
+    print(json.dumps(result, indent=2))
+
+@app.cli.command('activate-model')
+@click.argument('version', required=False)
+def activate_model_command(version):
+    """Make a saved model version live (e.g. to roll back); lists versions without one."""
+    import training
 
+    if version is None:
+        for path in training.list_versions(app.config['MODEL_PATH']):
+            print(path)
+        return
+    training.activate(version, app.config['MODEL_PATH'])
+    print(f"Activated {version}; running servers pick it up on their next check.")
+
+
+def create_app(config=None):
+    """
+    Production entry point (see wsgi.py and gunicorn.conf.py). Applies
+    ``ONBOARDING_*`` environment variables and then ``config`` over the
+    defaults, migrates and seeds the database, and with ``MODEL_PRELOAD``
+    loads the model now so a preloading server shares it with every
+    worker it forks. Idle database connections are closed before
+    returning so none are inherited across a fork.
+    """
+    app.config.from_prefixed_env('ONBOARDING')
+    if config:
+        app.config.update(config)
+    init_db()
+    insert_default_videos()
+    if app.config['MODEL_PRELOAD']:
+        get_progress_store().get()
+    db.close_pools()
+    return app
 
 
 if __name__ == '__main__':
     init_db()
     insert_default_videos()
     port = int(os.environ.get("PORT", 5000))  
+    warm_up_model()
     app.run(host="0.0.0.0", port=port, debug=True)
     # app.run(debug=True, port=5000)
 
@@ -0,0 +1,8 @@
+"""
+Benchmarks for the onboarding service.
+
+Run from the repository root, e.g. ``python -m benchmarks.bench_inference``.
+``benchmarks.seed`` builds synthetic databases of a given size and
+``benchmarks.loadtest`` drives every /api route against one, reporting
+per-endpoint latency percentiles as JSON for comparison between commits.
+"""
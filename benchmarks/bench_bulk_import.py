@@ -0,0 +1,90 @@
+"""
+Bulk employee import throughput: POST /api/employees/bulk with a CSV of
+N rows against a scratch database, compared with one POST /api/employees
+per row on a sample.
+
+    python -m benchmarks.bench_bulk_import [--rows 10000 100000] [--single-rows 500]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import app as app_module
+
+DEPARTMENTS = ['Engineering', 'Sales', 'HR', 'Finance', 'Operations']
+
+
+def employee(i):
+    return {
+        'firstName': f'First{i}',
+        'lastName': f'Last{i}',
+        'email': f'user{i}@example.com',
+        'position': 'Analyst',
+        'department': DEPARTMENTS[i % len(DEPARTMENTS)],
+        'startDate': f'2026-{1 + i % 12:02d}-{1 + i % 28:02d}',
+    }
+
+
+def csv_body(n):
+    lines = ['firstName,lastName,email,position,department,startDate']
+    for i in range(n):
+        e = employee(i)
+        lines.append(','.join(e[k] for k in ('firstName', 'lastName', 'email',
+                                              'position', 'department', 'startDate')))
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def fresh_client(directory, name):
+    app = app_module.app
+    app.config['DATABASE'] = os.path.join(directory, name)
+    app.config['BULK_IMPORT_MAX_ROWS'] = max(app.config['BULK_IMPORT_MAX_ROWS'], 10 ** 7)
+    app_module.init_db()
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--single-rows', type=int, default=500)
+    args = parser.parse_args()
+
+    report = {'bulk': [], 'single': None}
+    with tempfile.TemporaryDirectory() as directory:
+        for n in args.rows:
+            client = fresh_client(directory, f'bulk_{n}.db')
+            body = csv_body(n)
+            start = time.perf_counter()
+            response = client.post('/api/employees/bulk', data=body, content_type='text/csv')
+            elapsed = time.perf_counter() - start
+            result = response.get_json()
+            if response.status_code != 201 or result['inserted'] != n:
+                raise AssertionError(f"bulk import of {n} rows failed: {response.status_code}")
+            report['bulk'].append({
+                'rows': n,
+                'seconds': round(elapsed, 3),
+                'rows_per_second': round(n / elapsed),
+            })
+
+        if args.single_rows:
+            client = fresh_client(directory, 'single.db')
+            start = time.perf_counter()
+            for i in range(args.single_rows):
+                response = client.post('/api/employees', json=employee(i))
+                if response.status_code != 201:
+                    raise AssertionError(f"single insert failed: {response.status_code}")
+            elapsed = time.perf_counter() - start
+            report['single'] = {
+                'rows': args.single_rows,
+                'seconds': round(elapsed, 3),
+                'rows_per_second': round(args.single_rows / elapsed),
+            }
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
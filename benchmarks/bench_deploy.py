@@ -0,0 +1,199 @@
+"""
+End-to-end load test of the two ways to run the app: the development
+server (``python app.py``) and gunicorn with gunicorn.conf.py. Each is
+started against a scratch copy of the database and model, seeded over
+HTTP, then driven by concurrent keep-alive clients with a mix of read
+and prediction requests. Reports requests/s, latency percentiles and the
+RSS / PSS of every server process (PSS splits shared pages, so it shows
+what preloading saves).
+
+    python -m benchmarks.bench_deploy [--seconds 10] [--concurrency 8]
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.bench_bulk_import import csv_body
+from benchmarks.loadtest import HttpClient
+from inference import ModelStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKLOAD = (
+    ('GET', '/api/employees?limit=50', None),
+    ('GET', '/api/tasks?limit=50', None),
+    ('GET', '/api/stats', None),
+    ('POST', '/api/predict-progress',
+     {'time_spent_hours': 3, 'task_type': 'Training', 'previous_delays': 1}),
+)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def seed(port, employees):
+    client = HttpClient(f'http://127.0.0.1:{port}')
+    status, _ = client.request('POST', '/api/employees/bulk', csv_body(employees), {'Content-Type': 'text/csv'})
+    if status != 201:
+        raise RuntimeError(f"seeding failed: {status}")
+    status, body = client.call('POST', '/api/templates', {
+        'name': 'Standard',
+        'items': [{'task_name': f'Task {i}', 'category': 'Onboarding', 'due_offset_days': i} for i in range(5)],
+    })
+    template_id = json.loads(body)['id']
+    status, body = client.request('GET', f'/api/employees?limit={employees}')
+    emp_ids = [e['emp_id'] for e in json.loads(body)['items']]
+    client.call('POST', f'/api/templates/{template_id}/apply', {'emp_ids': emp_ids})
+
+
+def drive(port, seconds, concurrency):
+    latencies = {path: [] for _, path, _ in WORKLOAD}
+    errors = []
+    deadline = time.monotonic() + seconds
+
+    def worker(offset):
+        client = HttpClient(f'http://127.0.0.1:{port}')
+        i = offset
+        while time.monotonic() < deadline:
+            method, path, payload = WORKLOAD[i % len(WORKLOAD)]
+            i += 1
+            start = time.perf_counter()
+            status, _ = client.call(method, path, payload)
+            latencies[path].append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                errors.append((path, status))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    total = sum(len(samples) for samples in latencies.values())
+    return {
+        'requests': total,
+        'errors': len(errors),
+        'requests_per_second': round(total / elapsed, 1),
+        'endpoints': {
+            path: {
+                'p50_ms': round(statistics.median(samples), 2),
+                'p99_ms': round(statistics.quantiles(samples, n=100)[98], 2) if len(samples) > 1 else None,
+            }
+            for path, samples in latencies.items() if samples
+        },
+    }
+
+
+def process_tree(pid):
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            for child in f.read().split():
+                pids.extend(process_tree(int(child)))
+    except OSError:
+        pass
+    return pids
+
+
+def memory(pid):
+    """RSS and PSS in MiB from /proc (Linux only)."""
+    result = {'pid': pid}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    result['rss_mib'] = round(int(line.split()[1]) / 1024, 1)
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    result['pss_mib'] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return result
+
+
+def run_setup(name, command, directory, args):
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), PYTHONPATH=ROOT, PYTHONWARNINGS='ignore',
+               ONBOARDING_DATABASE=os.path.join(directory, 'employee_onboarding.db'),
+               ONBOARDING_MODEL_PATH=os.path.join(directory, 'progress_model.pkl'))
+    log_path = os.path.join(directory, 'server.log')
+    with open(log_path, 'w') as log:
+        process = subprocess.Popen(command, cwd=directory, env=env, start_new_session=True,
+                                   stdout=log, stderr=subprocess.STDOUT)
+    try:
+        wait_until_up(port, process)
+        seed(port, args.employees)
+        # Warm every route once so lazy loads are not counted.
+        drive(port, 1, 1)
+        result = drive(port, args.seconds, args.concurrency)
+        processes = [memory(pid) for pid in process_tree(process.pid)]
+        result['processes'] = processes
+        result['total_rss_mib'] = round(sum(p.get('rss_mib', 0) for p in processes), 1)
+        result['total_pss_mib'] = round(sum(p.get('pss_mib', 0) for p in processes), 1)
+        return result
+    except Exception:
+        with open(log_path) as log:
+            sys.stderr.write(f"--- {name} server log ---\n" + log.read()[-4000:])
+        raise
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--employees', type=int, default=2000)
+    parser.add_argument('--workers', help='GUNICORN_WORKERS for the gunicorn run')
+    args = parser.parse_args()
+
+    setups = {
+        'dev_server': [sys.executable, os.path.join(ROOT, 'app.py')],
+        'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'),
+                     '--chdir', ROOT, 'wsgi:app'],
+    }
+    if args.workers:
+        os.environ['GUNICORN_WORKERS'] = args.workers
+
+    report = {}
+    for name, command in setups.items():
+        with tempfile.TemporaryDirectory() as directory:
+            # The dev server uses relative paths, so give it its own copies.
+            shutil.copy2(os.path.join(ROOT, 'progress_model.pkl'), directory)
+            # Build the compiled artifact up front, as any earlier boot would have.
+            ModelStore(os.path.join(directory, 'progress_model.pkl')).get()
+            report[name] = run_setup(name, command, directory, args)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Compare the original pandas + sklearn prediction path with the compiled
+forest used by the API: checks that both give identical predictions, then
+reports p50/p99 single-row latency and batch throughput.
+
+    python -m benchmarks.bench_inference [--iterations 2000]
+"""
+import argparse
+import json
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from inference import CompiledForest, FeatureEncoder
+
+TASK_TYPES = ['Onboarding', 'Training', 'Documentation', 'Other']
+
+
+def legacy_predict(model, record):
+    # The request path app.py used before the compiled forest.
+    df = pd.DataFrame([{
+        "time_spent_hours": record['time_spent_hours'],
+        "previous_delays": record['previous_delays'],
+        "task_type": record['task_type'],
+    }])
+    df = pd.get_dummies(df, columns=['task_type'], drop_first=True)
+    for col in model.feature_names_in_:
+        if col not in df.columns:
+            df[col] = 0
+    df = df[model.feature_names_in_]
+    return model.predict(df)[0]
+
+
+def random_records(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'time_spent_hours': float(rng.uniform(0, 25)) if i % 3 == 0 else int(rng.integers(1, 21)),
+            'previous_delays': int(rng.integers(0, 7)),
+            'task_type': TASK_TYPES[int(rng.integers(0, len(TASK_TYPES)))],
+        }
+        for i in range(n)
+    ]
+
+
+def check_parity(model, forest, encoder, records):
+    X = encoder.encode(records)
+    expected = model.predict(pd.DataFrame(X, columns=model.feature_names_in_))
+    got = forest.predict(X)
+    if not np.array_equal(expected, got):
+        raise AssertionError(f"{int((expected != got).sum())} predictions differ from sklearn")
+    expected_proba = model.predict_proba(pd.DataFrame(X, columns=model.feature_names_in_))
+    if not np.allclose(expected_proba, forest.predict_proba(X)):
+        raise AssertionError("probabilities differ from sklearn")
+    for record in records[:200]:
+        if legacy_predict(model, record) != forest.predict(encoder.encode([record]))[0]:
+            raise AssertionError(f"legacy path disagrees on {record}")
+
+
+def latency(fn, records, iterations):
+    samples = []
+    for i in range(iterations):
+        record = records[i % len(records)]
+        start = time.perf_counter()
+        fn(record)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return {
+        'p50_us': round(float(np.percentile(samples, 50)), 1),
+        'p99_us': round(float(np.percentile(samples, 99)), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--model', default='progress_model.pkl')
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    forest = CompiledForest.from_sklearn(model)
+    encoder = FeatureEncoder(forest.feature_names)
+    records = random_records(5000)
+
+    check_parity(model, forest, encoder, records)
+
+    batch = encoder.encode(random_records(args.batch_size, seed=1))
+    start = time.perf_counter()
+    forest.predict_proba(batch)
+    compiled_batch = time.perf_counter() - start
+    frame = pd.DataFrame(batch, columns=model.feature_names_in_)
+    start = time.perf_counter()
+    model.predict_proba(frame)
+    sklearn_batch = time.perf_counter() - start
+
+    report = {
+        'parity': 'ok',
+        'trees': forest.n_trees,
+        'nodes': int(forest.feature.shape[0]),
+        'single_row': {
+            'legacy_pandas': latency(lambda r: legacy_predict(model, r), records, args.iterations),
+            'compiled': latency(lambda r: forest.predict(encoder.encode([r])), records, args.iterations),
+        },
+        'batch': {
+            'rows': args.batch_size,
+            'sklearn_ms': round(sklearn_batch * 1000, 2),
+            'compiled_ms': round(compiled_batch * 1000, 2),
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Progress update throughput: one commit per update against batches.
+
+Seeds a scratch database and has ``--clients`` threads write
+``--updates`` progress updates in total through the app (in process,
+each thread with its own logged-in test client), as:
+
+- ``PUT /api/employees/<id>/progress``, one commit each (the old path)
+- the same PUTs with group commit at each ``--windows`` millisecond
+  window, reporting how many updates each commit carried
+- ``PATCH /api/progress`` batches of ``--batch-size`` from each client
+
+Every run checks that the database ends with the values written. A
+commit's fsync dominates a single update, so the numbers depend on the
+disk; use ``--directory`` to put the database on the one production uses.
+
+    python -m benchmarks.bench_progress [--clients 8] [--updates 4000] [--windows 2,5]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+import app as app_module
+from benchmarks import seed as seeding
+from employees import format_emp_id
+
+
+def plan(updates, employees, clients, round_no):
+    """Per-client lists of ``(emp_id, fields)``; each employee is written by one client only."""
+    work = [[] for _ in range(clients)]
+    for i in range(updates):
+        emp = i % employees + 1
+        work[emp % clients].append((format_emp_id(emp), {
+            'forms_completed': (i + round_no) % 5,
+            'videos_completed': (i + round_no) % 4,
+            'documents_uploaded': (i + round_no) % 6,
+        }))
+    return work
+
+
+def run_clients(app, work, send):
+    latencies, errors = [], []
+    barrier = threading.Barrier(len(work) + 1)
+
+    def client_loop(items):
+        client = app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        barrier.wait()
+        for samples, status in send(client, items):
+            latencies.extend(samples)
+            if status != 200:
+                errors.append(status)
+
+    threads = [threading.Thread(target=client_loop, args=(items,)) for items in work]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'seconds': round(seconds, 3),
+        'updates_per_second': round(sum(len(items) for items in work) / seconds),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        'errors': len(errors),
+    }
+
+
+def send_singly(client, items):
+    for emp_id, fields in items:
+        start = time.perf_counter()
+        status = client.put(f'/api/employees/{emp_id}/progress', json=fields).status_code
+        yield [time.perf_counter() - start], status
+
+
+def send_batches(batch_size):
+    def send(client, items):
+        for i in range(0, len(items), batch_size):
+            batch = [dict(fields, emp_id=emp_id) for emp_id, fields in items[i:i + batch_size]]
+            start = time.perf_counter()
+            status = client.patch('/api/progress', json={'updates': batch}).status_code
+            # Every update in the batch waited as long as the request.
+            yield [time.perf_counter() - start] * len(batch), status
+    return send
+
+
+def check(database, work):
+    expected = {}
+    for items in work:
+        for emp_id, fields in items:
+            expected[emp_id] = fields
+    conn = sqlite3.connect(database)
+    wrong = sum(
+        1 for emp_id, forms, videos, documents in conn.execute(
+            "SELECT emp_id, forms_completed, videos_completed, documents_uploaded FROM employees")
+        if emp_id in expected and (forms, videos, documents) != tuple(expected[emp_id].values())
+    )
+    conn.close()
+    return wrong
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--updates', type=int, default=4000)
+    parser.add_argument('--employees', type=int, default=2000)
+    parser.add_argument('--windows', default='2,5', help='group commit windows to try, in ms')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--directory', help='where to create the scratch database')
+    args = parser.parse_args()
+
+    app = app_module.app
+    runs = [('single_put', 0, send_singly)]
+    runs += [(f'group_commit_{ms}ms', float(ms), send_singly) for ms in args.windows.split(',') if ms]
+    runs.append((f'patch_batches_of_{args.batch_size}', 0, send_batches(args.batch_size)))
+
+    report = {'clients': args.clients, 'updates': args.updates}
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        database = os.path.join(directory, 'progress.db')
+        seeding.seed(database, args.employees, 0)
+        app.config.update(DATABASE=database)
+        for round_no, (name, window_ms, send) in enumerate(runs):
+            app.config['PROGRESS_GROUP_COMMIT_MS'] = window_ms
+            app.extensions.pop('progress_committer', None)
+            work = plan(args.updates, args.employees, args.clients, round_no)
+            result = run_clients(app, work, send)
+            result['wrong_rows'] = check(database, work)
+            committer = app.extensions.get('progress_committer')
+            if committer is not None:
+                stats = committer.stats()
+                result.update(commits=stats['batches'], updates_per_commit=stats['updates_per_batch'])
+            report[name] = result
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Serialization CPU time and bytes on the wire for 10k-row responses.
+
+Seeds a scratch database and fetches 10k employees, 10k tasks and the
+report over them through the app (in process, so CPU time is the
+server's work plus a little test-client overhead), with:
+
+- the standard-library JSON encoder and no compression (the old path)
+- orjson, identity, gzip and brotli (brotli only if installed)
+
+For the tasks list it also times serialization alone (the standard
+library against orjson), compares compression levels, and times the
+response cache serving a stored compressed body.
+
+    python -m benchmarks.bench_responses [--rows 10000] [--iterations 20]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from flask.json.provider import DefaultJSONProvider
+
+import app as app_module
+import encoding
+from benchmarks import seed as seeding
+from response_cache import get_cache
+
+LEVELS = {'gzip': (1, 4, 6, 9), 'br': (1, 3, 4, 5)}
+
+
+def timed_get(client, path, accept, iterations):
+    cpu, wall = [], []
+    for _ in range(iterations):
+        start_cpu, start_wall = time.process_time(), time.perf_counter()
+        response = client.get(path, headers={'Accept-Encoding': accept} if accept else {})
+        body = response.get_data()
+        cpu.append(time.process_time() - start_cpu)
+        wall.append(time.perf_counter() - start_wall)
+        assert response.status_code == 200, (path, response.status_code)
+    return body, {
+        'cpu_ms': round(statistics.mean(cpu) * 1000, 2),
+        'wall_ms': round(statistics.median(wall) * 1000, 2),
+        'bytes': len(body),
+        'content_encoding': response.headers.get('Content-Encoding'),
+    }
+
+
+def compare_serializers(items, iterations):
+    app = app_module.app
+    stdlib = DefaultJSONProvider(app)
+    fast = encoding.JSONProvider(app)
+    results = {}
+    for name, dumps in (('stdlib', lambda: stdlib.dumps(items, separators=(',', ':')).encode()),
+                        ('orjson', lambda: fast.dumps_bytes(items))):
+        start = time.process_time()
+        for _ in range(iterations):
+            body = dumps()
+        results[name] = {'cpu_ms': round((time.process_time() - start) / iterations * 1000, 2),
+                         'bytes': len(body)}
+    results['speedup'] = round(results['stdlib']['cpu_ms'] / results['orjson']['cpu_ms'], 1)
+    return results
+
+
+def compare_levels(body, iterations):
+    app = app_module.app
+    results = {}
+    for name, levels in LEVELS.items():
+        if name not in encoding.ENCODINGS:
+            continue
+        for level in levels:
+            key = 'COMPRESS_GZIP_LEVEL' if name == 'gzip' else 'COMPRESS_BROTLI_QUALITY'
+            default = app.config[key]
+            app.config[key] = level
+            try:
+                start = time.process_time()
+                for _ in range(iterations):
+                    data = encoding.compress(body, name, app)
+                seconds = (time.process_time() - start) / iterations
+            finally:
+                app.config[key] = default
+            results[f'{name}-{level}'] = {'cpu_ms': round(seconds * 1000, 2), 'bytes': len(data),
+                                          'ratio': round(len(body) / len(data), 1)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    app = app_module.app
+    paths = {
+        'employees': f'/api/employees?limit={args.rows}',
+        'tasks': f'/api/tasks?limit={args.rows}',
+        'report': '/api/report',
+    }
+    accepts = {'identity': None, 'gzip': 'gzip'}
+    if 'br' in encoding.ENCODINGS:
+        accepts['br'] = 'br'
+
+    report = {'orjson': encoding.orjson is not None, 'brotli': 'br' in encoding.ENCODINGS}
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'responses.db')
+        seeding.seed(database, args.rows, args.rows)
+        app.config.update(DATABASE=database, API_MAX_PAGE_SIZE=args.rows, RESPONSE_CACHE_ENABLED=False)
+        client = app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+        fast = encoding.orjson
+        for name, path in paths.items():
+            encoding.orjson = None
+            try:
+                plain, stdlib = timed_get(client, path, None, args.iterations)
+            finally:
+                encoding.orjson = fast
+            results = {'stdlib_identity': stdlib}
+            for accept_name, accept in accepts.items():
+                body, results[f'fast_{accept_name}'] = timed_get(client, path, accept, args.iterations)
+                if accept is None:
+                    assert json.loads(body) == json.loads(plain)
+            report[name] = results
+
+        tasks_body, _ = timed_get(client, paths['tasks'], None, 1)
+        if encoding.orjson is not None:
+            report['tasks_serialization'] = compare_serializers(json.loads(tasks_body), args.iterations)
+        report['tasks_levels'] = compare_levels(tasks_body, args.iterations)
+
+        # Cached route: the first response compresses, later ones reuse the body.
+        best = 'br' if 'br' in accepts else 'gzip'
+        app.config['RESPONSE_CACHE_ENABLED'] = True
+        get_cache(app).clear()
+        _, first = timed_get(client, paths['tasks'], best, 1)
+        _, hits = timed_get(client, paths['tasks'], best, args.iterations)
+        app.config['COMPRESS_ENABLED'] = False
+        _, uncompressed_hits = timed_get(client, paths['tasks'], None, args.iterations)
+        app.config['COMPRESS_ENABLED'] = True
+        report['tasks_cached'] = {'encoding': best, 'first_response': first, 'cache_hits': hits,
+                                  'identity_cache_hits': uncompressed_hits,
+                                  'compressions': get_cache(app).stats()['compressions']}
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
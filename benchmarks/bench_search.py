@@ -0,0 +1,116 @@
+"""
+/api/search latency on a seeded database. Times ``search.search`` over
+all three tables for a mix of queries (an exact name, a name prefix, an
+email, short prefixes, words that match a large share of the tasks, no
+match) and compares each with the LIKE scan the client-side filtering
+amounts to.
+
+    python -m benchmarks.bench_search [--employees 50000] [--tasks 1000000]
+    python -m benchmarks.bench_search --database /tmp/bench.db  # reuse a seeded database
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import search
+from benchmarks import seed as seeding
+
+QUERIES = {
+    'exact_name': 'First12345 Last12345',
+    'name_prefix': 'first12',
+    'one_letter': 'f',
+    'email': 'employee4242@example',
+    'short_prefix': 'la',
+    'common_word': 'training',
+    'two_prefixes': 'secu train',
+    'department': 'engineering',
+    'no_match': 'zzzz',
+}
+LIKE_COLUMNS = {
+    'employees': ('first_name', 'last_name', 'email', 'position', 'department'),
+    'tasks': ('task_name', 'category'),
+    'training_videos': ('title',),
+}
+
+
+def like_scan(conn, query, limit):
+    """Every word as a substring of some column, the way the dashboard filtered rows."""
+    words = query.split()
+    results = {}
+    for table, columns in LIKE_COLUMNS.items():
+        clause = ' AND '.join(
+            '(' + ' OR '.join(f"{column} LIKE ?" for column in columns) + ')' for _ in words
+        )
+        params = [f'%{word}%' for word in words for _ in columns]
+        results[table] = conn.execute(
+            f"SELECT * FROM {table} WHERE {clause} ORDER BY id DESC LIMIT ?", (*params, limit)
+        ).fetchall()
+    return results
+
+
+def timed(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return result, {
+        'p50_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(samples[int(len(samples) * 0.95) - 1], 3),
+        'max_ms': round(samples[-1], 3),
+    }
+
+
+def run(database, iterations, like_iterations, limit):
+    conn = sqlite3.connect(database)
+    conn.row_factory = sqlite3.Row
+    report = {'tasks': conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0],
+              'employees': conn.execute("SELECT COUNT(*) FROM employees").fetchone()[0]}
+    try:
+        report['fts_mib'] = round(conn.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name LIKE '%\\_fts\\_%' ESCAPE '\\'"
+        ).fetchone()[0] / 2 ** 20, 1)
+    except sqlite3.OperationalError:
+        pass  # SQLite built without dbstat
+
+    for name, query in QUERIES.items():
+        results, fts = timed(lambda: search.search(conn, query, limit), iterations)
+        _, like = timed(lambda: like_scan(conn, query, limit), like_iterations)
+        report[name] = {
+            'query': query,
+            'hits': {table: len(rows) for table, rows in results.items()},
+            'fts': fts,
+            'like_scan': like,
+        }
+    conn.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--database', help='a database already seeded by benchmarks.seed')
+    parser.add_argument('--employees', type=int, default=50000)
+    parser.add_argument('--tasks', type=int, default=1000000)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--like-iterations', type=int, default=3)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.database:
+        report = run(args.database, args.iterations, args.like_iterations, args.limit)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            database = os.path.join(directory, 'search.db')
+            seeded = seeding.seed(database, args.employees, args.tasks)
+            report = dict(seed_seconds=seeded['seconds'],
+                          **run(database, args.iterations, args.like_iterations, args.limit))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
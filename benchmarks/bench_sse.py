@@ -0,0 +1,190 @@
+"""
+Cost of idle /api/events subscribers. Starts a server on a scratch
+database, measures its CPU time over an idle window with no streams, then
+opens ``--subscribers`` streams and measures again over the same window
+(heartbeats included). Finally makes one write and times how long every
+stream takes to receive it. CPU and memory come from /proc (Linux only)
+and cover every server process.
+
+    python -m benchmarks.bench_sse [--server dev|gthread|gevent] [--subscribers 300]
+"""
+import argparse
+import json
+import os
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_deploy import ROOT, free_port, memory, process_tree, wait_until_up
+from benchmarks.loadtest import HttpClient
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+
+
+def cpu_seconds(pid):
+    total = 0
+    for child in process_tree(pid):
+        try:
+            with open(f'/proc/{child}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        total += int(fields[11]) + int(fields[12])  # utime, stime
+    return total / CLOCK_TICKS
+
+
+def idle_cpu(pid, seconds, streams=None):
+    """CPU seconds the server uses over ``seconds`` while streams are only drained."""
+    start = cpu_seconds(pid)
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        if streams:
+            streams.drain(deadline - time.monotonic())
+        else:
+            time.sleep(deadline - time.monotonic())
+    return cpu_seconds(pid) - start
+
+
+class Streams:
+    """Many raw SSE connections drained from one thread."""
+
+    def __init__(self, port, cookie, count):
+        self.selector = selectors.DefaultSelector()
+        self.received = {}  # the tail of each stream
+        self.sockets = []
+        request = f"GET /api/events HTTP/1.1\r\nHost: bench\r\nCookie: {cookie}\r\n\r\n".encode()
+        for i in range(count):
+            sock = socket.create_connection(('127.0.0.1', port))
+            sock.sendall(request)
+            sock.setblocking(False)
+            self.selector.register(sock, selectors.EVENT_READ, i)
+            self.sockets.append(sock)
+            self.received[i] = b''
+
+    def drain(self, timeout):
+        """Read whatever has arrived; returns {stream: arrival time} for new event frames."""
+        arrivals = {}
+        for key, _ in self.selector.select(max(timeout, 0)):
+            try:
+                data = key.fileobj.recv(65536)
+            except BlockingIOError:
+                continue
+            if not data:
+                self.selector.unregister(key.fileobj)
+                continue
+            self.received[key.data] = (self.received[key.data] + data)[-4096:]
+            if b'id: ' in data:
+                arrivals[key.data] = time.perf_counter()
+        return arrivals
+
+    def wait_connected(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            self.drain(0.1)
+            if all(b'retry:' in body for body in self.received.values()):
+                return
+        raise RuntimeError("not every stream connected")
+
+    def close(self):
+        for sock in self.sockets:
+            sock.close()
+
+
+def fan_out(port, cookie, streams, timeout=30):
+    client = HttpClient(f'http://127.0.0.1:{port}')
+    status, body = client.call('POST', '/api/employees', {
+        'firstName': 'Fan', 'lastName': 'Out', 'email': 'fan@example.com',
+        'position': 'Engineer', 'department': 'Engineering', 'startDate': '2030-01-01'})
+    if status != 201:
+        raise RuntimeError(f"write failed: {status} {body[:200]}")
+    start = time.perf_counter()
+    first = {}
+    deadline = time.monotonic() + timeout
+    while len(first) < len(streams.sockets) and time.monotonic() < deadline:
+        for stream, at in streams.drain(0.05).items():
+            first.setdefault(stream, at - start)
+    delays = sorted(first.values())
+    return {
+        'delivered': len(delays),
+        'p50_ms': round(delays[len(delays) // 2] * 1000, 1) if delays else None,
+        'max_ms': round(delays[-1] * 1000, 1) if delays else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--server', choices=('dev', 'gthread', 'gevent'), default='dev')
+    parser.add_argument('--subscribers', type=int, default=300)
+    parser.add_argument('--seconds', type=float, default=10, help='length of each idle window')
+    parser.add_argument('--heartbeat', type=float, default=5)
+    args = parser.parse_args()
+
+    commands = {
+        'dev': [sys.executable, '-c',
+                'import os, wsgi; wsgi.app.run(port=int(os.environ["PORT"]), threaded=True)'],
+        'gthread': [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'),
+                    '--chdir', ROOT, 'wsgi:app'],
+    }
+    commands['gevent'] = commands['gthread']
+
+    with tempfile.TemporaryDirectory() as directory:
+        port = free_port()
+        env = dict(
+            os.environ, PORT=str(port), PYTHONPATH=ROOT, PYTHONWARNINGS='ignore',
+            ONBOARDING_DATABASE=os.path.join(directory, 'bench.db'),
+            ONBOARDING_MODEL_PRELOAD='false', ONBOARDING_MODEL_WARMUP='false',
+            ONBOARDING_SSE_HEARTBEAT_SECONDS=str(args.heartbeat),
+            ONBOARDING_SSE_MAX_SUBSCRIBERS=str(args.subscribers + 10),
+            GUNICORN_WORKERS='1',
+            # gthread needs a thread per open stream, plus some for requests.
+            GUNICORN_THREADS=str(args.subscribers + 8),
+            GUNICORN_WORKER_CLASS='gevent' if args.server == 'gevent' else 'gthread',
+        )
+        log_path = os.path.join(directory, 'server.log')
+        with open(log_path, 'w') as log:
+            process = subprocess.Popen(commands[args.server], cwd=ROOT, env=env, start_new_session=True,
+                                       stdout=log, stderr=subprocess.STDOUT)
+        streams = None
+        try:
+            wait_until_up(port, process)
+            cookie = HttpClient(f'http://127.0.0.1:{port}').cookie
+            time.sleep(1)
+            baseline = idle_cpu(process.pid, args.seconds)
+            rss_before = sum(memory(pid).get('rss_mib', 0) for pid in process_tree(process.pid))
+
+            streams = Streams(port, cookie, args.subscribers)
+            streams.wait_connected()
+            subscribed = idle_cpu(process.pid, args.seconds, streams)
+            rss_after = sum(memory(pid).get('rss_mib', 0) for pid in process_tree(process.pid))
+            delivery = fan_out(port, cookie, streams)
+        except Exception:
+            with open(log_path) as log:
+                sys.stderr.write("--- server log ---\n" + log.read()[-4000:])
+            raise
+        finally:
+            if streams:
+                streams.close()
+            os.killpg(process.pid, signal.SIGTERM)
+            process.wait(timeout=30)
+
+    print(json.dumps({
+        'server': args.server,
+        'subscribers': args.subscribers,
+        'idle_window_seconds': args.seconds,
+        'heartbeat_seconds': args.heartbeat,
+        'cpu_seconds_no_subscribers': round(baseline, 3),
+        'cpu_seconds_with_subscribers': round(subscribed, 3),
+        'cpu_percent_with_subscribers': round(subscribed / args.seconds * 100, 2),
+        'rss_mib_before': round(rss_before, 1),
+        'rss_mib_after': round(rss_after, 1),
+        'rss_kib_per_subscriber': round((rss_after - rss_before) * 1024 / args.subscribers, 1),
+        'fan_out': delivery,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
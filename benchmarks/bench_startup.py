@@ -0,0 +1,101 @@
+"""
+Cold-start cost of a worker: time and resident memory to import app.py,
+and to serve the first prediction from the pickle (compiling the
+artifact) and from the memory-mapped compiled artifact. The eager
+pandas + joblib.load path app.py used to run at import is measured for
+comparison. Each scenario runs in a fresh interpreter.
+
+    python -m benchmarks.bench_startup [--runs 5]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Runs in the child; prints a JSON object on its last line.
+PROBE = '''
+import json, os, sys, time, warnings
+warnings.filterwarnings('ignore')
+
+def memory():
+    fields = {}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'RssAnon', 'RssFile'):
+                    fields[key] = int(value.split()[0]) // 1024
+    except OSError:
+        import resource
+        fields['VmRSS'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+    return fields
+
+scenario, model_path = sys.argv[1], sys.argv[2]
+start = time.perf_counter()
+if scenario == 'legacy':
+    import pandas, joblib
+    import app
+    joblib.load(model_path)
+else:
+    import app
+    app.app.config['MODEL_PATH'] = model_path
+    if scenario != 'import':
+        app.predict_records([{'time_spent_hours': 3, 'task_type': 'Training', 'previous_delays': 1}])
+elapsed = time.perf_counter() - start
+result = {'seconds': elapsed, 'sklearn_imported': 'sklearn' in sys.modules}
+result.update(memory())
+print(json.dumps(result))
+'''
+
+SCENARIOS = (
+    ('import', 'import app (no model)'),
+    ('first_prediction_pickle', 'import + first prediction, no compiled artifact'),
+    ('first_prediction_compiled', 'import + first prediction, memory-mapped artifact'),
+    ('legacy', 'import pandas + app + joblib.load (previous startup)'),
+)
+
+
+def probe(scenario, model_path, cwd):
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, scenario, model_path],
+        cwd=cwd, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--model', default='progress_model.pkl')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    from inference import compiled_path
+
+    cwd = os.getcwd()
+    report = {}
+    with tempfile.TemporaryDirectory() as directory:
+        model_path = os.path.join(directory, 'model.pkl')
+        shutil.copy2(args.model, model_path)
+        for scenario, description in SCENARIOS:
+            runs = []
+            for _ in range(args.runs):
+                if scenario == 'first_prediction_pickle' and os.path.exists(compiled_path(model_path)):
+                    os.remove(compiled_path(model_path))
+                runs.append(probe(scenario, model_path, cwd))
+            report[scenario] = {
+                'description': description,
+                'median_ms': round(statistics.median(r['seconds'] for r in runs) * 1000, 1),
+                'rss_mib': statistics.median(r['VmRSS'] for r in runs),
+                'rss_anon_mib': statistics.median(r.get('RssAnon', 0) for r in runs),
+                'rss_file_mib': statistics.median(r.get('RssFile', 0) for r in runs),
+                'sklearn_imported': runs[-1]['sklearn_imported'],
+            }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
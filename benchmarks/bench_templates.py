@@ -0,0 +1,79 @@
+"""
+Template fan-out: apply a K-item template to N employees with one
+POST /api/templates/<id>/apply, versus creating the same tasks with one
+POST /api/tasks each, on scratch databases.
+
+    python -m benchmarks.bench_templates [--employees 1000] [--items 10]
+"""
+import argparse
+import json
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.bench_bulk_import import csv_body, fresh_client
+
+
+def seed(client, employees, items):
+    response = client.post('/api/employees/bulk', data=csv_body(employees), content_type='text/csv')
+    if response.status_code != 201:
+        raise AssertionError(f"seeding employees failed: {response.status_code}")
+    template = {
+        'name': 'Benchmark',
+        'items': [
+            {'task_name': f'Task {i}', 'category': 'Onboarding', 'due_offset_days': i}
+            for i in range(items)
+        ],
+    }
+    template_id = client.post('/api/templates', json=template).get_json()['id']
+    employee_rows = client.get('/api/employees', query_string={'limit': employees}).get_json()['items']
+    return template_id, template['items'], employee_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--employees', type=int, default=1000)
+    parser.add_argument('--items', type=int, default=10)
+    args = parser.parse_args()
+    tasks = args.employees * args.items
+
+    with tempfile.TemporaryDirectory() as directory:
+        client = fresh_client(directory, 'apply.db')
+        template_id, _, employees = seed(client, args.employees, args.items)
+        start = time.perf_counter()
+        response = client.post(f'/api/templates/{template_id}/apply',
+                               json={'emp_ids': [e['emp_id'] for e in employees]})
+        apply_seconds = time.perf_counter() - start
+        if response.get_json()['tasks_created'] != tasks:
+            raise AssertionError(f"apply created {response.get_json()['tasks_created']} tasks")
+
+        client = fresh_client(directory, 'loop.db')
+        _, items, employees = seed(client, args.employees, args.items)
+        start = time.perf_counter()
+        for employee in employees:
+            start_date = date.fromisoformat(employee['start_date'])
+            for item in items:
+                response = client.post('/api/tasks', json={
+                    'emp_id': employee['emp_id'],
+                    'emp_name': f"{employee['first_name']} {employee['last_name']}",
+                    'task_name': item['task_name'],
+                    'category': item['category'],
+                    'assigned_by': 'admin',
+                    'due_date': (start_date + timedelta(days=item['due_offset_days'])).isoformat(),
+                })
+                if response.status_code != 201:
+                    raise AssertionError(f"POST /api/tasks failed: {response.status_code}")
+        loop_seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        'employees': args.employees,
+        'items': args.items,
+        'tasks': tasks,
+        'apply': {'seconds': round(apply_seconds, 3), 'tasks_per_second': round(tasks / apply_seconds)},
+        'post_loop': {'seconds': round(loop_seconds, 3), 'tasks_per_second': round(tasks / loop_seconds)},
+        'speedup': round(loop_seconds / apply_seconds, 1),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
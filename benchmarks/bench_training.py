@@ -0,0 +1,144 @@
+"""
+Training pipeline timings at several sizes, plus a hot-reload check.
+
+For each ``--rows`` size:
+
+- labeling: the original row-wise ``DataFrame.apply`` against
+  ``training.label_rule`` on the same synthetic inputs
+- database: a database seeded with that many tasks, timed through
+  ``training.train_from_database`` (query, features, fit, publish) with
+  ``n_jobs=1`` and ``n_jobs=-1``
+
+The reload check serves predictions from a ModelStore on several threads
+while new versions are published underneath it, and reports how many
+requests failed and the slowest one.
+
+    python -m benchmarks.bench_training [--rows 10000 1000000] [--estimators 100]
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import training
+from benchmarks import seed as seeding
+from inference import ModelStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TASKS_PER_EMPLOYEE = 20
+
+
+def time_labeling(n):
+    import pandas as pd
+
+    hours, task_types, previous, _ = training.synthetic_outcomes(n)
+    data = pd.DataFrame({'time_spent_hours': hours, 'task_type': task_types, 'previous_delays': previous})
+
+    def label(row):
+        if row['time_spent_hours'] < 5 or row['previous_delays'] > 2:
+            return 1
+        return 0
+
+    start = time.perf_counter()
+    rowwise = data.apply(label, axis=1).to_numpy()
+    apply_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    vectorized = training.label_rule(data['time_spent_hours'].to_numpy(), data['previous_delays'].to_numpy())
+    vector_seconds = time.perf_counter() - start
+    assert np.array_equal(rowwise, vectorized)
+    return {'apply_seconds': round(apply_seconds, 3), 'vectorized_seconds': round(vector_seconds, 5),
+            'speedup': round(apply_seconds / vector_seconds, 1)}
+
+
+def time_database(n, directory, estimators):
+    database = os.path.join(directory, f'train-{n}.db')
+    seeded = seeding.seed(database, max(n // TASKS_PER_EMPLOYEE, 1), n)
+    model_path = os.path.join(directory, 'progress_model.pkl')
+    shutil.copy2(os.path.join(ROOT, 'progress_model.pkl'), model_path)
+
+    conn = sqlite3.connect(database)
+    try:
+        results = {'seed_seconds': seeded['seconds']}
+        for n_jobs in (1, -1):
+            start = time.perf_counter()
+            result = training.train_from_database(conn, model_path, n_estimators=estimators, n_jobs=n_jobs)
+            result['total_seconds'] = round(time.perf_counter() - start, 3)
+            result.pop('path')
+            results[f'n_jobs={n_jobs}'] = result
+        return results
+    finally:
+        conn.close()
+        os.remove(database)
+
+
+def reload_check(directory, threads=4, publishes=3, estimators=20):
+    model_path = os.path.join(directory, 'reload', 'progress_model.pkl')
+    os.makedirs(os.path.dirname(model_path))
+    shutil.copy2(os.path.join(ROOT, 'progress_model.pkl'), model_path)
+    store = ModelStore(model_path, check_interval=0.05)
+    store.get()
+
+    stop = threading.Event()
+    counts = {'requests': 0, 'errors': 0, 'max_ms': 0.0}
+    lock = threading.Lock()
+    records = [{'time_spent_hours': h, 'task_type': 'Training', 'previous_delays': h % 4} for h in range(1, 30)]
+
+    def serve():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                store.predict_proba(records)
+                failed = 0
+            except Exception:
+                failed = 1
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                counts['requests'] += 1
+                counts['errors'] += failed
+                counts['max_ms'] = max(counts['max_ms'], elapsed)
+
+    workers = [threading.Thread(target=serve) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for i in range(publishes):
+        time.sleep(0.3)
+        hours, task_types, previous, labels = training.synthetic_outcomes(2000, seed=i)
+        model, metrics = training.train(training.build_frame(hours, task_types, previous), labels,
+                                        n_estimators=estimators)
+        training.publish(model, model_path, dict(metrics, source='synthetic'))
+    time.sleep(0.5)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    return dict(counts, max_ms=round(counts['max_ms'], 2), publishes=publishes,
+                model_loads=store.loads, last_load_ms=store.stats()['last_load_ms'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 1000000])
+    parser.add_argument('--estimators', type=int, default=100)
+    args = parser.parse_args()
+
+    # Import scikit-learn up front so the first timed run is not charged for it.
+    import sklearn.ensemble  # noqa: F401
+
+    report = {'cpus': len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()}
+    with tempfile.TemporaryDirectory() as directory:
+        for n in args.rows:
+            report[str(n)] = {
+                'labeling': time_labeling(n),
+                'database': time_database(n, directory, args.estimators),
+            }
+        report['hot_reload'] = reload_check(directory)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,328 @@
+"""
+Drive every /api route at a fixed concurrency and report per-endpoint
+latency percentiles and throughput as JSON.
+
+By default requests go through the Flask test client against a database
+seeded by ``benchmarks.seed`` (created first if missing); with ``--url``
+they go over HTTP to a running server instead. Each endpoint is measured
+on its own: ``--requests`` calls spread over ``--concurrency`` threads,
+each with its own logged-in client. Save the output of two commits and
+pass one as ``--compare`` to flag latency regressions.
+
+Routes left out on purpose:
+
+- the DELETE routes (employees, tasks, templates), which would remove the
+  sample rows the other endpoints are measured against; a delete costs
+  the same single-row write and triggers as ``update_task``
+- ``/api/events``, a long-lived stream (``benchmarks.bench_sse``)
+- ``/api/tasks/send-reminders`` and ``/api/reminders/jobs/<id>``, which
+  queue real reminder sends for every overdue task on each call
+
+    python -m benchmarks.loadtest --database /tmp/bench.db --size medium --output after.json
+    python -m benchmarks.loadtest --url http://127.0.0.1:5000 --compare before.json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks import seed as seeding
+
+# name: (method, path template, JSON body or None). Templates are filled
+# from sample IDs and ``{seq}``, unique per request; a body may also be a
+# function of those values. Routes that change data are flagged and left
+# out with --read-only.
+ENDPOINTS = {
+    'employees_page': ('GET', '/api/employees?limit=100', None),
+    'employees_by_department': ('GET', '/api/employees?department=Engineering&limit=100', None),
+    'employee_detail': ('GET', '/api/employees/{emp_id}', None),
+    'tasks_page': ('GET', '/api/tasks?limit=100', None),
+    'tasks_by_employee': ('GET', '/api/tasks?emp_id={emp_id}', None),
+    'tasks_delayed': ('GET', '/api/tasks?auto_status=Delayed&limit=100', None),
+    'training_videos': ('GET', '/api/training-videos', None),
+    'templates': ('GET', '/api/templates', None),
+    'template_detail': ('GET', '/api/templates/{template_id}', None),
+    'stats': ('GET', '/api/stats', None),
+    'dashboard': ('GET', '/api/dashboard?employees.limit=100&tasks.limit=100', None),
+    'report': ('GET', '/api/report?format=ndjson', None),
+    'report_delayed': ('GET', '/api/report?format=ndjson&auto_status=Delayed', None),
+    'search': ('GET', '/api/search?q=first1', None),
+    'changes': ('GET', '/api/changes?limit=100', None),
+    'check_auth': ('GET', '/api/check-auth', None),
+    'pool_stats': ('GET', '/api/db/pool-stats', None),
+    'cache_stats': ('GET', '/api/cache/stats', None),
+    'events_stats': ('GET', '/api/events/stats', None),
+    'predict_stats': ('GET', '/api/predict-progress/stats', None),
+    'predict': ('POST', '/api/predict-progress',
+                {'time_spent_hours': 3, 'task_type': 'Training', 'previous_delays': 1}),
+    'predict_batch': ('POST', '/api/predict-progress/batch',
+                      [{'time_spent_hours': h, 'task_type': 'Onboarding', 'previous_delays': h % 4}
+                       for h in range(1, 101)]),
+    'update_task': ('PUT', '/api/tasks/{task_id}', {'status': 'In Progress'}),
+    'update_progress': ('PUT', '/api/employees/{emp_id}/progress', {'forms_completed': 1}),
+    'update_progress_batch': ('PATCH', '/api/progress', lambda values: {'updates': [
+        {'emp_id': emp_id, 'forms_completed': 1} for emp_id in values['emp_ids'][:100]
+    ]}),
+    'update_employee': ('PUT', '/api/employees/{emp_id}',
+                        {'firstName': 'Load', 'lastName': 'Test', 'email': 'load.test@example.com',
+                         'position': 'Engineer', 'department': 'Engineering', 'startDate': '2024-01-01'}),
+    'add_employee': ('POST', '/api/employees',
+                     {'firstName': 'Load', 'lastName': 'Test', 'email': 'load.test@example.com',
+                      'position': 'Engineer', 'department': 'Engineering', 'startDate': '2024-01-01'}),
+    'bulk_import': ('POST', '/api/employees/bulk',
+                    [{'firstName': 'Load', 'lastName': f'Test{n}', 'email': f'load.test{n}@example.com',
+                      'position': 'Engineer', 'department': 'Engineering', 'startDate': '2024-01-01'}
+                     for n in range(100)]),
+    'add_task': ('POST', '/api/tasks',
+                 {'emp_id': '{emp_id}', 'emp_name': 'Load Test', 'task_name': 'Load test task',
+                  'category': 'Other', 'assigned_by': 'admin', 'due_date': '2030-01-01'}),
+    'add_template': ('POST', '/api/templates',
+                     {'name': 'Load test {seq}', 'items': [
+                         {'task_name': 'Load test task', 'category': 'Other', 'due_offset_days': 7}]}),
+    'apply_template': ('POST', '/api/templates/{template_id}/apply', {'emp_id': '{emp_id}'}),
+    'add_training_video': ('POST', '/api/training-videos',
+                           {'title': 'Load test video', 'duration': '5:00', 'category': 'Other',
+                            'url': 'https://example.com/load-test'}),
+}
+WRITES = {'update_task', 'update_progress', 'update_progress_batch', 'update_employee', 'add_employee',
+          'bulk_import', 'add_task', 'add_template', 'apply_template', 'add_training_video'}
+SAMPLE_IDS = 200
+
+
+class HttpClient:
+    """A logged-in keep-alive HTTP connection."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        self.cookie = None
+        self.request('POST', '/login', urlencode({'username': 'admin', 'password': 'admin123'}),
+                     {'Content-Type': 'application/x-www-form-urlencoded'})
+        if self.cookie is None:
+            raise RuntimeError("login failed")
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        self.conn.request(method, path, body=body, headers=headers)
+        response = self.conn.getresponse()
+        data = response.read()
+        cookie = response.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        return response.status, data
+
+    def call(self, method, path, payload=None):
+        if payload is None:
+            return self.request(method, path)
+        return self.request(method, path, json.dumps(payload), {'Content-Type': 'application/json'})
+
+
+class TestClient:
+    """The same interface over the Flask test client."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+        self.client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+    def call(self, method, path, payload=None):
+        response = self.client.open(path, method=method, json=payload)
+        data = response.get_data()
+        return response.status_code, data
+
+
+def fill(value, ids):
+    if callable(value):
+        return value(ids)
+    if isinstance(value, str):
+        return value.format(**ids)
+    if isinstance(value, dict):
+        return {key: fill(item, ids) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill(item, ids) for item in value]
+    return value
+
+
+def sample_ids(client):
+    """Existing emp_ids, task ids and template ids to spread per-item requests over."""
+    _, body = client.call('GET', f'/api/employees?limit={SAMPLE_IDS}&fields=emp_id')
+    emp_ids = [row['emp_id'] for row in json.loads(body)['items']]
+    _, body = client.call('GET', f'/api/tasks?limit={SAMPLE_IDS}&fields=id')
+    task_ids = [row['id'] for row in json.loads(body)['items']]
+    if not emp_ids or not task_ids:
+        raise RuntimeError("the database has no employees or tasks; seed it first")
+    _, body = client.call('GET', '/api/templates')
+    template_ids = [template['id'] for template in json.loads(body)]
+    if not template_ids:
+        _, body = client.call('POST', '/api/templates', {'name': 'Load test', 'items': [
+            {'task_name': 'Load test task', 'category': 'Other', 'due_offset_days': 7}]})
+        template_ids = [json.loads(body)['id']]
+    return {'emp_id': emp_ids, 'task_id': task_ids, 'template_id': template_ids}
+
+
+def percentile(sorted_samples, p):
+    if len(sorted_samples) == 1:
+        return sorted_samples[0]
+    return statistics.quantiles(sorted_samples, n=100, method='inclusive')[p - 1]
+
+
+def measure(make_client, method, path, payload, ids, requests, concurrency):
+    latencies, errors = [], []
+    run = f"{os.getpid()}-{time.time_ns()}"
+    counter = iter(range(requests))
+    lock = threading.Lock()
+
+    def worker():
+        client = make_client()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            values = {name: sample[i % len(sample)] for name, sample in ids.items()}
+            values.update(seq=f"{run}-{i}", emp_ids=ids['emp_id'])
+            start = time.perf_counter()
+            status, _ = client.call(method, fill(path, values), fill(payload, values))
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+                if status >= 400:
+                    errors.append(status)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_second': round(len(latencies) / wall, 1),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def dataset(database):
+    if not database:
+        return None
+    conn = sqlite3.connect(database)
+    try:
+        return dict(zip(('employees', 'tasks'), conn.execute(
+            "SELECT (SELECT COUNT(*) FROM employees), (SELECT COUNT(*) FROM tasks)"
+        ).fetchone()))
+    finally:
+        conn.close()
+
+
+def compare(report, baseline, threshold):
+    """Per-endpoint p50/p99 ratios against ``baseline``; lists regressions over ``threshold``."""
+    ratios, regressions = {}, []
+    for name, result in report['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if not before:
+            continue
+        ratio = {
+            key: round(result[key] / before[key], 2) if before[key] else None
+            for key in ('p50_ms', 'p99_ms')
+        }
+        ratios[name] = ratio
+        if any(r is not None and r > threshold for r in ratio.values()):
+            regressions.append(name)
+    return {'baseline_commit': baseline.get('meta', {}).get('commit'), 'threshold': threshold,
+            'ratios': ratios, 'regressions': regressions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--database', help='run in-process against this database (seeded if missing)')
+    target.add_argument('--url', help='run over HTTP against a running server')
+    parser.add_argument('--size', choices=sorted(seeding.SIZES), default='small',
+                        help='dataset size when seeding --database')
+    parser.add_argument('--requests', type=int, default=500, help='requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--endpoints', nargs='+', choices=sorted(ENDPOINTS), help='default: all')
+    parser.add_argument('--read-only', action='store_true', help='skip routes that modify data')
+    parser.add_argument('--no-response-cache', action='store_true',
+                        help='in-process only: disable the ETag response cache')
+    parser.add_argument('--output', help='also write the JSON report here')
+    parser.add_argument('--compare', help='baseline report to compare against')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='latency ratio above which --compare reports a regression')
+    args = parser.parse_args()
+
+    if args.url:
+        def make_client():
+            return HttpClient(args.url)
+    else:
+        if not os.path.exists(args.database):
+            employees, tasks = seeding.SIZES[args.size]
+            seeding.seed(args.database, employees, tasks)
+        app = seeding.app_module.app
+        app.config['DATABASE'] = args.database
+        app.config['RESPONSE_CACHE_ENABLED'] = not args.no_response_cache
+        seeding.app_module.init_db()
+
+        def make_client():
+            return TestClient(app)
+
+    names = args.endpoints or list(ENDPOINTS)
+    if args.read_only:
+        names = [name for name in names if name not in WRITES]
+    ids = sample_ids(make_client())
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'target': args.url or 'test_client',
+            'dataset': dataset(args.database),
+            'requests_per_endpoint': args.requests,
+            'concurrency': args.concurrency,
+        },
+        'endpoints': {},
+    }
+    for name in names:
+        method, path, payload = ENDPOINTS[name]
+        report['endpoints'][name] = measure(make_client, method, path, payload, ids,
+                                            args.requests, args.concurrency)
+
+    if args.compare:
+        with open(args.compare) as f:
+            report['comparison'] = compare(report, json.load(f), args.threshold)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+    if report.get('comparison', {}).get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Seed a SQLite database with synthetic onboarding data for benchmarks.
+
+The schema comes from the app's own migrations. Employees get start dates
+spread over the last few months with a few future hires; each gets
+tasks assigned around their start date with due dates a few days to a
+few weeks later. Statuses follow the task's age (old tasks are mostly
+completed, new ones mostly assigned), so auto_status, overdue counts
+and reminder candidates all have realistic shares. Output is
+deterministic for a given ``--seed``.
+
+    python -m benchmarks.seed --database /tmp/bench.db --size medium
+    python -m benchmarks.seed --database /tmp/bench.db --employees 5000 --tasks 250000
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+import app as app_module
+from employees import format_emp_id
+
+# name: (employees, tasks)
+SIZES = {
+    'small': (100, 1000),
+    'medium': (10000, 100000),
+    'large': (50000, 1000000),
+}
+
+DEPARTMENTS = (('Engineering', 35), ('Sales', 20), ('Operations', 15), ('Support', 12),
+               ('Finance', 8), ('HR', 5), ('Marketing', 5))
+POSITIONS = ('Analyst', 'Engineer', 'Senior Engineer', 'Manager', 'Associate', 'Specialist')
+TASKS = (
+    ('Sign employment contract', 'Documentation'),
+    ('Submit tax forms', 'Documentation'),
+    ('Upload ID documents', 'Documentation'),
+    ('Laptop setup', 'Onboarding'),
+    ('Meet your buddy', 'Onboarding'),
+    ('Team introduction', 'Onboarding'),
+    ('Security awareness training', 'Training'),
+    ('Product overview video', 'Training'),
+    ('Code of conduct course', 'Training'),
+    ('First project kickoff', 'Other'),
+)
+ASSIGNERS = ('admin', 'hr')
+CHUNK = 10000
+
+
+def _employees(rng, count, today):
+    departments = [name for name, _ in DEPARTMENTS]
+    weights = [weight for _, weight in DEPARTMENTS]
+    for i in range(1, count + 1):
+        start = today + timedelta(days=rng.randint(-150, 30))
+        # Hires further in are further along; completion counts stay within totals.
+        done = 1 if start < today - timedelta(days=rng.randint(7, 60)) else 0
+        yield (
+            format_emp_id(i), f'First{i}', f'Last{i}', f'employee{i}@example.com',
+            rng.choice(POSITIONS), rng.choices(departments, weights)[0], start.isoformat(),
+            done, done if rng.random() < 0.8 else 0, done if rng.random() < 0.9 else 0,
+        )
+
+
+def _tasks(rng, count, employees, today):
+    for _ in range(count):
+        emp_id, first, last, start = employees[rng.randrange(len(employees))]
+        task_name, category = TASKS[rng.randrange(len(TASKS))]
+        assigned = start + timedelta(days=rng.randint(-7, 14))
+        due = assigned + timedelta(days=rng.randint(3, 30))
+        age = (today - assigned).days
+        completed_date = None
+        if age < 0:
+            status = 'Assigned'
+        else:
+            roll = rng.random()
+            p_done = min(0.95, age / 60)
+            if roll < p_done:
+                status = 'Completed'
+                completed_date = min(today, assigned + timedelta(days=rng.randint(0, 20))).isoformat()
+            elif roll < p_done + (1 - p_done) * 0.4:
+                status = 'In Progress'
+            elif roll < p_done + (1 - p_done) * 0.5:
+                status = 'Not Started'
+            else:
+                status = 'Assigned'
+        yield (emp_id, f'{first} {last}', task_name, category, rng.choice(ASSIGNERS),
+               assigned.isoformat(), due.isoformat(), status, completed_date)
+
+
+def _chunks(rows, size=CHUNK):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def seed(database, employees, tasks, seed=0, today=None):
+    """
+    Create ``database`` (which must not exist) with the app schema, the
+    default users and videos, and the requested numbers of employees and
+    tasks. Returns a summary dict.
+    """
+    if os.path.exists(database):
+        raise FileExistsError(database)
+    today = today or date.today()
+    rng = random.Random(seed)
+    started = time.perf_counter()
+
+    app_module.app.config['DATABASE'] = database
+    app_module.init_db()
+    app_module.insert_default_videos()
+
+    conn = sqlite3.connect(database)
+    conn.execute("PRAGMA synchronous = OFF")
+    with conn:
+        for chunk in _chunks(_employees(rng, employees, today)):
+            conn.executemany('''
+                INSERT INTO employees
+                (emp_id, first_name, last_name, email, position, department, start_date,
+                 forms_completed, videos_completed, documents_uploaded)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', chunk)
+        conn.execute("UPDATE id_sequences SET next_value = ? WHERE name = 'employees'", (employees + 1,))
+
+    people = [
+        (emp_id, first, last, date.fromisoformat(start))
+        for emp_id, first, last, start in conn.execute(
+            "SELECT emp_id, first_name, last_name, start_date FROM employees"
+        )
+    ]
+    with conn:
+        for chunk in _chunks(_tasks(rng, tasks, people, today) if people else ()):
+            conn.executemany('''
+                INSERT INTO tasks
+                (emp_id, emp_name, task_name, category, assigned_by, assigned_date, due_date,
+                 status, completed_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', chunk)
+    conn.execute("ANALYZE")
+    conn.close()
+
+    return {
+        'database': database,
+        'employees': employees,
+        'tasks': tasks if people else 0,
+        'seed': seed,
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--database', required=True)
+    parser.add_argument('--size', choices=sorted(SIZES), default='small')
+    parser.add_argument('--employees', type=int, help='overrides --size')
+    parser.add_argument('--tasks', type=int, help='overrides --size')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    employees, tasks = SIZES[args.size]
+    print(json.dumps(seed(
+        args.database,
+        args.employees if args.employees is not None else employees,
+        args.tasks if args.tasks is not None else tasks,
+        seed=args.seed,
+    ), indent=2))
+
+
+if __name__ == '__main__':
+    main()
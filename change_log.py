@@ -0,0 +1,111 @@
+"""
+Incremental sync over the ``change_log`` table (migration 9).
+
+Triggers on employees, tasks and training_videos give every write a new,
+monotonically increasing version and keep only each row's latest entry,
+so a client that remembers the last version it saw can ask for what
+changed since then and gets each touched row once, at its current state,
+or a tombstone if it was deleted. Versions are assigned inside the
+writing transaction, and SQLite has one writer at a time, so they commit
+in order and a reader never skips a version that commits later.
+
+Superseded entries are dropped as rows change; tombstones are the only
+thing that accumulates, and ``compact`` removes those older than the
+retention window. A client whose ``since`` predates removed tombstones
+may have missed deletions and must reload in full. ``since=0`` is a full
+sync and always allowed: a client with no rows cannot miss a deletion.
+"""
+import json
+
+from classification import auto_status_sql
+from migrations import CHANGE_LOG_TABLES
+
+
+class ChangesExpired(Exception):
+    """``since`` is older than the compacted part of the log; the client must reload."""
+
+    def __init__(self, compacted_through, version):
+        super().__init__(compacted_through, version)
+        self.compacted_through = compacted_through
+        self.version = version
+
+
+def current_version(conn):
+    """Latest version ever assigned (AUTOINCREMENT never reuses one)."""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    return row[0] if row else 0
+
+
+def compacted_through(conn):
+    return conn.execute("SELECT compacted_through FROM change_log_state WHERE id = 1").fetchone()[0]
+
+
+def _current_rows(conn, table, keys):
+    key = CHANGE_LOG_TABLES[table]
+    columns = f"*, {auto_status_sql()} AS auto_status" if table == 'tasks' else "*"
+    return {
+        row[key]: dict(row)
+        for row in conn.execute(
+            f"SELECT {columns} FROM {table} WHERE {key} IN (SELECT value FROM json_each(?))",
+            (json.dumps(keys),),
+        )
+    }
+
+
+def changes_since(conn, since, limit, tables=None):
+    """
+    Up to ``limit`` changes after version ``since``, oldest first, as
+    ``{'changes': [...], 'version': v, 'has_more': bool}``. Each change is
+    ``{'version', 'table', 'op', 'key'}`` plus ``'row'`` for upserts.
+    Pass ``version`` back as the next ``since``. Run inside a read
+    transaction so the rows match the log. Raises ChangesExpired.
+    """
+    floor = compacted_through(conn)
+    if since and since < floor:
+        raise ChangesExpired(floor, current_version(conn))
+
+    tables = list(tables or CHANGE_LOG_TABLES)
+    entries = conn.execute(f'''
+        SELECT version, table_name, row_key, op FROM change_log
+        WHERE version > ? AND table_name IN ({', '.join('?' * len(tables))})
+        ORDER BY version
+        LIMIT ?
+    ''', (since, *tables, limit + 1)).fetchall()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    upserts = {}
+    for entry in entries:
+        if entry['op'] == 'upsert':
+            upserts.setdefault(entry['table_name'], []).append(entry['row_key'])
+    rows = {table: _current_rows(conn, table, keys) for table, keys in upserts.items()}
+
+    changes = []
+    for version, table, key, op in entries:
+        change = {'version': version, 'table': table, 'op': op, 'key': key}
+        if op == 'upsert':
+            change['row'] = rows[table].get(key)
+        changes.append(change)
+
+    version = entries[-1]['version'] if has_more else max(since, current_version(conn))
+    return {'changes': changes, 'version': version, 'has_more': has_more}
+
+
+def compact(conn, retention_days):
+    """
+    Drop tombstones older than ``retention_days`` and raise the compacted
+    version floor past them. Returns the number removed. Commits.
+    """
+    removed = conn.execute('''
+        DELETE FROM change_log
+        WHERE op = 'delete' AND changed_at < datetime('now', ?)
+        RETURNING version
+    ''', (f'-{int(retention_days)} days',)).fetchall()
+    if removed:
+        conn.execute(
+            "UPDATE change_log_state SET compacted_through = MAX(compacted_through, ?) WHERE id = 1",
+            (max(row[0] for row in removed),),
+        )
+    conn.commit()
+    return len(removed)
+
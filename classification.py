@@ -0,0 +1,115 @@
+"""
+The single definition of a task's ``auto_status``.
+
+The rule is expressed twice from the same constants: ``classify_task`` for
+rows already in Python, and ``auto_status_sql`` for computing and filtering
+inside SQLite. Both treat ``assigned_date`` strictly as ``YYYY-MM-DD``:
+
+- status ``Completed``                     -> ``Completed``
+- missing/empty ``assigned_date``          -> treated as assigned today
+- unparseable ``assigned_date``            -> ``Unknown``
+- assigned in the future                   -> ``Not yet started``
+- more than ``DELAYED_AFTER_DAYS`` ago     -> ``Delayed``
+- more than ``AT_RISK_AFTER_DAYS`` ago     -> ``At Risk``
+- otherwise                                -> ``On Track``
+
+``auto_status`` depends on today's date, so it cannot be a stored or
+generated column; the SQL form is evaluated per query instead.
+tests/test_classification.py keeps the two forms and ``auto_status_filter``
+in step on randomized tasks.
+"""
+from datetime import date, datetime
+
+AT_RISK_AFTER_DAYS = 2
+DELAYED_AFTER_DAYS = 5
+DEFAULT_STATUS = 'Assigned'
+
+AUTO_STATUSES = ('Completed', 'Not yet started', 'Delayed', 'At Risk', 'On Track', 'Unknown')
+NEEDS_REMINDER = ('At Risk', 'Delayed')
+
+
+def classify_task(task, today=None):
+    today = today or datetime.now().date()
+    status = task.get('status') or DEFAULT_STATUS
+    if status == 'Completed':
+        return 'Completed'
+
+    assigned = task.get('assigned_date')
+    if not assigned:
+        days_passed = 0
+    else:
+        try:
+            assigned_date = datetime.strptime(assigned, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return 'Unknown'
+        if assigned_date.isoformat() != assigned:
+            return 'Unknown'
+        days_passed = (today - assigned_date).days
+
+    if days_passed < 0:
+        return 'Not yet started'
+    elif days_passed > DELAYED_AFTER_DAYS:
+        return 'Delayed'
+    elif days_passed > AT_RISK_AFTER_DAYS:
+        return 'At Risk'
+    else:
+        return 'On Track'
+
+
+def today_sql(today=None):
+    """SQL for the reference date: a literal when pinned, else the local date."""
+    if today is None:
+        return "date('now', 'localtime')"
+    return f"'{date.fromisoformat(str(today)).isoformat()}'"
+
+
+def auto_status_sql(table='', today=None):
+    """SQL CASE expression computing ``auto_status`` for a ``tasks`` row."""
+    p = f"{table}." if table else ''
+    t = today_sql(today)
+    days = f"(julianday({t}) - julianday({p}assigned_date))"
+    return f"""(CASE
+        WHEN COALESCE(NULLIF({p}status, ''), '{DEFAULT_STATUS}') = 'Completed' THEN 'Completed'
+        WHEN {p}assigned_date IS NULL OR {p}assigned_date = '' THEN 'On Track'
+        WHEN date({p}assigned_date, '+0 days') IS NOT {p}assigned_date THEN 'Unknown'
+        WHEN {days} < 0 THEN 'Not yet started'
+        WHEN {days} > {DELAYED_AFTER_DAYS} THEN 'Delayed'
+        WHEN {days} > {AT_RISK_AFTER_DAYS} THEN 'At Risk'
+        ELSE 'On Track'
+    END)"""
+
+
+def auto_status_filter(statuses, table='', today=None):
+    """
+    Return (where, params) selecting tasks whose ``auto_status`` is one of
+    ``statuses``. Adds an ``assigned_date`` range where the rule implies
+    one, so SQLite can narrow the search with the assigned_date index
+    before evaluating the exact expression.
+    """
+    p = f"{table}." if table else ''
+    t = today_sql(today)
+    statuses = list(statuses)
+    where = [f"{auto_status_sql(table, today)} IN ({', '.join('?' * len(statuses))})"]
+    lower, upper = [], []
+    for status in statuses:
+        if status == 'Delayed':
+            lower.append(None)
+            upper.append(f"date({t}, '-{DELAYED_AFTER_DAYS} days')")
+        elif status == 'At Risk':
+            lower.append(f"date({t}, '-{DELAYED_AFTER_DAYS} days')")
+            upper.append(f"date({t}, '-{AT_RISK_AFTER_DAYS} days')")
+        elif status == 'Not yet started':
+            lower.append(f"date({t}, '+1 day')")
+            upper.append(None)
+        else:
+            lower = upper = None
+            break
+    if lower is not None and statuses:
+        if None not in lower:
+            where.append(f"{p}assigned_date >= {lower[0]}" if len(set(lower)) == 1 else
+                         f"{p}assigned_date >= MIN({', '.join(lower)})")
+        if None not in upper:
+            where.append(f"{p}assigned_date < {upper[0]}" if len(set(upper)) == 1 else
+                         f"{p}assigned_date < MAX({', '.join(upper)})")
+    return where, statuses
+
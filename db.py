@@ -0,0 +1,225 @@
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app, g
+
+
+# Matches tasks that are not completed. Written as two ranges rather than
+# ``status != 'Completed'`` so SQLite can serve it from the status index.
+OPEN_TASK = "(status < 'Completed' OR status > 'Completed')"
+
+# Matches employees who have finished every onboarding item.
+ONBOARDING_COMPLETE = (
+    "(forms_completed = total_forms AND videos_completed = total_videos"
+    " AND documents_uploaded = total_documents)"
+)
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within the timeout."""
+
+
+class ConnectionPool:
+    """
+    Bounded pool of warm SQLite connections.
+
+    Connections are opened lazily up to ``max_size`` and reused across
+    requests. Each one is configured once with WAL journaling, a busy
+    timeout and the tuning pragmas below, so a checkout costs a lock
+    acquire instead of a ``sqlite3.connect``. The pool remembers the pid
+    that created it and throws away inherited connections after a fork.
+    """
+
+    def __init__(self, database, max_size=8, timeout=5.0, busy_timeout_ms=5000,
+                 cache_size_kib=16384, cached_statements=256, synchronous='NORMAL',
+                 factory=sqlite3.Connection):
+        self.database = database
+        self.factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kib = cache_size_kib
+        self.cached_statements = cached_statements
+        self.synchronous = synchronous
+
+        self._cond = threading.Condition(threading.Lock())
+        self._pid = os.getpid()
+        self._idle = []
+        self._in_use = 0
+        self._created = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+        self._high_water = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.database,
+            timeout=self.busy_timeout_ms / 1000.0,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            factory=self.factory,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kib)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def _check_fork(self):
+        # Called with the lock held. Connections opened by the parent must
+        # never be used by a child process, so drop them without closing.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle = []
+            self._in_use = 0
+
+    def acquire(self):
+        start = time.perf_counter()
+        waited = False
+        with self._cond:
+            self._check_fork()
+            while not self._idle and self._in_use >= self.max_size:
+                waited = True
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if not self._idle and self._in_use >= self.max_size:
+                        raise PoolTimeout(
+                            f"No database connection available after {self.timeout}s"
+                        )
+                self._check_fork()
+
+            conn = self._idle.pop() if self._idle else None
+            self._in_use += 1
+            self._checkouts += 1
+            self._high_water = max(self._high_water, self._in_use)
+            if waited:
+                elapsed = time.perf_counter() - start
+                self._waits += 1
+                self._wait_time += elapsed
+                self._max_wait = max(self._max_wait, elapsed)
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._created += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        with self._cond:
+            if self._pid != os.getpid():
+                # Checked out before a fork; the owning process is gone.
+                return
+        if not discard:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                discard = True
+        if discard:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        with self._cond:
+            self._in_use -= 1
+            if not discard:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def reset_after_fork(self):
+        with self._cond:
+            self._check_fork()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'database': self.database,
+                'max_size': self.max_size,
+                'created': self._created,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'high_water': self._high_water,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_time_total_ms': round(self._wait_time * 1000, 3),
+                'wait_time_max_ms': round(self._max_wait * 1000, 3),
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(app=None):
+    app = app or current_app
+    database = app.config['DATABASE']
+    pool = _pools.get(database)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(database)
+            if pool is None:
+                pool = ConnectionPool(
+                    database,
+                    max_size=app.config.get('DB_POOL_SIZE', 8),
+                    timeout=app.config.get('DB_POOL_TIMEOUT', 5.0),
+                    busy_timeout_ms=app.config.get('DB_BUSY_TIMEOUT_MS', 5000),
+                    cache_size_kib=app.config.get('DB_CACHE_SIZE_KIB', 16384),
+                    cached_statements=app.config.get('DB_CACHED_STATEMENTS', 256),
+                    synchronous=app.config.get('DB_SYNCHRONOUS', 'NORMAL'),
+                    factory=app.config.get('DB_CONNECTION_FACTORY', sqlite3.Connection),
+                )
+                _pools[database] = pool
+    return pool
+
+
+def get_db():
+    """
+    Return the connection bound to the current app context, checking one
+    out of the pool on first use. It goes back to the pool on teardown,
+    so handlers must not close it themselves.
+    """
+    if 'db' not in g:
+        g.db = get_pool().acquire()
+    return g.db
+
+
+def close_db(exc=None):
+    conn = g.pop('db', None)
+    if conn is not None:
+        get_pool().release(conn)
+
+
+def reset_pools_after_fork():
+    for pool in list(_pools.values()):
+        pool.reset_after_fork()
+
+
+def close_pools():
+    """Close idle connections in every pool, e.g. in a server master before it forks."""
+    for pool in list(_pools.values()):
+        pool.close_all()
+
+
+def init_app(app):
+    app.teardown_appcontext(close_db)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=reset_pools_after_fork)
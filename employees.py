@@ -0,0 +1,118 @@
+"""
+Employee ID allocation and bulk import.
+
+IDs come from the ``id_sequences`` table (migration 7): reserving ``n``
+IDs is a single UPDATE of one row inside the caller's write transaction,
+so concurrent workers get disjoint ranges and nobody scans ``employees``
+for the current maximum.
+"""
+import codecs
+import csv
+import json
+from datetime import datetime
+
+EMP_ID_PREFIX = 'EMP'
+
+# Column order for INSERTs, with the input names accepted for each.
+EMPLOYEE_FIELDS = (
+    ('first_name', ('firstName', 'first_name')),
+    ('last_name', ('lastName', 'last_name')),
+    ('email', ('email',)),
+    ('position', ('position',)),
+    ('department', ('department',)),
+    ('start_date', ('startDate', 'start_date')),
+)
+
+INSERT_EMPLOYEE = '''
+    INSERT INTO employees
+    (emp_id, first_name, last_name, email, position, department, start_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def format_emp_id(number):
+    return f"{EMP_ID_PREFIX}{str(number).zfill(3)}"
+
+
+def reserve_emp_ids(conn, count):
+    """
+    Reserve ``count`` consecutive employee numbers and return the first.
+    Must run inside the transaction that inserts the rows.
+    """
+    row = conn.execute(
+        "UPDATE id_sequences SET next_value = next_value + ? WHERE name = 'employees' "
+        "RETURNING next_value - ?",
+        (count, count),
+    ).fetchone()
+    return row[0]
+
+
+def validate_employee(record):
+    """Return the INSERT values (without emp_id) for a record, or raise ValueError."""
+    if not isinstance(record, dict):
+        raise ValueError("expected an object")
+    values = []
+    for column, names in EMPLOYEE_FIELDS:
+        value = next((record[name] for name in names if record.get(name) not in (None, '')), None)
+        if value is None:
+            raise ValueError(f"'{names[0]}' is required")
+        if not isinstance(value, str):
+            raise ValueError(f"'{names[0]}' must be a string")
+        values.append(value.strip())
+    if '@' not in values[2]:
+        raise ValueError("'email' is not a valid address")
+    try:
+        datetime.strptime(values[5], '%Y-%m-%d')
+    except ValueError:
+        raise ValueError("'startDate' must be a YYYY-MM-DD date")
+    return tuple(values)
+
+
+def iter_csv(stream):
+    """Yield (row number, record) from a binary CSV stream with a header row."""
+    # Decode line by line rather than wrapping the stream in TextIOWrapper:
+    # WSGI servers' input objects (e.g. gunicorn's) are not io streams.
+    reader = csv.DictReader(codecs.iterdecode(stream, 'utf-8-sig'))
+    for number, record in enumerate(reader, start=1):
+        yield number, record
+
+
+def iter_ndjson(stream):
+    """Yield (row number, record) from a binary JSON-lines stream."""
+    number = 0
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        number += 1
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, None
+
+
+def validate_stream(rows, max_rows):
+    """
+    Validate records in one pass. Returns (valid values, errors); errors are
+    ``{'row': n, 'error': message}`` with 1-based row numbers.
+    """
+    valid, errors = [], []
+    for number, record in rows:
+        if number > max_rows:
+            raise OverflowError
+        try:
+            valid.append(validate_employee(record))
+        except ValueError as e:
+            errors.append({'row': number, 'error': str(e)})
+    return valid, errors
+
+
+def insert_employees(conn, valid):
+    """Insert validated rows in one transaction; returns the emp_ids assigned."""
+    if not valid:
+        return []
+    first = reserve_emp_ids(conn, len(valid))
+    emp_ids = [format_emp_id(first + i) for i in range(len(valid))]
+    conn.executemany(INSERT_EMPLOYEE, [(emp_id,) + values for emp_id, values in zip(emp_ids, valid)])
+    conn.commit()
+    return emp_ids
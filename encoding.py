@@ -0,0 +1,183 @@
+"""
+How responses are encoded: JSON serialization and HTTP compression.
+
+``JSONProvider`` is Flask's JSON provider serializing with orjson when it
+is installed (``pip install orjson``), several times faster than the
+standard library on large lists, and going straight to bytes for
+responses. Output matches the default provider's (sorted keys, dates as
+HTTP dates) except that non-ASCII text is sent as UTF-8 rather than
+``\\u`` escapes. Anything orjson cannot encode falls back to the
+standard library.
+
+``init_app`` compresses responses of ``COMPRESS_MIMETYPES`` from
+``COMPRESS_MIN_BYTES`` up, with brotli (``pip install brotli``) or gzip,
+whichever the client's ``Accept-Encoding`` prefers; streamed responses
+such as the report are compressed as they stream, flushed every
+``COMPRESS_FLUSH_BYTES`` of input. Routes using the response cache
+compress there instead, once per cached body (see ``response_cache``),
+and this hook leaves their responses alone.
+"""
+import json
+import zlib
+
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import parse_accept_header
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+# Preferred first when the client accepts several equally.
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+COMPRESSIBLE_MIMETYPES = (
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/html', 'text/plain',
+    'text/css', 'text/javascript', 'application/javascript',
+)
+
+
+def _orjson_options(sort_keys, indent=False):
+    # Dates go through ``default`` so they keep Flask's HTTP-date format.
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    return option
+
+
+def dumps_compact(obj):
+    """``obj`` as compact JSON bytes, keys in insertion order (for streamed bodies)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider with orjson as the encoder when it is available."""
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.dumps(obj, default=self.default,
+                                    option=_orjson_options(self.sort_keys)).decode()
+            except orjson.JSONEncodeError:
+                pass
+        return super().dumps(obj, **kwargs)
+
+    def dumps_bytes(self, obj, indent=False):
+        """A response body for ``obj``, newline-terminated like Flask's."""
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=self.default, option=(
+                    _orjson_options(self.sort_keys, indent) | orjson.OPT_APPEND_NEWLINE))
+            except orjson.JSONEncodeError:
+                pass
+        kwargs = {'indent': 2} if indent else {'separators': (',', ':')}
+        return (super().dumps(obj, **kwargs) + '\n').encode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent), mimetype=self.mimetype)
+
+
+def negotiate(accept_encoding=None):
+    """The encoding to use for this request (or ``accept_encoding``), or None for identity."""
+    if accept_encoding is None:
+        accept_encoding = request.headers.get('Accept-Encoding', '')
+    return parse_accept_header(accept_encoding).best_match(ENCODINGS)
+
+
+def compressible(mimetype, size=None, app=None):
+    """Whether a body of ``mimetype`` (and ``size`` bytes, if known) gets compressed."""
+    config = (app or current_app).config
+    if not config['COMPRESS_ENABLED'] or mimetype not in config['COMPRESS_MIMETYPES']:
+        return False
+    return size is None or size >= config['COMPRESS_MIN_BYTES']
+
+
+def compressor(encoding, app=None):
+    """``(process, flush, finish)`` functions of a streaming compressor for ``encoding``."""
+    config = (app or current_app).config
+    if encoding == 'br':
+        stream = brotli.Compressor(quality=config['COMPRESS_BROTLI_QUALITY'])
+        return stream.process, stream.flush, stream.finish
+    # wbits=31: a gzip header and trailer around the deflate stream.
+    stream = zlib.compressobj(config['COMPRESS_GZIP_LEVEL'], zlib.DEFLATED, 31)
+    return stream.compress, lambda: stream.flush(zlib.Z_SYNC_FLUSH), stream.flush
+
+
+def compress(data, encoding, app=None):
+    process, _, finish = compressor(encoding, app)
+    return process(data) + finish()
+
+
+def _compress_stream(body, encoding, app):
+    # Compressors buffer their input; flushing every COMPRESS_FLUSH_BYTES
+    # of it sends what has been compressed so far, so the client
+    # receives a streamed response as it is produced.
+    process, flush, finish = compressor(encoding, app)
+    flush_bytes = app.config['COMPRESS_FLUSH_BYTES']
+    pending = 0
+    try:
+        for chunk in body:
+            chunk = chunk.encode() if isinstance(chunk, str) else chunk
+            data = process(chunk)
+            pending += len(chunk)
+            if pending >= flush_bytes:
+                data += flush()
+                pending = 0
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+
+
+def compress_response(response):
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or 'no-transform' in response.headers.get('Cache-Control', '')):
+        return response
+    size = None if response.is_streamed else len(response.get_data())
+    if not compressible(response.mimetype, size):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate()
+    if encoding is None:
+        return response
+    app = current_app._get_current_object()
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding, app)
+        response.headers.pop('Content-Length', None)
+    else:
+        response.set_data(compress(response.get_data(), encoding, app))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
+
+
+def init_app(app):
+    """Serialize JSON with ``JSONProvider`` and compress responses. Call before ``metrics.init_app``."""
+    app.config.setdefault('COMPRESS_ENABLED', True)
+    app.config.setdefault('COMPRESS_MIN_BYTES', 1024)
+    app.config.setdefault('COMPRESS_MIMETYPES', COMPRESSIBLE_MIMETYPES)
+    app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+    app.config.setdefault('COMPRESS_BROTLI_QUALITY', 4)
+    app.config.setdefault('COMPRESS_FLUSH_BYTES', 16384)
+    app.json = JSONProvider(app)
+    app.after_request(compress_response)
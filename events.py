@@ -0,0 +1,253 @@
+"""
+Server-Sent Events fan-out of the change log.
+
+One ``EventBroker`` per process polls ``change_log`` (migration 9) on a
+single background thread, so it sees commits from every worker process,
+and is woken straight away by writes made in its own process. Each change
+is encoded once and the same bytes are queued for every subscriber.
+
+A subscriber's queue is bounded: if a slow client lets it fill up, the
+queue is dropped and the client is caught up from the change log instead,
+which is also how reconnects with ``Last-Event-ID`` resume. Catch-ups run
+on the subscriber's own thread with a pooled connection held only while
+reading; an idle stream holds no connection and blocks without polling
+until its next event or heartbeat.
+"""
+import json
+import logging
+import os
+import threading
+from collections import deque
+
+import change_log
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT = b': heartbeat\n\n'
+
+
+class TooManySubscribers(Exception):
+    """The process already serves ``max_subscribers`` streams."""
+
+
+def format_event(data, event=None, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+class Subscription:
+    """One stream's cursor and queue; the queue is guarded by the broker's lock."""
+
+    def __init__(self, cursor, tables, catch_up):
+        self.cursor = cursor
+        self.tables = tables
+        self.catch_up = catch_up
+        self.queue = deque()
+        self.ready = threading.Event()
+
+
+class EventBroker:
+    """Polls the change log and fans new changes out to subscribers."""
+
+    def __init__(self, pool, poll_interval=0.5, batch_size=500, max_queued=256,
+                 max_subscribers=1000):
+        self.pool = pool
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_queued = max_queued
+        self.max_subscribers = max_subscribers
+        self.version = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.published = 0
+        self.overflows = 0
+        self.catch_ups = 0
+
+    def start(self):
+        # Threads do not survive a fork, so each worker process starts its own.
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                # Streams belong to the process that accepted them.
+                self._subscribers = set()
+                self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='event-broker', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wake(self):
+        self._wake.set()
+
+    def subscribe(self, last_event_id=None, tables=None):
+        """
+        Register a stream starting after ``last_event_id``, or at the
+        current version when it is None. Raises TooManySubscribers.
+        """
+        self.start()
+        if self.version is None:
+            self._init_version()
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribers
+            if last_event_id is None or last_event_id >= self.version:
+                subscription = Subscription(self.version if last_event_id is None else last_event_id,
+                                            tables, catch_up=False)
+            else:
+                subscription = Subscription(last_event_id, tables, catch_up=True)
+            self._subscribers.add(subscription)
+        self._wake.set()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stream(self, subscription, heartbeat=15.0, retry_ms=3000):
+        """Yield encoded SSE frames for ``subscription`` until the client goes away."""
+        try:
+            yield f"retry: {int(retry_ms)}\n\n".encode()
+            while True:
+                if subscription.catch_up:
+                    yield from self._catch_up(subscription)
+                with self._lock:
+                    queued, subscription.queue = subscription.queue, deque()
+                    subscription.ready.clear()
+                for version, payload in queued:
+                    # Anything a catch-up already covered is skipped.
+                    if version > subscription.cursor:
+                        subscription.cursor = version
+                        yield payload
+                if not subscription.catch_up and not subscription.ready.wait(heartbeat):
+                    yield HEARTBEAT
+        finally:
+            self.unsubscribe(subscription)
+
+    def _catch_up(self, subscription):
+        with self._lock:
+            subscription.catch_up = False
+            subscription.queue.clear()
+            self.catch_ups += 1
+        while True:
+            # Read a batch, then give the connection back before writing to the client.
+            conn = self.pool.acquire()
+            try:
+                conn.execute("BEGIN")
+                try:
+                    result = change_log.changes_since(conn, subscription.cursor, self.batch_size,
+                                                      subscription.tables)
+                finally:
+                    conn.commit()
+            except change_log.ChangesExpired as e:
+                result = e
+            finally:
+                self.pool.release(conn)
+            if isinstance(result, change_log.ChangesExpired):
+                subscription.cursor = result.version
+                yield format_event({'version': result.version}, 'reset', result.version)
+                return
+            for change in result['changes']:
+                yield format_event(change, 'change', change['version'])
+            subscription.cursor = result['version']
+            if not result['has_more']:
+                return
+
+    def _init_version(self):
+        conn = self.pool.acquire()
+        try:
+            version = change_log.current_version(conn)
+        finally:
+            self.pool.release(conn)
+        with self._lock:
+            if self.version is None:
+                self.version = version
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                idle = not self._subscribers
+            if idle:
+                # Nobody is listening; sleep until someone subscribes.
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            try:
+                has_more = self.poll_once()
+            except Exception:
+                logger.exception("event broker error")
+                has_more = False
+            if not has_more:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def poll_once(self):
+        """Publish one batch of new changes; returns whether more are waiting."""
+        if self.version is None:
+            self._init_version()
+        conn = self.pool.acquire()
+        try:
+            if change_log.current_version(conn) <= self.version:
+                return False
+            conn.execute("BEGIN")
+            try:
+                result = change_log.changes_since(conn, self.version, self.batch_size)
+            finally:
+                conn.commit()
+        except change_log.ChangesExpired as e:
+            # Only possible after a long stall; every stream has to reload.
+            result = {'changes': [], 'version': e.version, 'has_more': False}
+            with self._lock:
+                for subscription in self._subscribers:
+                    subscription.catch_up = True
+                    subscription.ready.set()
+        finally:
+            self.pool.release(conn)
+
+        events = [
+            (change['version'], change['table'], format_event(change, 'change', change['version']))
+            for change in result['changes']
+        ]
+        with self._lock:
+            for subscription in self._subscribers:
+                if subscription.catch_up:
+                    continue
+                for version, table, payload in events:
+                    if subscription.tables and table not in subscription.tables:
+                        continue
+                    if len(subscription.queue) >= self.max_queued:
+                        # Drop the backlog; the stream re-reads it from the log.
+                        subscription.queue.clear()
+                        subscription.catch_up = True
+                        self.overflows += 1
+                        break
+                    subscription.queue.append((version, payload))
+                subscription.ready.set()
+            self.version = result['version']
+            self.published += len(events)
+        return result['has_more']
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'version': self.version or 0,
+                'published': self.published,
+                'overflows': self.overflows,
+                'catch_ups': self.catch_ups,
+                'queued': sum(len(s.queue) for s in self._subscribers),
+            }
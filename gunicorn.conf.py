@@ -0,0 +1,75 @@
+"""
+Gunicorn settings for the onboarding dashboard:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is preloaded in the master, so the model is loaded once and
+shared copy-on-write by every worker. Each worker starts with no database
+connections and opens its own after the fork. Environment overrides:
+GUNICORN_BIND (or PORT), GUNICORN_WORKERS, GUNICORN_THREADS,
+GUNICORN_TIMEOUT, GUNICORN_WORKER_CLASS, GUNICORN_WORKER_CONNECTIONS;
+app settings use the ONBOARDING_ prefix (e.g. ONBOARDING_DATABASE).
+
+Each open /api/events stream occupies a gthread worker thread for as
+long as the client stays connected, so a worker serves streams to at
+most half its threads (ONBOARDING_SSE_MAX_SUBSCRIBERS overrides this)
+and refuses the rest with a 503; refused dashboards poll /api/changes
+instead. For many live dashboards either raise GUNICORN_THREADS (an idle
+stream is a blocked thread, not a busy one) or install gevent and set
+GUNICORN_WORKER_CLASS=gevent, where a stream is a greenlet and the cap
+is half of worker_connections.
+"""
+import os
+
+
+def _cpu_count():
+    # Honour CPU affinity / container limits where the platform exposes them.
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+
+# SQLite serializes writers, so extra processes mostly buy read
+# parallelism; threads cover requests blocked on I/O.
+workers = int(os.environ.get('GUNICORN_WORKERS', _cpu_count() * 2 + 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# Streams must not take every thread, or ordinary requests queue behind
+# idle dashboards. Set here, before the app is preloaded, so create_app
+# picks it up with the other ONBOARDING_ settings.
+_stream_slots = worker_connections if worker_class in ('gevent', 'eventlet') else threads
+os.environ.setdefault('ONBOARDING_SSE_MAX_SUBSCRIBERS', str(_stream_slots // 2))
+
+if worker_class == 'gevent':
+    # Patch before the app is preloaded, so the locks and threads it
+    # creates at import time are cooperative in every worker.
+    from gevent import monkey
+
+    monkey.patch_all()
+
+preload_app = True
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+accesslog = os.environ.get('GUNICORN_ACCESSLOG')
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Pools are reset by an os.register_at_fork hook as well; doing it
+    # here keeps the guarantee explicit for this deployment.
+    import db
+
+    db.reset_pools_after_fork()
+
+
+def post_worker_init(worker):
+    # Without ONBOARDING_MODEL_PRELOAD the model loads per worker, in the
+    # background, before the first prediction needs it.
+    from app import warm_up_model
+
+    warm_up_model()
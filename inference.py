@@ -0,0 +1,461 @@
+import functools
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+
+NUMERIC_FEATURES = ('time_spent_hours', 'previous_delays')
+CATEGORY_FEATURE = 'task_type'
+DEFAULT_TASK_TYPE = 'Other'
+
+# Bump when the compiled artifact layout changes; older files are rebuilt.
+COMPILED_FORMAT = 1
+
+
+class RecordError(ValueError):
+    """A prediction record that cannot be encoded; carries its position."""
+
+    def __init__(self, index, message):
+        super().__init__(f"record {index}: {message}")
+        self.index = index
+
+
+class FeatureEncoder:
+    """
+    Encode raw prediction records straight into the model's feature matrix.
+
+    Mirrors the training-time ``pd.get_dummies(..., drop_first=True)``
+    layout: numeric inputs keep their column, each known ``task_type``
+    sets its one-hot column, and the dropped or unknown categories encode
+    as all zeros.
+    """
+
+    def __init__(self, feature_names):
+        self.feature_names = [str(name) for name in feature_names]
+        prefix = CATEGORY_FEATURE + '_'
+        self.numeric_columns = {
+            name: i for i, name in enumerate(self.feature_names) if name in NUMERIC_FEATURES
+        }
+        self.category_columns = {
+            name[len(prefix):]: i
+            for i, name in enumerate(self.feature_names) if name.startswith(prefix)
+        }
+
+    def encode(self, records):
+        n = len(records)
+        X = np.zeros((n, len(self.feature_names)), dtype=np.float64)
+        numeric = {name: np.zeros(n, dtype=np.float64) for name in self.numeric_columns}
+        cat_rows, cat_cols = [], []
+
+        for i, record in enumerate(records):
+            if not isinstance(record, dict):
+                raise RecordError(i, "expected a JSON object")
+            for name, values in numeric.items():
+                value = record.get(name, 0)
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    raise RecordError(i, f"'{name}' must be a number")
+                values[i] = value
+            task_type = record.get(CATEGORY_FEATURE, DEFAULT_TASK_TYPE)
+            if not isinstance(task_type, str):
+                raise RecordError(i, f"'{CATEGORY_FEATURE}' must be a string")
+            column = self.category_columns.get(task_type)
+            if column is not None:
+                cat_rows.append(i)
+                cat_cols.append(column)
+
+        for name, column in self.numeric_columns.items():
+            X[:, column] = numeric[name]
+        if cat_rows:
+            X[cat_rows, cat_cols] = 1.0
+        return X
+
+    def encode_columns(self, numeric, task_types):
+        """
+        Like ``encode`` for whole columns: ``numeric`` maps each numeric
+        feature to an array and ``task_types`` is an array of strings.
+        """
+        task_types = np.asarray(task_types, dtype=object)
+        X = np.zeros((len(task_types), len(self.feature_names)), dtype=np.float64)
+        for name, column in self.numeric_columns.items():
+            X[:, column] = numeric[name]
+        for task_type, column in self.category_columns.items():
+            X[:, column] = task_types == task_type
+        return X
+
+
+class CompiledForest:
+    """
+    A fitted RandomForestClassifier flattened into contiguous node arrays.
+
+    All trees share one set of ``feature``/``threshold``/``children``
+    arrays, with child indices already offset into the shared arrays;
+    ``children[2 * i]`` is node ``i``'s left child and ``children[2 * i + 1]``
+    its right. Leaves point at themselves with an infinite threshold, so
+    traversal is a fixed number of vectorized steps with no per-node
+    branching: small inputs step every (row, tree) pair at once, larger
+    batches walk one tree at a time across all rows, which keeps the
+    working set in cache. ``value`` holds each node's class distribution,
+    normalized the same way sklearn averages per-tree probabilities.
+    """
+
+    # Below this many rows, stepping all trees together beats looping over them.
+    tree_loop_min_rows = 64
+
+    def __init__(self, feature, threshold, children, value, roots, depths,
+                 classes, feature_names):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.depths = depths
+        self.max_depth = int(depths.max()) if len(depths) else 0
+        self.classes = classes
+        self.feature_names = feature_names
+
+    @classmethod
+    def from_sklearn(cls, model):
+        features, thresholds, children, values, roots, depths = [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            ids = np.arange(offset, offset + n, dtype=np.intp)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            pairs = np.empty((n, 2), dtype=np.intp)
+            pairs[:, 0] = np.where(is_leaf, ids, tree.children_left + offset)
+            pairs[:, 1] = np.where(is_leaf, ids, tree.children_right + offset)
+            children.append(pairs.ravel())
+
+            value = tree.value[:, 0, :].astype(np.float64)
+            totals = value.sum(axis=1, keepdims=True)
+            values.append(np.divide(value, totals, out=np.zeros_like(value), where=totals > 0))
+
+            roots.append(offset)
+            depths.append(tree.max_depth)
+            offset += n
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features)),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds)),
+            children=np.ascontiguousarray(np.concatenate(children)),
+            value=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.asarray(roots, dtype=np.intp),
+            depths=np.asarray(depths, dtype=np.intp),
+            classes=np.asarray(model.classes_),
+            feature_names=[str(name) for name in model.feature_names_in_],
+        )
+
+    def to_dict(self):
+        return {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'children': self.children,
+            'value': self.value,
+            'roots': self.roots,
+            'depths': self.depths,
+            'classes': self.classes,
+            'feature_names': list(self.feature_names),
+        }
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def predict_proba(self, X):
+        # sklearn evaluates splits on float32 inputs; do the same for parity.
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[0] >= self.tree_loop_min_rows:
+            return self._proba_by_tree(X)
+
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_base = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+        nodes = np.repeat(self.roots[None, :], n_rows, axis=0)
+        for _ in range(self.max_depth):
+            nodes = self._step(flat, row_base + self.feature.take(nodes), nodes)
+        return self.value.take(nodes, axis=0).mean(axis=1)
+
+    def _proba_by_tree(self, X):
+        n_rows = X.shape[0]
+        # Column-major copy so each gather reads one contiguous feature column.
+        flat = np.ascontiguousarray(X.T).ravel()
+        row_ids = np.arange(n_rows, dtype=np.intp)
+        total = np.zeros((n_rows, self.value.shape[1]), dtype=np.float64)
+        for root, depth in zip(self.roots, self.depths):
+            nodes = np.full(n_rows, root, dtype=np.intp)
+            for _ in range(depth):
+                nodes = self._step(flat, self.feature.take(nodes) * n_rows + row_ids, nodes)
+            total += self.value.take(nodes, axis=0)
+        return total / len(self.roots)
+
+    def _step(self, flat, x_index, nodes):
+        # Written as ~(x <= t) so NaN goes right, as it does in sklearn.
+        go_right = ~(flat.take(x_index) <= self.threshold.take(nodes))
+        return self.children.take(2 * nodes + go_right)
+
+    def predict(self, X):
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def compiled_path(model_path):
+    """Where the compiled artifact for ``model_path`` lives (``x.pkl`` -> ``x.compiled.joblib``)."""
+    return os.path.splitext(model_path)[0] + '.compiled.joblib'
+
+
+def save_compiled(forest, path, source=None):
+    """
+    Write ``forest`` as an uncompressed joblib file so it can be memory
+    mapped. ``source`` identifies the pickle it was built from. The file is
+    written under a temporary name and renamed, so readers never see a
+    partial artifact.
+    """
+    import joblib
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    joblib.dump({'format': COMPILED_FORMAT, 'source': source, 'forest': forest.to_dict()}, tmp)
+    os.replace(tmp, path)
+
+
+def load_compiled(path, source=None):
+    """
+    Load a compiled forest with its arrays memory mapped read-only, so every
+    worker process shares the same page-cache pages. Returns None when the
+    file is missing, unreadable, of an older format, or was built from a
+    different ``source``.
+    """
+    import joblib
+
+    try:
+        data = joblib.load(path, mmap_mode='r')
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        return None
+    if not isinstance(data, dict) or data.get('format') != COMPILED_FORMAT:
+        return None
+    if source is not None and tuple(data.get('source') or ()) != tuple(source):
+        return None
+    return CompiledForest(**data['forest'])
+
+
+class PredictionTable:
+    """
+    Dense class probabilities for the discrete input grid.
+
+    Axes are ``time_spent_hours`` (``TIME_RANGE``), ``previous_delays``
+    (``DELAY_RANGE``) and a task-type code: 0 for the dropped or unknown
+    categories, ``i + 1`` for the i-th one-hot column. Rows outside the grid
+    or with fractional values are reported via ``index`` as misses.
+    """
+
+    TIME_RANGE = (1, 20)
+    DELAY_RANGE = (0, 5)
+
+    def __init__(self, forest, encoder):
+        self.encoder = encoder
+        self.time_col = encoder.numeric_columns['time_spent_hours']
+        self.delay_col = encoder.numeric_columns['previous_delays']
+        self.category_cols = sorted(encoder.category_columns.values())
+
+        times = np.arange(self.TIME_RANGE[0], self.TIME_RANGE[1] + 1)
+        delays = np.arange(self.DELAY_RANGE[0], self.DELAY_RANGE[1] + 1)
+        n_codes = len(self.category_cols) + 1
+        t, d, c = np.meshgrid(times, delays, np.arange(n_codes), indexing='ij')
+
+        X = np.zeros((t.size, len(encoder.feature_names)), dtype=np.float64)
+        X[:, self.time_col] = t.ravel()
+        X[:, self.delay_col] = d.ravel()
+        for code, column in enumerate(self.category_cols, start=1):
+            X[:, column] = c.ravel() == code
+        self.proba = forest.predict_proba(X).reshape(len(times), len(delays), n_codes, -1)
+
+    def index(self, X):
+        """Return (mask, flat cell indices) for the rows of X covered by the table."""
+        time = X[:, self.time_col]
+        delay = X[:, self.delay_col]
+        code = np.zeros(len(X), dtype=np.intp)
+        for i, column in enumerate(self.category_cols, start=1):
+            code += (X[:, column] == 1) * i
+        mask = (
+            (time == np.floor(time)) & (time >= self.TIME_RANGE[0]) & (time <= self.TIME_RANGE[1])
+            & (delay == np.floor(delay)) & (delay >= self.DELAY_RANGE[0]) & (delay <= self.DELAY_RANGE[1])
+        )
+        n_times, n_delays, n_codes = self.proba.shape[:3]
+        cells = (
+            (time[mask].astype(np.intp) - self.TIME_RANGE[0]) * n_delays
+            + (delay[mask].astype(np.intp) - self.DELAY_RANGE[0])
+        ) * n_codes + code[mask]
+        return mask, cells
+
+    def lookup(self, cells):
+        return self.proba.reshape(-1, self.proba.shape[-1])[cells]
+
+
+class ProgressModel:
+    """
+    A loaded model ready to serve: compiled forest, encoder, the dense
+    lookup table and a bounded LRU memo for single records the table does
+    not cover.
+    """
+
+    def __init__(self, forest, memo_size=4096):
+        self.forest = forest
+        self.encoder = FeatureEncoder(self.forest.feature_names)
+        self.table = PredictionTable(self.forest, self.encoder)
+        self._memo = functools.lru_cache(maxsize=memo_size)(self._score_row)
+
+    @property
+    def classes(self):
+        return self.forest.classes
+
+    def _score_row(self, row):
+        return self.forest.predict_proba(np.asarray(row, dtype=np.float64))[0]
+
+    def predict_proba(self, records):
+        """
+        Return (probabilities, table hits) for a list of raw records. A
+        single record the table misses goes through the memo; a batch
+        scores all its misses in one forest pass.
+        """
+        X = self.encoder.encode(records)
+        if len(X) == 1:
+            mask, cells = self.table.index(X)
+            if mask[0]:
+                return self.table.lookup(cells), 1
+            return self._memo(tuple(X[0].tolist()))[None, :], 0
+        proba, mask = self._predict_encoded(X)
+        return proba, int(mask.sum())
+
+    def predict_proba_matrix(self, X):
+        """Probabilities for an encoded batch: table lookups, then one forest pass for the rest."""
+        return self._predict_encoded(X)[0]
+
+    def _predict_encoded(self, X):
+        proba = np.empty((len(X), len(self.classes)), dtype=np.float64)
+        mask, cells = self.table.index(X)
+        proba[mask] = self.table.lookup(cells)
+        if not mask.all():
+            proba[~mask] = self.forest.predict_proba(X[~mask])
+        return proba, mask
+
+    def memo_info(self):
+        return self._memo.cache_info()
+
+
+class ModelStore:
+    """
+    Owns the current ProgressModel and reloads it when the model file
+    changes. The file is stat'ed at most once per ``check_interval``
+    seconds; a reload builds the new model completely before swapping the
+    reference, so in-flight requests keep the one they started with and
+    other requests are served by the old model until the swap.
+
+    Nothing is loaded until the first ``get()`` (or ``warm_up()``). Loads
+    prefer the memory-mapped compiled artifact next to the pickle; only
+    when it is missing or stale is the pickle unpickled (importing
+    scikit-learn) and the artifact rebuilt.
+    """
+
+    def __init__(self, path, check_interval=1.0, memo_size=4096):
+        self.path = path
+        self.compiled_path = compiled_path(path)
+        self.check_interval = check_interval
+        self.memo_size = memo_size
+        self._lock = threading.Lock()
+        # Separate from _lock, which is held for a whole reload.
+        self._stats_lock = threading.Lock()
+        self._current = None
+        self._signature = None
+        self._next_check = 0.0
+        self._warm_pid = None
+        self.loads = 0
+        self.compiled_loads = 0
+        self.last_load_seconds = None
+        self.table_hits = 0
+        self.table_misses = 0
+
+    def _file_signature(self):
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def get(self):
+        now = time.monotonic()
+        current = self._current
+        if current is not None and now < self._next_check:
+            return current
+        # Once a model is loaded, only the first caller past the check
+        # interval looks for a new file; everyone else keeps serving the
+        # current model rather than queueing behind a reload.
+        if not self._lock.acquire(blocking=current is None):
+            return current
+        try:
+            if self._current is None or now >= self._next_check:
+                self._next_check = now + self.check_interval
+                signature = self._file_signature()
+                if signature != self._signature:
+                    start = time.perf_counter()
+                    self._current = ProgressModel(self._load_forest(signature), self.memo_size)
+                    self._signature = signature
+                    self.loads += 1
+                    self.last_load_seconds = time.perf_counter() - start
+            return self._current
+        finally:
+            self._lock.release()
+
+    def _load_forest(self, signature):
+        forest = load_compiled(self.compiled_path, signature)
+        if forest is not None:
+            self.compiled_loads += 1
+            return forest
+
+        import joblib
+
+        forest = CompiledForest.from_sklearn(joblib.load(self.path))
+        try:
+            save_compiled(forest, self.compiled_path, signature)
+        except OSError:
+            # Read-only deployment: serve the in-memory forest.
+            return forest
+        return load_compiled(self.compiled_path, signature) or forest
+
+    def warm_up(self):
+        """Load the model on a background thread (once per process)."""
+        if self._warm_pid == os.getpid():
+            return
+        self._warm_pid = os.getpid()
+        threading.Thread(target=self.get, name='model-warm-up', daemon=True).start()
+
+    def predict_proba(self, records):
+        model = self.get()
+        proba, hits = model.predict_proba(records)
+        with self._stats_lock:
+            self.table_hits += hits
+            self.table_misses += len(proba) - hits
+        return model, proba
+
+    def stats(self):
+        model = self._current
+        memo = model.memo_info() if model is not None else None
+        with self._stats_lock:
+            table_hits, table_misses = self.table_hits, self.table_misses
+        return {
+            'model_path': self.path,
+            'compiled_path': self.compiled_path,
+            'loaded': model is not None,
+            'loads': self.loads,
+            'compiled_loads': self.compiled_loads,
+            'last_load_ms': round(self.last_load_seconds * 1000, 2) if self.last_load_seconds else None,
+            'table_cells': int(model.table.proba[..., 0].size) if model is not None else 0,
+            'table_hits': table_hits,
+            'table_misses': table_misses,
+            'memo_hits': memo.hits if memo else 0,
+            'memo_misses': memo.misses if memo else 0,
+            'memo_size': memo.currsize if memo else 0,
+            'memo_max_size': self.memo_size,
+        }
@@ -0,0 +1,368 @@
+"""
+Request, SQL and model instrumentation with a Prometheus ``/metrics`` view.
+
+``init_app`` times every request per route, and makes the connection
+pool hand out ``InstrumentedConnection``s whose cursors time each
+statement (execute plus fetching, since SQLite does most of a SELECT's
+work while rows are stepped) and count the rows it returned or changed.
+Statements are labelled by verb, table and a short hash (see
+``query_label``); schema changes, PRAGMAs and anything run inside
+``untracked()`` (migrations) are not recorded.
+Code can time its own phases with ``timed('inference')``; JSON encoding
+is timed by the app's JSON provider. Per-request totals are kept on
+``g`` so the opt-in slow-request log (``SLOW_REQUEST_MS``) can say where
+the time went.
+
+Metrics live in process memory: under gunicorn each worker exports its
+own, so scrape workers individually or aggregate them downstream.
+"""
+import functools
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_app_context, request
+
+from encoding import JSONProvider
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_QUERIES_LOGGED = 5
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, as Prometheus expects."""
+
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total, n) for labels, (counts, total, n) in self._series.items()]
+        for labels, counts, total, n in sorted(series):
+            base = _labels(self.label_names, labels)
+            running = 0
+            for bound, count in zip(self.buckets, counts):
+                running += count
+                lines.append(f'{self.name}_bucket{_labels_with(base, "le", repr(bound))} {running}')
+            lines.append(f'{self.name}_bucket{_labels_with(base, "le", "+Inf")} {n}')
+            lines.append(f"{self.name}_sum{{{base}}} {total:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {n}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{{{_labels(self.label_names, labels)}}} {value}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _labels_with(base, name, value):
+    return f'{{{base},{name}="{value}"}}' if base else f'{{{name}="{value}"}}'
+
+
+REQUEST_SECONDS = Histogram(
+    'onboarding_http_request_duration_seconds', 'Time to produce a response, by route.',
+    ('method', 'route', 'status'))
+SQL_SECONDS = Histogram(
+    'onboarding_sql_query_duration_seconds', 'Time executing and stepping a statement.', ('query',))
+SQL_ROWS = Counter(
+    'onboarding_sql_rows_total', 'Rows returned by or changed by a statement.', ('query',))
+PHASE_SECONDS = Histogram(
+    'onboarding_phase_duration_seconds', 'Time in named request phases (inference, json, ...).',
+    ('phase',))
+
+REGISTRY = [REQUEST_SECONDS, SQL_SECONDS, SQL_ROWS, PHASE_SECONDS]
+
+
+# Statements not worth a series: schema changes (migrations) and
+# per-connection PRAGMAs.
+UNTRACKED_VERBS = frozenset({'CREATE', 'DROP', 'ALTER', 'PRAGMA'})
+# Distinct query labels kept before further statements share ``other``;
+# filters with optional clauses generate many statement shapes.
+MAX_QUERY_LABELS = 200
+
+_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE|JOIN)\s+([A-Za-z_]\w*)', re.IGNORECASE)
+_PLACEHOLDER_LIST = re.compile(r'\?(?:\s*,\s*\?)+')
+_query_labels = set()
+_query_labels_lock = threading.Lock()
+_untracked = threading.local()
+
+
+@functools.lru_cache(maxsize=1024)
+def query_label(sql):
+    """
+    ``(label, text)`` for a statement, or None if it is not tracked. The
+    label is bounded for Prometheus: the verb, first table and a short
+    hash of the statement (``SELECT tasks 1a2b3c4d``), with placeholder
+    lists of any length hashing alike. ``text`` is the whitespace-collapsed
+    SQL, truncated, for the slow-request log.
+    """
+    text = re.sub(r'\s+', ' ', sql).strip()
+    verb = text.split(' ', 1)[0].upper()
+    if verb in UNTRACKED_VERBS:
+        return None
+    digest = hashlib.sha1(_PLACEHOLDER_LIST.sub('?...', text).encode()).hexdigest()[:8]
+    table = _TABLE.search(text)
+    label = f"{verb} {table.group(1)} {digest}" if table else f"{verb} {digest}"
+    with _query_labels_lock:
+        if label not in _query_labels:
+            if len(_query_labels) >= MAX_QUERY_LABELS:
+                label = 'other'
+            else:
+                _query_labels.add(label)
+    return label, (text if len(text) <= 200 else text[:197] + '...')
+
+
+def _request_state():
+    if not has_app_context():
+        return None
+    state = g.get('_metrics')
+    if state is None:
+        state = g._metrics = {'sql_seconds': 0.0, 'sql_count': 0, 'queries': [], 'phases': {}}
+    return state
+
+
+def record_phase(phase, seconds):
+    PHASE_SECONDS.observe((phase,), seconds)
+    state = _request_state()
+    if state is not None:
+        state['phases'][phase] = state['phases'].get(phase, 0.0) + seconds
+
+
+@contextmanager
+def timed(phase):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter() - start)
+
+
+@contextmanager
+def untracked():
+    """Record no statements run by this thread inside the block (e.g. migrations)."""
+    previous = getattr(_untracked, 'active', False)
+    _untracked.active = True
+    try:
+        yield
+    finally:
+        _untracked.active = previous
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor that times each statement from ``execute`` until the next
+    ``execute``, ``close`` or garbage collection, counting only time spent
+    inside SQLite calls, and counts the rows fetched or changed.
+
+    Rows read by iterating the cursor are not timed one by one, which
+    would make iteration much slower: a query read that way is timed from
+    ``execute`` until it is finished, consumer time included, and its
+    rows are not counted. Read large results with ``fetchmany``.
+    """
+
+    _sql = None
+
+    def _finish(self):
+        sql, self._sql = self._sql, None
+        if sql is None:
+            return
+        labelled = None if getattr(_untracked, 'active', False) else query_label(sql)
+        if labelled is None:
+            return
+        label, text = labelled
+        elapsed = self._elapsed
+        if not self._fetched and self.description is not None:
+            # Rows, if any, were read by iteration.
+            elapsed = time.perf_counter() - self._started
+        rows = self._rows if self._rows else max(self.rowcount, 0)
+        SQL_SECONDS.observe((label,), elapsed)
+        SQL_ROWS.inc((label,), rows)
+        state = _request_state()
+        if state is not None:
+            state['sql_seconds'] += elapsed
+            state['sql_count'] += 1
+            state['queries'].append((elapsed, rows, label, text))
+
+    def _start(self, sql, started):
+        self._sql = sql
+        self._started = started
+        self._elapsed = time.perf_counter() - started
+        self._fetched = False
+        self._rows = 0
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._start(sql, start)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._start(sql, start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        if self._sql is not None:
+            self._elapsed += time.perf_counter() - start
+            self._fetched = True
+            self._rows += row is not None
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        if self._sql is not None:
+            self._elapsed += time.perf_counter() - start
+            self._fetched = True
+            self._rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        if self._sql is not None:
+            self._elapsed += time.perf_counter() - start
+            self._fetched = True
+            self._rows += len(rows)
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors, including ``execute`` shortcuts, are instrumented."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class TimedJSONProvider(JSONProvider):
+    """The app's JSON provider with encoding time recorded as the ``json`` phase."""
+
+    def dumps(self, obj, **kwargs):
+        with timed('json'):
+            return super().dumps(obj, **kwargs)
+
+    def dumps_bytes(self, obj, indent=False):
+        with timed('json'):
+            return super().dumps_bytes(obj, indent)
+
+
+def gauges(prefix, stats, help_text):
+    """Render the numeric values of a stats dict as gauges named ``<prefix>_<key>``."""
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, (int, float)):
+            name = f"{prefix}_{key}"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {float(value):g}"]
+    return lines
+
+
+def render(extra=()):
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(extra)
+    return '\n'.join(lines) + '\n'
+
+
+def _before_request():
+    g._metrics_start = time.perf_counter()
+
+
+def _after_request(response):
+    start = g.pop('_metrics_start', None)
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    REQUEST_SECONDS.observe((request.method, route, str(response.status_code)), elapsed)
+
+    threshold = current_app.config.get('SLOW_REQUEST_MS')
+    if threshold is not None and elapsed * 1000 >= threshold:
+        state = _request_state()
+        slowest = sorted(state['queries'], reverse=True)[:SLOW_QUERIES_LOGGED]
+        current_app.logger.warning(
+            "slow request %s %s -> %s in %.1f ms: sql %.1f ms over %d queries; %s%s",
+            request.method, request.full_path.rstrip('?'), response.status_code, elapsed * 1000,
+            state['sql_seconds'] * 1000, state['sql_count'],
+            ', '.join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in state['phases'].items())
+            or 'no other phases',
+            ''.join(f"\n    {seconds * 1000:8.2f} ms {rows:7d} rows  [{label}] {text}"
+                    for seconds, rows, label, text in slowest),
+        )
+    return response
+
+
+def init_app(app):
+    """Instrument ``app`` unless ``METRICS_ENABLED`` is false. Call before the pool is first used."""
+    if not app.config.setdefault('METRICS_ENABLED', True):
+        return
+    app.config.setdefault('DB_CONNECTION_FACTORY', InstrumentedConnection)
+    app.json = TimedJSONProvider(app)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -0,0 +1,469 @@
+"""
+Versioned schema migrations for the onboarding database.
+
+The applied version is kept in SQLite's ``PRAGMA user_version``. Each
+migration runs in its own ``BEGIN IMMEDIATE`` transaction together with
+the version bump, so a crash leaves the database at the last fully
+applied version and concurrent workers starting up apply it only once.
+Append new migrations to ``MIGRATIONS``; never edit one that has shipped.
+"""
+from collections import namedtuple
+
+from db import ONBOARDING_COMPLETE, OPEN_TASK
+
+# Tables whose writes bump ``data_versions`` (used by the response cache).
+VERSIONED_TABLES = ('employees', 'tasks', 'training_videos')
+TEMPLATE_TABLES = ('templates', 'template_items')
+# Tables recorded in ``change_log``, with the column that identifies a row.
+CHANGE_LOG_TABLES = {'employees': 'emp_id', 'tasks': 'id', 'training_videos': 'id'}
+# Task columns edited through the API. Updates touching only other columns
+# (the nightly risk scores) skip the change log and the stats counters.
+TASK_EDITABLE_COLUMNS = ('emp_id', 'emp_name', 'task_name', 'category', 'assigned_by',
+                         'assigned_date', 'due_date', 'status', 'completed_date')
+TASK_STATS_COLUMNS = ('status', 'completed_date', 'assigned_date', 'due_date')
+# Columns indexed for full-text search, per table (``<table>_fts``).
+SEARCH_COLUMNS = {
+    'employees': ('first_name', 'last_name', 'email', 'position', 'department'),
+    'tasks': ('task_name', 'category'),
+    'training_videos': ('title',),
+}
+
+# ``steps`` are SQL statements or callables taking the connection.
+Migration = namedtuple('Migration', ['version', 'name', 'steps'])
+
+
+def _flag(condition):
+    return f"(CASE WHEN {condition} THEN 1 ELSE 0 END)"
+
+
+def _task_delta(row, sign):
+    """Trigger statements adding (sign=1) or removing (sign=-1) one task's share of the counters."""
+    is_open = _flag(f"{row}.status < 'Completed' OR {row}.status > 'Completed'")
+    days = f"julianday({row}.completed_date) - julianday({row}.assigned_date)"
+    has_days = f"{row}.status = 'Completed' AND ({days}) IS NOT NULL"
+    bucket = (
+        f"INSERT INTO open_task_buckets (due_date, open_count) SELECT {row}.due_date, 1 "
+        f"WHERE {is_open} = 1 ON CONFLICT (due_date) DO UPDATE SET open_count = open_count + 1;"
+        if sign > 0 else
+        f"UPDATE open_task_buckets SET open_count = open_count - 1 "
+        f"WHERE due_date = {row}.due_date AND {is_open} = 1; "
+        f"DELETE FROM open_task_buckets WHERE due_date = {row}.due_date AND open_count <= 0;"
+    )
+    return (
+        f"UPDATE stats SET tasks_open = tasks_open + ({sign}) * {is_open}, "
+        f"tasks_completed = tasks_completed + ({sign}) * {_flag(has_days)}, "
+        f"completion_days_total = completion_days_total "
+        f"+ ({sign}) * (CASE WHEN {has_days} THEN {days} ELSE 0 END); "
+        + bucket
+    )
+
+
+def _employee_delta(row, sign):
+    """Trigger statements adding or removing one employee's share of the counters."""
+    done = _flag(
+        f"{row}.forms_completed = {row}.total_forms AND {row}.videos_completed = {row}.total_videos"
+        f" AND {row}.documents_uploaded = {row}.total_documents"
+    )
+    bucket = (
+        f"INSERT INTO employee_start_buckets (start_date, employee_count) VALUES ({row}.start_date, 1) "
+        f"ON CONFLICT (start_date) DO UPDATE SET employee_count = employee_count + 1;"
+        if sign > 0 else
+        f"UPDATE employee_start_buckets SET employee_count = employee_count - 1 "
+        f"WHERE start_date = {row}.start_date; "
+        f"DELETE FROM employee_start_buckets WHERE start_date = {row}.start_date AND employee_count <= 0;"
+    )
+    return (
+        f"UPDATE stats SET employees_total = employees_total + ({sign}), "
+        f"onboardings_completed = onboardings_completed + ({sign}) * {done}; "
+        + bucket
+    )
+
+
+def _version_triggers(tables):
+    """Triggers bumping each table's ``data_versions`` row on every write."""
+    return tuple(
+        f'''
+        CREATE TRIGGER {table}_version_{event.lower()} AFTER {event} ON {table}
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE table_name = '{table}';
+        END
+        '''
+        for table in tables
+        for event in ('INSERT', 'UPDATE', 'DELETE')
+    )
+
+
+def _change_log_triggers(tables, events=('INSERT', 'UPDATE', 'DELETE'), update_of=None):
+    """
+    Triggers recording each row's latest write in ``change_log``. INSERT OR
+    REPLACE drops the row's previous entry, so the log holds one entry per
+    live row plus one tombstone per deleted row, each at a fresh version.
+    ``update_of`` maps a table to the columns whose updates are logged.
+    """
+    def log(table, key, op, when='1'):
+        return (f"INSERT OR REPLACE INTO change_log (table_name, row_key, op) "
+                f"SELECT '{table}', {key}, '{op}' WHERE {when};")
+
+    steps = {
+        'INSERT': lambda table, key: log(table, f"NEW.{key}", 'upsert'),
+        # A changed key is a delete of the old row plus an upsert of the new one.
+        'UPDATE': lambda table, key: (log(table, f"OLD.{key}", 'delete', f"OLD.{key} IS NOT NEW.{key}")
+                                      + ' ' + log(table, f"NEW.{key}", 'upsert')),
+        'DELETE': lambda table, key: log(table, f"OLD.{key}", 'delete'),
+    }
+    def event_clause(table, event):
+        columns = (update_of or {}).get(table) if event == 'UPDATE' else None
+        return f"{event} OF {', '.join(columns)}" if columns else event
+
+    return tuple(
+        f'''
+        CREATE TRIGGER {table}_change_log_{event.lower()} AFTER {event_clause(table, event)} ON {table}
+        BEGIN
+            {steps[event](table, key)}
+        END
+        '''
+        for table, key in tables.items()
+        for event in events
+    )
+
+
+def _search_index(table, columns):
+    """
+    An external-content FTS5 index over ``columns`` of ``table`` (keyed by
+    its ``id``) and the triggers that keep it in sync. External content
+    stores only the index, not a second copy of the text; the triggers
+    remove a row's old terms with the 'delete' command before adding its
+    new ones, and updates touching none of the columns leave it alone.
+    """
+    listed = ', '.join(columns)
+    old = ', '.join(f"OLD.{column}" for column in columns)
+    new = ', '.join(f"NEW.{column}" for column in columns)
+    remove = f"INSERT INTO {table}_fts ({table}_fts, rowid, {listed}) VALUES ('delete', OLD.id, {old});"
+    add = f"INSERT INTO {table}_fts (rowid, {listed}) VALUES (NEW.id, {new});"
+    return (
+        # Prefix indexes up to eight characters let a prefix query read one
+        # doclist instead of merging those of every term it covers.
+        f'''
+        CREATE VIRTUAL TABLE {table}_fts USING fts5 (
+            {listed}, content='{table}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6 7 8'
+        )
+        ''',
+        f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')",
+        f'''
+        CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table}
+        BEGIN
+            {add}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER {table}_fts_update AFTER UPDATE OF {listed} ON {table}
+        BEGIN
+            {remove}
+            {add}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER {table}_fts_delete AFTER DELETE ON {table}
+        BEGIN
+            {remove}
+        END
+        ''',
+    )
+
+
+MIGRATIONS = [
+    Migration(1, 'initial schema', (
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            role TEXT NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS employees (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            emp_id TEXT UNIQUE NOT NULL,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            position TEXT NOT NULL,
+            department TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            forms_completed INTEGER DEFAULT 0,
+            total_forms INTEGER DEFAULT 1,
+            videos_completed INTEGER DEFAULT 0,
+            total_videos INTEGER DEFAULT 1,
+            documents_uploaded INTEGER DEFAULT 0,
+            total_documents INTEGER DEFAULT 1
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            emp_id TEXT NOT NULL,
+            emp_name TEXT NOT NULL,
+            task_name TEXT NOT NULL,
+            category TEXT NOT NULL,
+            assigned_by TEXT NOT NULL,
+            assigned_date TEXT NOT NULL,
+            due_date TEXT NOT NULL,
+            status TEXT DEFAULT 'Assigned',
+            FOREIGN KEY (emp_id) REFERENCES employees (emp_id) ON DELETE CASCADE
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS training_videos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            duration TEXT NOT NULL,
+            category TEXT NOT NULL,
+            upload_date TEXT NOT NULL,
+            url TEXT DEFAULT ''
+        )
+        ''',
+    )),
+    Migration(2, 'task indexes', (
+        "CREATE INDEX IF NOT EXISTS idx_tasks_emp_id ON tasks (emp_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_status_due_date ON tasks (status, due_date)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_assigned_date ON tasks (assigned_date)",
+    )),
+    Migration(3, 'employee list filter indexes', (
+        "CREATE INDEX IF NOT EXISTS idx_employees_department ON employees (department)",
+        "CREATE INDEX IF NOT EXISTS idx_employees_start_date ON employees (start_date)",
+    )),
+    Migration(4, 'maintained dashboard counters', (
+        "ALTER TABLE tasks ADD COLUMN completed_date TEXT",
+        '''
+        CREATE TABLE stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            employees_total INTEGER NOT NULL DEFAULT 0,
+            onboardings_completed INTEGER NOT NULL DEFAULT 0,
+            tasks_open INTEGER NOT NULL DEFAULT 0,
+            tasks_completed INTEGER NOT NULL DEFAULT 0,
+            completion_days_total REAL NOT NULL DEFAULT 0
+        )
+        ''',
+        # Open tasks per due date, so the overdue count is a short range sum.
+        '''
+        CREATE TABLE open_task_buckets (
+            due_date TEXT PRIMARY KEY,
+            open_count INTEGER NOT NULL
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TABLE employee_start_buckets (
+            start_date TEXT PRIMARY KEY,
+            employee_count INTEGER NOT NULL
+        ) WITHOUT ROWID
+        ''',
+        # Stamp completed_date when a task enters or leaves 'Completed'.
+        '''
+        CREATE TRIGGER tasks_completed_date_insert AFTER INSERT ON tasks
+        WHEN NEW.status = 'Completed' AND NEW.completed_date IS NULL
+        BEGIN
+            UPDATE tasks SET completed_date = date('now', 'localtime') WHERE id = NEW.id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER tasks_completed_date_update AFTER UPDATE OF status ON tasks
+        WHEN (NEW.status IS 'Completed') != (OLD.status IS 'Completed')
+        BEGIN
+            UPDATE tasks
+            SET completed_date = CASE WHEN NEW.status = 'Completed' THEN date('now', 'localtime') END
+            WHERE id = NEW.id;
+        END
+        ''',
+    ) + tuple(
+        f'''
+        CREATE TRIGGER tasks_stats_{event.lower()} AFTER {event} ON tasks
+        BEGIN
+            {_task_delta('OLD', -1) if event != 'INSERT' else ''}
+            {_task_delta('NEW', 1) if event != 'DELETE' else ''}
+        END
+        '''
+        for event in ('INSERT', 'UPDATE', 'DELETE')
+    ) + tuple(
+        f'''
+        CREATE TRIGGER employees_stats_{event.lower()} AFTER {event} ON employees
+        BEGIN
+            {_employee_delta('OLD', -1) if event != 'INSERT' else ''}
+            {_employee_delta('NEW', 1) if event != 'DELETE' else ''}
+        END
+        '''
+        for event in ('INSERT', 'UPDATE', 'DELETE')
+    ) + (
+        "INSERT INTO stats (id) VALUES (1)",
+        f'''
+        UPDATE stats SET
+            employees_total = (SELECT COUNT(*) FROM employees),
+            onboardings_completed = (SELECT COUNT(*) FROM employees WHERE {ONBOARDING_COMPLETE}),
+            tasks_open = (SELECT COUNT(*) FROM tasks WHERE {OPEN_TASK})
+        ''',
+        f'''
+        INSERT INTO open_task_buckets (due_date, open_count)
+        SELECT due_date, COUNT(*) FROM tasks WHERE {OPEN_TASK} GROUP BY due_date
+        ''',
+        '''
+        INSERT INTO employee_start_buckets (start_date, employee_count)
+        SELECT start_date, COUNT(*) FROM employees GROUP BY start_date
+        ''',
+    )),
+    Migration(5, 'per-table data versions', (
+        '''
+        CREATE TABLE data_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        ''',
+    ) + tuple(
+        f"INSERT INTO data_versions (table_name, version) VALUES ('{table}', 1)"
+        for table in VERSIONED_TABLES
+    ) + _version_triggers(VERSIONED_TABLES)),
+    Migration(6, 'reminder outbox', (
+        '''
+        CREATE TABLE reminder_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL,
+            created_by TEXT,
+            total INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE reminder_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id INTEGER NOT NULL REFERENCES reminder_jobs (id),
+            task_id INTEGER NOT NULL,
+            reminder_date TEXT NOT NULL,
+            recipient TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            claimed_at REAL,
+            last_error TEXT,
+            sent_at TEXT,
+            UNIQUE (task_id, reminder_date)
+        )
+        ''',
+        "CREATE INDEX idx_reminder_outbox_status ON reminder_outbox (status, next_attempt_at)",
+        "CREATE INDEX idx_reminder_outbox_job ON reminder_outbox (job_id, status)",
+    )),
+    Migration(7, 'employee id sequence', (
+        '''
+        CREATE TABLE id_sequences (
+            name TEXT PRIMARY KEY,
+            next_value INTEGER NOT NULL
+        ) WITHOUT ROWID
+        ''',
+        '''
+        INSERT INTO id_sequences (name, next_value)
+        SELECT 'employees', COALESCE(MAX(CAST(SUBSTR(emp_id, 4) AS INTEGER)), 0) + 1 FROM employees
+        ''',
+    )),
+    Migration(8, 'onboarding templates', (
+        '''
+        CREATE TABLE templates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            description TEXT,
+            created_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+        ''',
+        '''
+        CREATE TABLE template_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            template_id INTEGER NOT NULL REFERENCES templates (id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            task_name TEXT NOT NULL,
+            category TEXT NOT NULL,
+            due_offset_days INTEGER NOT NULL
+        )
+        ''',
+        "CREATE INDEX idx_template_items_template ON template_items (template_id, position)",
+    ) + tuple(
+        f"INSERT INTO data_versions (table_name, version) VALUES ('{table}', 1)"
+        for table in TEMPLATE_TABLES
+    ) + _version_triggers(TEMPLATE_TABLES)),
+    Migration(9, 'change log', (
+        # row_key has no declared type so integer ids stay integers.
+        '''
+        CREATE TABLE change_log (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_key NOT NULL,
+            op TEXT NOT NULL CHECK (op IN ('upsert', 'delete')),
+            changed_at TEXT NOT NULL DEFAULT (datetime('now')),
+            UNIQUE (table_name, row_key)
+        )
+        ''',
+        "CREATE INDEX idx_change_log_tombstones ON change_log (changed_at) WHERE op = 'delete'",
+        # Highest version whose tombstone compaction has removed; clients
+        # that last synced before it must reload.
+        '''
+        CREATE TABLE change_log_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            compacted_through INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        "INSERT INTO change_log_state (id) VALUES (1)",
+    ) + tuple(
+        f'''
+        INSERT INTO change_log (table_name, row_key, op)
+        SELECT '{table}', {key}, 'upsert' FROM {table} ORDER BY {key}
+        '''
+        for table, key in CHANGE_LOG_TABLES.items()
+    ) + _change_log_triggers(CHANGE_LOG_TABLES)),
+    Migration(10, 'task risk scores', (
+        "ALTER TABLE tasks ADD COLUMN risk_label TEXT",
+        "ALTER TABLE tasks ADD COLUMN risk_prob REAL",
+        "ALTER TABLE tasks ADD COLUMN risk_scored_at TEXT",
+        "DROP TRIGGER tasks_change_log_update",
+        "DROP TRIGGER tasks_stats_update",
+        f'''
+        CREATE TRIGGER tasks_stats_update AFTER UPDATE OF {', '.join(TASK_STATS_COLUMNS)} ON tasks
+        BEGIN
+            {_task_delta('OLD', -1)}
+            {_task_delta('NEW', 1)}
+        END
+        ''',
+    ) + _change_log_triggers({'tasks': CHANGE_LOG_TABLES['tasks']}, events=('UPDATE',),
+                             update_of={'tasks': TASK_EDITABLE_COLUMNS})),
+    Migration(11, 'full-text search', tuple(
+        step for table, columns in SEARCH_COLUMNS.items() for step in _search_index(table, columns)
+    )),
+]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, migrations=MIGRATIONS):
+    """Apply pending migrations in order; returns the list of versions applied."""
+    applied = []
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version <= schema_version(conn):
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another worker may have applied it while we waited for the lock.
+            if migration.version <= schema_version(conn):
+                conn.rollback()
+                continue
+            for step in migration.steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(migration.version)
+    return applied
+
@@ -0,0 +1,105 @@
+"""
+Onboarding templates: named task lists applied to new hires in bulk.
+
+Each ``template_items`` row carries a due date offset in days from the
+hire's ``start_date``. Applying a template to any number of employees is
+one INSERT ... SELECT joining the items with the employees named in a
+JSON array (``json_each``), so SQLite creates every task in a single
+statement and transaction instead of one request and commit per task.
+"""
+import json
+
+MAX_ITEMS = 500
+
+
+def validate_template(data):
+    """Return (name, description, items) from a request body, or raise ValueError."""
+    if not isinstance(data, dict):
+        raise ValueError("expected an object")
+    name = data.get('name')
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError("'name' is required")
+    description = data.get('description')
+    if description is not None and not isinstance(description, str):
+        raise ValueError("'description' must be a string")
+    raw_items = data.get('items')
+    if not isinstance(raw_items, list) or not raw_items:
+        raise ValueError("'items' must be a non-empty list")
+    if len(raw_items) > MAX_ITEMS:
+        raise ValueError(f"at most {MAX_ITEMS} items per template")
+
+    items = []
+    for position, item in enumerate(raw_items, start=1):
+        if not isinstance(item, dict):
+            raise ValueError(f"item {position}: expected an object")
+        task_name = item.get('task_name')
+        category = item.get('category')
+        offset = item.get('due_offset_days')
+        if not isinstance(task_name, str) or not task_name.strip():
+            raise ValueError(f"item {position}: 'task_name' is required")
+        if not isinstance(category, str) or not category.strip():
+            raise ValueError(f"item {position}: 'category' is required")
+        if not isinstance(offset, int) or isinstance(offset, bool):
+            raise ValueError(f"item {position}: 'due_offset_days' must be an integer")
+        items.append((position, task_name.strip(), category.strip(), offset))
+    return name.strip(), description, items
+
+
+def create_template(conn, name, description, items):
+    """Insert a template and its items; returns the new id. Commits."""
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO templates (name, description) VALUES (?, ?)", (name, description))
+    template_id = cursor.lastrowid
+    cursor.executemany('''
+        INSERT INTO template_items (template_id, position, task_name, category, due_offset_days)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(template_id,) + item for item in items])
+    conn.commit()
+    return template_id
+
+
+def list_templates(conn, template_id=None):
+    """Templates with their items, in two queries."""
+    where, params = ("WHERE id = ?", (template_id,)) if template_id is not None else ("", ())
+    templates = {
+        row['id']: dict(row, items=[])
+        for row in conn.execute(f"SELECT * FROM templates {where} ORDER BY id", params)
+    }
+    if not templates:
+        return []
+    item_where = "WHERE template_id = ?" if template_id is not None else ""
+    for row in conn.execute(f'''
+        SELECT template_id, task_name, category, due_offset_days
+        FROM template_items {item_where}
+        ORDER BY template_id, position
+    ''', params):
+        item = dict(row)
+        templates[item.pop('template_id')]['items'].append(item)
+    return list(templates.values())
+
+
+def apply_template(conn, template_id, emp_ids, assigned_by, assigned_date):
+    """
+    Create the template's tasks for every listed employee in one statement.
+    Returns (tasks created, emp_ids not found). Commits.
+    """
+    emp_ids = json.dumps(list(dict.fromkeys(emp_ids)))
+    cursor = conn.cursor()
+    missing = [row[0] for row in cursor.execute('''
+        SELECT j.value FROM json_each(?) j
+        WHERE NOT EXISTS (SELECT 1 FROM employees e WHERE e.emp_id = j.value)
+        ORDER BY j.key
+    ''', (emp_ids,))]
+    cursor.execute('''
+        INSERT INTO tasks
+        (emp_id, emp_name, task_name, category, assigned_by, assigned_date, due_date, status)
+        SELECT e.emp_id, e.first_name || ' ' || e.last_name, i.task_name, i.category, ?, ?,
+               date(e.start_date, printf('%+d days', i.due_offset_days)), 'Assigned'
+        FROM json_each(?) j
+        JOIN employees e ON e.emp_id = j.value
+        JOIN template_items i ON i.template_id = ?
+        ORDER BY j.key, i.position
+    ''', (assigned_by, assigned_date, emp_ids, template_id))
+    created = cursor.rowcount
+    conn.commit()
+    return created, missing
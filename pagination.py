@@ -0,0 +1,97 @@
+"""
+Keyset pagination, field projection and SQL filters for list endpoints.
+
+Pages are ordered by ``id`` and the cursor is the last ``id`` returned, so
+every page is an index range scan no matter how deep the client goes.
+"""
+from collections import namedtuple
+from datetime import datetime
+
+Page = namedtuple('Page', ['limit', 'cursor', 'paginated'])
+
+
+class ListArgError(ValueError):
+    """A list-endpoint query parameter that cannot be honoured (HTTP 400)."""
+
+
+def parse_page(args, default_limit=100, max_limit=1000, unpaginated_cap=5000):
+    """
+    Read ``limit``/``cursor`` from the query string. Requests with neither
+    are unpaginated for backwards compatibility but capped at
+    ``unpaginated_cap`` rows.
+    """
+    raw_limit = args.get('limit')
+    raw_cursor = args.get('cursor')
+    if raw_limit is None and raw_cursor is None:
+        return Page(unpaginated_cap, None, False)
+
+    try:
+        limit = int(raw_limit) if raw_limit is not None else default_limit
+        cursor = int(raw_cursor) if raw_cursor else None
+    except ValueError:
+        raise ListArgError("'limit' and 'cursor' must be integers")
+    if limit < 1:
+        raise ListArgError("'limit' must be positive")
+    return Page(min(limit, max_limit), cursor, True)
+
+
+def parse_fields(args, columns, computed=()):
+    """
+    Return the requested ``fields=`` projection as a list, or None for all
+    columns. ``computed`` names fields the endpoint derives itself.
+    """
+    raw = args.get('fields')
+    if not raw:
+        return None
+    fields = [f.strip() for f in raw.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in columns and f not in computed]
+    if unknown:
+        raise ListArgError(f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def parse_date(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ListArgError(f"'{name}' must be a YYYY-MM-DD date")
+    return value
+
+
+def table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def fetch_page(conn, table, columns, where, params, page):
+    """
+    Select ``columns`` from ``table`` matching the ``where`` fragments, one
+    page past ``page.cursor``. Returns (rows, next_cursor); ``next_cursor``
+    is None on the last page.
+    """
+    where = list(where)
+    params = list(params)
+    if page.cursor is not None:
+        where.append("id > ?")
+        params.append(page.cursor)
+    select = ', '.join(dict.fromkeys(([] if '*' in columns else ['id']) + list(columns)))
+    sql = f"SELECT {select} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY id LIMIT ?"
+    params.append(page.limit + 1)
+
+    rows = conn.execute(sql, params).fetchall()
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        next_cursor = str(rows[-1]['id'])
+    return rows, next_cursor
+
+
+def project(record, fields):
+    if fields is None:
+        return record
+    return {name: record[name] for name in fields}
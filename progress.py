@@ -0,0 +1,165 @@
+"""
+Employee onboarding progress updates, singly or in batches.
+
+``apply_updates`` writes any number of employees' progress in one
+statement and one transaction: the updates go in as a JSON array joined
+through ``json_each``, and ``RETURNING`` hands back the new rows, so
+there is no re-SELECT. Fields an update leaves out keep their values.
+
+``GroupCommit`` coalesces single updates (``PUT .../progress``) that
+arrive within a few milliseconds of each other. The first request of a
+batch waits out the window, then applies everything that joined it in
+one commit, while the rest wait for it. Each write still gets its row
+back, or its share of the error if the batch fails. There is no
+background thread; under a fork or gevent there is nothing to restart.
+"""
+import json
+import threading
+
+PROGRESS_FIELDS = ('forms_completed', 'videos_completed', 'documents_uploaded')
+PROGRESS_COLUMNS = ('forms_completed', 'total_forms', 'videos_completed', 'total_videos',
+                    'documents_uploaded', 'total_documents')
+
+UPDATE_PROGRESS = f'''
+    UPDATE employees
+    SET {', '.join(
+        f"{field} = COALESCE(json_extract(u.value, '$.{field}'), employees.{field})"
+        for field in PROGRESS_FIELDS
+    )}
+    FROM json_each(?) AS u
+    WHERE employees.emp_id = json_extract(u.value, '$.emp_id')
+    RETURNING emp_id, {', '.join(PROGRESS_COLUMNS)}
+'''
+
+
+class ProgressError(ValueError):
+    """An update that cannot be applied; the message is safe to show to the client."""
+
+
+def parse_fields(data, defaults=None):
+    """
+    The progress fields in ``data`` as ``{field: int}``; fields it leaves
+    out come from ``defaults`` (a value) when given, else are omitted.
+    """
+    if not isinstance(data, dict):
+        raise ProgressError("Each update must be a JSON object")
+    fields = {}
+    for field in PROGRESS_FIELDS:
+        value = data.get(field, defaults)
+        if value is None:
+            continue
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            raise ProgressError(f"'{field}' must be a non-negative integer")
+        fields[field] = value
+    return fields
+
+
+def parse_updates(payload, max_updates):
+    """
+    ``[(emp_id, fields), ...]`` from ``{"updates": [...]}`` or a bare list
+    of ``{"emp_id": ..., <progress fields>}`` objects; raises ProgressError.
+    """
+    updates = payload.get('updates') if isinstance(payload, dict) else payload
+    if not isinstance(updates, list) or not updates:
+        raise ProgressError("Expected a non-empty list of updates")
+    if len(updates) > max_updates:
+        raise ProgressError(f"At most {max_updates} updates per request")
+    parsed = []
+    for i, update in enumerate(updates):
+        try:
+            emp_id = update.get('emp_id') if isinstance(update, dict) else None
+            if not isinstance(emp_id, str) or not emp_id:
+                raise ProgressError("'emp_id' is required")
+            fields = parse_fields(update)
+            if not fields:
+                raise ProgressError(f"Nothing to update; expected one of {', '.join(PROGRESS_FIELDS)}")
+        except ProgressError as e:
+            raise ProgressError(f"updates[{i}]: {e}") from None
+        parsed.append((emp_id, fields))
+    return parsed
+
+
+def apply_updates(conn, updates):
+    """
+    Apply ``[(emp_id, fields), ...]`` in one transaction and commit. Later
+    updates to the same employee win. Returns ``{emp_id: row}`` for the
+    employees that exist.
+    """
+    merged = {}
+    for emp_id, fields in updates:
+        merged.setdefault(emp_id, {}).update(fields)
+    payload = json.dumps([dict(fields, emp_id=emp_id) for emp_id, fields in merged.items()])
+    try:
+        rows = conn.execute(UPDATE_PROGRESS, (payload,)).fetchall()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {row['emp_id']: {column: row[column] for column in PROGRESS_COLUMNS} for row in rows}
+
+
+class _Batch:
+    __slots__ = ('updates', 'full', 'done', 'rows', 'error')
+
+    def __init__(self):
+        self.updates = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.rows = None
+        self.error = None
+
+
+class GroupCommit:
+    """Merges single progress updates arriving within ``window`` seconds into one commit."""
+
+    def __init__(self, window, max_batch=500):
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._batch = None
+        self.batches = 0
+        self.updates = 0
+        self.largest_batch = 0
+
+    def submit(self, conn, emp_id, fields):
+        """Apply one update with whatever joins it; returns its row, or None if no such employee."""
+        with self._lock:
+            batch = self._batch
+            leader = batch is None
+            if leader:
+                batch = self._batch = _Batch()
+            batch.updates.append((emp_id, fields))
+            if len(batch.updates) >= self.max_batch:
+                self._batch = None
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._batch is batch:
+                    self._batch = None
+                self.batches += 1
+                self.updates += len(batch.updates)
+                self.largest_batch = max(self.largest_batch, len(batch.updates))
+            try:
+                batch.rows = apply_updates(conn, batch.updates)
+            except Exception as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.rows.get(emp_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'window_ms': self.window * 1000,
+                'batches': self.batches,
+                'updates': self.updates,
+                'updates_per_batch': round(self.updates / self.batches, 2) if self.batches else 0.0,
+                'largest_batch': self.largest_batch,
+            }
@@ -1,43 +1,38 @@
-import pandas as pd
-import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
-import joblib
-
-# Step 1: Generate dummy data with RULES
-np.random.seed(42)
-data = pd.DataFrame({
-    'time_spent_hours': np.random.randint(1, 20, 200),
-    'task_type': np.random.choice(['Onboarding', 'Training', 'Documentation'], 200),
-    'previous_delays': np.random.randint(0, 5, 200),
-})
-
-# Step 2: Rule-based labels (instead of random)
-def label(row):
-    if row['time_spent_hours'] < 5 or row['previous_delays'] > 2:
-        return 1   # Delayed
-    else:
-        return 0   # On Track
-
-data['WillDelay'] = data.apply(label, axis=1)
-
-# Step 3: Encode categorical features
-data = pd.get_dummies(data, columns=['task_type'], drop_first=True)
-
-# Step 4: Split
-X = data.drop('WillDelay', axis=1)
-y = data['WillDelay']
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# Step 5: Train model
-model = RandomForestClassifier(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
-
-# Step 6: Save model
-joblib.dump(model, 'progress_model.pkl')
-print("✅ Model trained and saved as progress_model.pkl")
-
-# Step 7: Accuracy check
-y_pred = model.predict(X_test)
-print("Accuracy:", accuracy_score(y_test, y_pred))
+"""
+Train the progress model on synthetic, rule-labeled data and publish it.
+
+Kept for bootstrapping a model before there is task history; with real
+data use ``flask train-model``, which builds features from the database.
+Both go through ``training``: labels are computed on whole arrays, trees
+are fitted on every core, and the model is published as a new version
+that running servers pick up without a restart.
+
+    python progress_predictor.py [--rows 200] [--n-jobs -1]
+"""
+import argparse
+
+import training
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=200)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--model-path', default='progress_model.pkl')
+    args = parser.parse_args()
+
+    # Step 1: Generate dummy data with rule-based labels
+    hours, task_types, previous_delays, labels = training.synthetic_outcomes(args.rows)
+
+    # Step 2: Encode categorical features and train
+    frame = training.build_frame(hours, task_types, previous_delays)
+    model, metrics = training.train(frame, labels, n_jobs=args.n_jobs)
+
+    # Step 3: Save as a new version and make it live
+    path = training.publish(model, args.model_path, dict(metrics, source='synthetic'))
+    print(f"✅ Model trained and saved as {args.model_path} (version {path})")
+    print("Accuracy:", metrics['accuracy'])
+
+
+if __name__ == '__main__':
+    main()
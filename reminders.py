@@ -0,0 +1,258 @@
+"""
+Reminder outbox and background delivery.
+
+``enqueue_reminders`` writes one outbox row per task that needs a reminder
+in a single INSERT ... SELECT; the UNIQUE (task_id, reminder_date)
+constraint makes repeated requests on the same day no-ops. A small pool
+of worker threads per process claims pending rows in batches, delivers
+them through a sender and records the outcome, retrying failures with
+exponential backoff. Claims are leases, so rows held by a worker that
+died are picked up again once the lease expires.
+
+Set ``SMTP_HOST``/``SMTP_PORT`` to deliver over SMTP; any local stand-in
+works for testing, e.g. ``python -m aiosmtpd -n -l localhost:8025``.
+Without ``SMTP_HOST`` reminders are logged to the console as before.
+"""
+import logging
+import os
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+
+from classification import NEEDS_REMINDER, auto_status_filter, auto_status_sql
+
+logger = logging.getLogger(__name__)
+
+
+class ConsoleSender:
+    """Mock delivery: prints each reminder to the console."""
+
+    def send_batch(self, messages):
+        results = {}
+        for message in messages:
+            print(f"[Reminder] {message['subject']} ({message['recipient']})")
+            results[message['id']] = None
+        return results
+
+
+class SmtpSender:
+    """Deliver a batch of reminders over one SMTP session."""
+
+    def __init__(self, host, port=25, sender='onboarding@localhost', username=None,
+                 password=None, starttls=False, timeout=10):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def send_batch(self, messages):
+        """Return {outbox id: error string or None}."""
+        results = {}
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+                if self.starttls:
+                    smtp.starttls()
+                if self.username:
+                    smtp.login(self.username, self.password)
+                for message in messages:
+                    email = EmailMessage()
+                    email['From'] = self.sender
+                    email['To'] = message['recipient']
+                    email['Subject'] = message['subject']
+                    email.set_content(message['body'])
+                    try:
+                        smtp.send_message(email)
+                        results[message['id']] = None
+                    except smtplib.SMTPException as e:
+                        results[message['id']] = str(e)
+        except (OSError, smtplib.SMTPException) as e:
+            for message in messages:
+                results.setdefault(message['id'], str(e))
+        return results
+
+
+def sender_from_config(config):
+    if not config.get('SMTP_HOST'):
+        return ConsoleSender()
+    return SmtpSender(
+        config['SMTP_HOST'],
+        port=config.get('SMTP_PORT', 25),
+        sender=config.get('SMTP_FROM', 'onboarding@localhost'),
+        username=config.get('SMTP_USERNAME'),
+        password=config.get('SMTP_PASSWORD'),
+        starttls=config.get('SMTP_STARTTLS', False),
+    )
+
+
+def enqueue_reminders(conn, created_by=None):
+    """
+    Create a reminder job and queue every task that needs a reminder today.
+    Returns (job_id, number of reminders queued). Commits.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO reminder_jobs (created_at, created_by) VALUES (datetime('now'), ?)",
+        (created_by,),
+    )
+    job_id = cursor.lastrowid
+    where, params = auto_status_filter(NEEDS_REMINDER, table='t')
+    cursor.execute(f'''
+        INSERT OR IGNORE INTO reminder_outbox
+            (job_id, task_id, reminder_date, recipient, subject, body)
+        SELECT ?, t.id, date('now', 'localtime'), e.email,
+               'Reminder: ' || t.task_name || ' is ' || {auto_status_sql('t')},
+               'Hi ' || e.first_name || ', your onboarding task "' || t.task_name
+                   || '" (due ' || t.due_date || ') is ' || {auto_status_sql('t')} || '.'
+        FROM tasks t
+        JOIN employees e ON e.emp_id = t.emp_id
+        WHERE {' AND '.join(where)}
+    ''', [job_id] + params)
+    queued = cursor.rowcount
+    cursor.execute("UPDATE reminder_jobs SET total = ? WHERE id = ?", (queued, job_id))
+    conn.commit()
+    return job_id, queued
+
+
+def job_progress(conn, job_id):
+    job = conn.execute("SELECT * FROM reminder_jobs WHERE id = ?", (job_id,)).fetchone()
+    if job is None:
+        return None
+    counts = dict(conn.execute(
+        "SELECT status, COUNT(*) FROM reminder_outbox WHERE job_id = ? GROUP BY status", (job_id,)
+    ).fetchall())
+    outstanding = counts.get('pending', 0) + counts.get('sending', 0)
+    return {
+        'job_id': job['id'],
+        'created_at': job['created_at'],
+        'total': job['total'],
+        'pending': outstanding,
+        'sent': counts.get('sent', 0),
+        'failed': counts.get('failed', 0),
+        'status': 'running' if outstanding else 'done',
+    }
+
+
+class ReminderDispatcher:
+    """Worker threads draining the outbox for one database."""
+
+    def __init__(self, pool, sender, workers=2, batch_size=50, max_attempts=5,
+                 backoff_seconds=30, lease_seconds=300, poll_interval=5.0):
+        self.pool = pool
+        self.sender = sender
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        # Threads do not survive a fork, so each worker process starts its own.
+        with self._lock:
+            if self._pid == os.getpid() and any(t.is_alive() for t in self._threads):
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._run, name=f'reminder-worker-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                delivered = self.run_once()
+            except Exception:
+                logger.exception("reminder worker error")
+                delivered = 0
+            if not delivered:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def _claim(self, conn):
+        now = time.time()
+        rows = conn.execute('''
+            UPDATE reminder_outbox
+            SET status = 'sending', claimed_at = ?
+            WHERE id IN (
+                SELECT id FROM reminder_outbox
+                WHERE (status = 'pending' AND next_attempt_at <= ?)
+                   OR (status = 'sending' AND claimed_at < ?)
+                ORDER BY id
+                LIMIT ?
+            )
+            RETURNING id, recipient, subject, body, attempts, claimed_at
+        ''', (now, now, now - self.lease_seconds, self.batch_size)).fetchall()
+        conn.commit()
+        return [dict(row) for row in rows]
+
+    def _record(self, conn, batch, results):
+        now = time.time()
+        sent, retry, failed = [], [], []
+        for message in batch:
+            error = results.get(message['id'], 'not attempted')
+            attempts = message['attempts'] + 1
+            # Only while our claim holds: past the lease, another worker owns the row.
+            claim = (message['id'], message['claimed_at'])
+            if error is None:
+                sent.append((attempts, *claim))
+            elif attempts >= self.max_attempts:
+                failed.append((attempts, error, *claim))
+            else:
+                delay = self.backoff_seconds * 2 ** (attempts - 1)
+                retry.append((attempts, error, now + delay, *claim))
+
+        claimed = "WHERE id = ? AND status = 'sending' AND claimed_at = ?"
+        conn.executemany(
+            "UPDATE reminder_outbox SET status = 'sent', attempts = ?, last_error = NULL, "
+            "sent_at = datetime('now') " + claimed, sent)
+        conn.executemany(
+            "UPDATE reminder_outbox SET status = 'pending', attempts = ?, last_error = ?, "
+            "next_attempt_at = ? " + claimed, retry)
+        conn.executemany(
+            "UPDATE reminder_outbox SET status = 'failed', attempts = ?, last_error = ? " + claimed,
+            failed)
+        conn.commit()
+
+    def run_once(self):
+        """
+        Claim and deliver one batch; returns the number of rows processed.
+        No connection is held while sending, so a slow mail server cannot
+        tie up the pool; the claim's lease keeps other workers off the rows.
+        """
+        conn = self.pool.acquire()
+        try:
+            batch = self._claim(conn)
+        finally:
+            self.pool.release(conn)
+        if not batch:
+            return 0
+
+        results = self.sender.send_batch(batch)
+
+        conn = self.pool.acquire()
+        try:
+            self._record(conn, batch, results)
+        finally:
+            self.pool.release(conn)
+        return len(batch)
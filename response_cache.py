@@ -0,0 +1,210 @@
+"""
+Conditional-GET response cache for read endpoints.
+
+Every table a cached route reads has a row in ``data_versions`` that
+triggers bump on each insert, update or delete (migration 5), so any
+write through any route or worker invalidates the affected entries. A
+cache key is the route, its query string and the current versions of the
+tables it depends on; stale entries are simply never asked for again and
+age out of the size-bounded LRU.
+
+Compressed variants of a body are made on first request for them and
+kept with the entry, so an unchanged payload is compressed once, not
+once per response. Each variant gets its own ETag (``<etag>-gzip``).
+"""
+import functools
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+
+from flask import current_app, make_response, request
+
+from db import get_db
+from encoding import compress, compressible, negotiate
+
+# ``encoded`` maps a content-encoding to the compressed body, filled in on demand.
+CacheEntry = namedtuple('CacheEntry', ['body', 'etag', 'mimetype', 'headers', 'encoded'])
+
+# Headers recomputed per response rather than replayed from the cache.
+_SKIP_HEADERS = {'content-length', 'content-type', 'etag', 'set-cookie', 'vary'}
+
+
+class ResponseCache:
+    """Serialized response bodies in an LRU bounded by total body size."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.bytes_served = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+        self.compressions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    @staticmethod
+    def _entry_size(entry):
+        return len(entry.body) + sum(len(body) for body in entry.encoded.values())
+
+    def _evict(self):
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= self._entry_size(evicted)
+            self.evictions += 1
+
+    def put(self, key, entry):
+        size = self._entry_size(entry)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= self._entry_size(old)
+            self._entries[key] = entry
+            self._size += size
+            self._evict()
+
+    def encoded(self, key, entry, encoding):
+        """``entry``'s body compressed with ``encoding``, made on first use and kept with it."""
+        body = entry.encoded.get(encoding)
+        if body is not None:
+            return body
+        body = compress(entry.body, encoding)
+        with self._lock:
+            if encoding not in entry.encoded:
+                entry.encoded[encoding] = body
+                self.compressions += 1
+                if self._entries.get(key) is entry:
+                    self._size += len(body)
+                    self._evict()
+        return body
+
+    def record_sent(self, entry, not_modified, body=None):
+        """Count a response for ``entry``; ``body`` is what was sent if not the plain body."""
+        with self._lock:
+            if not_modified:
+                self.not_modified += 1
+                self.bytes_saved += len(entry.body if body is None else body)
+            else:
+                self.bytes_served += len(entry.body if body is None else body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'not_modified': self.not_modified,
+                'bytes_served': self.bytes_served,
+                'bytes_saved': self.bytes_saved,
+                'evictions': self.evictions,
+                'compressions': self.compressions,
+            }
+
+
+def get_cache(app=None):
+    app = app or current_app
+    cache = app.extensions.get('response_cache')
+    if cache is None:
+        cache = app.extensions['response_cache'] = ResponseCache(
+            app.config.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+        )
+    return cache
+
+
+def data_versions(conn, tables):
+    placeholders = ', '.join('?' * len(tables))
+    rows = conn.execute(
+        f"SELECT table_name, version FROM data_versions WHERE table_name IN ({placeholders})",
+        tables,
+    ).fetchall()
+    versions = dict(rows)
+    return tuple(versions.get(table, 0) for table in tables)
+
+
+def cached_response(*tables, by_date=False):
+    """
+    Cache a GET view's 200 responses keyed on ``tables``' data versions.
+
+    ``by_date`` adds today's date to the key for views whose output depends
+    on it (e.g. auto_status or overdue counts). Responses carry a strong
+    ETag and ``If-None-Match`` is answered with 304. Streamed responses
+    and errors pass through uncached. Bodies worth compressing are sent
+    in the encoding the client prefers, from the entry's stored variants.
+    """
+    tables = tuple(tables)
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('RESPONSE_CACHE_ENABLED', True):
+                return view(*args, **kwargs)
+            cache = get_cache()
+            key = (
+                request.path,
+                tuple(sorted(request.args.items(multi=True))),
+                data_versions(get_db(), tables),
+                datetime.now().date().isoformat() if by_date else None,
+            )
+            entry = cache.get(key)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                body = response.get_data()
+                entry = CacheEntry(
+                    body=body,
+                    etag=hashlib.blake2b(body, digest_size=16).hexdigest(),
+                    mimetype=response.mimetype,
+                    headers=[(k, v) for k, v in response.headers.items()
+                             if k.lower() not in _SKIP_HEADERS],
+                    encoded={},
+                )
+                cache.put(key, entry)
+
+            varies = compressible(entry.mimetype, len(entry.body))
+            encoding = negotiate() if varies else None
+            etag = f"{entry.etag}-{encoding}" if encoding else entry.etag
+            not_modified = request.if_none_match.contains_weak(etag)
+            if not_modified:
+                cache.record_sent(entry, True, entry.encoded.get(encoding))
+                response = current_app.response_class(status=304)
+            else:
+                body = cache.encoded(key, entry, encoding) if encoding else entry.body
+                cache.record_sent(entry, False, body)
+                response = current_app.response_class(body, mimetype=entry.mimetype)
+                response.headers.extend(entry.headers)
+                if encoding:
+                    response.headers['Content-Encoding'] = encoding
+            if varies:
+                response.vary.add('Accept-Encoding')
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+
+        return wrapper
+
+    return decorator
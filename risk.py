@@ -0,0 +1,103 @@
+"""
+Batch risk scoring of open tasks (``flask score-risk``, run nightly).
+
+Features for every open task come from one query. ``previous_delays`` is
+a window over the employee's tasks in assignment order, counting earlier
+ones that were delayed by the same rule ``training`` labels with. The
+task type is the ``category``, and the time spent is working hours since
+assignment. Scores are computed a chunk at a time on whole matrices and
+written back with one batched UPDATE per chunk, each in its own short
+transaction, so request writers are never blocked for long. Reads then
+serve the stored ``risk_label``/``risk_prob`` with no inference at all.
+
+Only the risk columns change, so the tasks change-log and stats triggers
+(limited to the editable columns since migration 10) stay quiet. The
+row-version trigger still fires, so cached task lists are refreshed.
+"""
+import time
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+from db import OPEN_TASK
+from training import HOURS_PER_DAY
+
+CHUNK_SIZE = 10000
+
+FEATURE_QUERY = f'''
+    WITH history AS (
+        SELECT id, status, category, assigned_date,
+               COALESCE(SUM(CASE WHEN (status = 'Completed' AND completed_date > due_date)
+                                   OR ({OPEN_TASK} AND due_date < :today) THEN 1 ELSE 0 END)
+                        OVER (PARTITION BY emp_id ORDER BY assigned_date, id
+                              ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING), 0) AS previous_delays
+        FROM tasks
+    )
+    SELECT id, category,
+           COALESCE(MAX(julianday(:today) - julianday(assigned_date), 0), 0) * {HOURS_PER_DAY},
+           previous_delays
+    FROM history
+    WHERE {OPEN_TASK}
+    ORDER BY id
+'''
+
+UPDATE_RISK = f'''
+    UPDATE tasks SET risk_label = ?, risk_prob = ?, risk_scored_at = ?
+    WHERE id = ? AND {OPEN_TASK}
+'''
+
+# Scores on tasks completed since the last run no longer mean anything.
+CLEAR_COMPLETED = '''
+    UPDATE tasks SET risk_label = NULL, risk_prob = NULL, risk_scored_at = NULL
+    WHERE status = 'Completed' AND risk_label IS NOT NULL
+'''
+
+
+def open_task_features(conn, today=None):
+    """(ids, categories, time_spent_hours, previous_delays) arrays for every open task."""
+    rows = conn.execute(FEATURE_QUERY, {'today': (today or date.today()).isoformat()}).fetchall()
+    if not rows:
+        return (np.empty(0, dtype=np.int64), np.empty(0, dtype=object), np.empty(0), np.empty(0))
+    ids, categories, hours, previous = zip(*rows)
+    return (np.array(ids, dtype=np.int64), np.array(categories, dtype=object),
+            np.array(hours, dtype=np.float64), np.array(previous, dtype=np.float64))
+
+
+def score_open_tasks(conn, model, chunk_size=CHUNK_SIZE, today=None):
+    """Score every open task with ``model`` (a ProgressModel) and store the results. Commits."""
+    timings = {}
+    start = time.perf_counter()
+    ids, categories, hours, previous = open_task_features(conn, today)
+    timings['features_seconds'] = round(time.perf_counter() - start, 3)
+
+    scored_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    classes = list(model.classes)
+    delayed_column = classes.index(1)
+    inference_seconds = write_seconds = 0.0
+    delayed = 0
+    for offset in range(0, len(ids), chunk_size):
+        chunk = slice(offset, offset + chunk_size)
+        start = time.perf_counter()
+        X = model.encoder.encode_columns(
+            {'time_spent_hours': hours[chunk], 'previous_delays': previous[chunk]}, categories[chunk])
+        proba = model.predict_proba_matrix(X)
+        is_delayed = np.asarray(model.classes)[proba.argmax(axis=1)] == 1
+        labels = np.where(is_delayed, 'Delayed', 'On Track')
+        inference_seconds += time.perf_counter() - start
+        delayed += int(is_delayed.sum())
+
+        start = time.perf_counter()
+        conn.executemany(UPDATE_RISK, zip(labels.tolist(), proba[:, delayed_column].round(4).tolist(),
+                                          [scored_at] * len(X), ids[chunk].tolist()))
+        conn.commit()
+        write_seconds += time.perf_counter() - start
+
+    start = time.perf_counter()
+    cleared = conn.execute(CLEAR_COMPLETED).rowcount
+    conn.commit()
+    write_seconds += time.perf_counter() - start
+
+    return dict(
+        scored=int(len(ids)), delayed=delayed, cleared=cleared, scored_at=scored_at, **timings,
+        inference_seconds=round(inference_seconds, 3), write_seconds=round(write_seconds, 3),
+    )
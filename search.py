@@ -0,0 +1,99 @@
+"""
+Full-text search over the FTS5 indexes from migration 11.
+
+Each word of the query matches as a prefix (``lap`` finds "Laptop
+setup"), and a row must match every word. Case and diacritics are
+ignored. Results are grouped by table and ranked by bm25 with
+per-column weights, so a hit on a name beats a hit on a department.
+Each word is also looked up as a whole term, so exact words rank above
+longer ones sharing the prefix ("First12" before "First1299"). A single
+character matches whole words only; as a prefix it would match nearly
+everything, and no prefix index covers it.
+
+bm25 needs, for every word, the number of rows containing it, which
+means reading the word's whole doclist: a word like "training" in a
+large tasks table costs more than the rest of the query. So each word
+is first probed, counting its matches only up to ``rank_max_matches``.
+If every word stays under that, all matches are ranked by bm25. If one
+does not, the query is too broad for relevance to mean much. The
+matches come newest first (FTS5 reads them in rowid order and stops
+early) with a null ``score``, and the client should narrow the query.
+"""
+import json
+import re
+
+from classification import auto_status_sql
+from migrations import SEARCH_COLUMNS
+
+RANK_MAX_MATCHES = 10000
+MAX_TERMS = 8
+# bm25 column weights, in SEARCH_COLUMNS order.
+WEIGHTS = {
+    'employees': (10.0, 10.0, 5.0, 2.0, 1.0),
+    'tasks': (5.0, 1.0),
+    'training_videos': (1.0,),
+}
+
+_WORD = re.compile(r'\w+')
+
+
+def match_terms(query):
+    """One FTS5 expression per word of free text: ``("ann" OR "ann"*)``."""
+    # Quoting keeps words like AND/OR/NEAR from being read as operators.
+    return [f'("{word}" OR "{word}"*)' if len(word) > 1 else f'"{word}"'
+            for word in _WORD.findall(query or '')[:MAX_TERMS]]
+
+
+def _is_broad(conn, fts, terms, rank_max_matches):
+    for term in terms:
+        count = conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM {fts} WHERE {fts} MATCH ? LIMIT ?)",
+            (term, rank_max_matches + 1),
+        ).fetchone()[0]
+        if count > rank_max_matches:
+            return True
+    return False
+
+
+def search_table(conn, table, terms, limit, rank_max_matches=RANK_MAX_MATCHES):
+    """Best ``limit`` rows of ``table`` matching every term; see the module docstring."""
+    fts = f"{table}_fts"
+    match = ' AND '.join(terms)
+    columns = f"{table}.*, {auto_status_sql()} AS auto_status" if table == 'tasks' else f"{table}.*"
+    if _is_broad(conn, fts, terms, rank_max_matches):
+        newest = [row[0] for row in conn.execute(
+            f"SELECT rowid FROM {fts} WHERE {fts} MATCH ? ORDER BY rowid DESC LIMIT ?", (match, limit)
+        )]
+        rows = conn.execute(f'''
+            SELECT {columns}, NULL AS score FROM {table}
+            WHERE id IN (SELECT value FROM json_each(?))
+            ORDER BY id DESC
+        ''', (json.dumps(newest),))
+        return [dict(row) for row in rows]
+
+    weights = ', '.join(str(weight) for weight in WEIGHTS[table])
+    rows = conn.execute(f'''
+        SELECT {columns}, hits.score AS score
+        FROM (SELECT rowid, bm25({fts}, {weights}) AS score FROM {fts} WHERE {fts} MATCH ?) AS hits
+        JOIN {table} ON {table}.id = hits.rowid
+        ORDER BY hits.score, hits.rowid DESC
+        LIMIT ?
+    ''', (match, limit))
+    results = []
+    for row in rows:
+        item = dict(row)
+        # bm25 is lower-is-better; report a positive relevance score.
+        item['score'] = round(-item['score'], 4)
+        results.append(item)
+    return results
+
+
+def search(conn, query, limit, tables=None, rank_max_matches=RANK_MAX_MATCHES):
+    """``{table: [rows...]}`` for each of ``tables`` (default all), best first; None for an empty query."""
+    terms = match_terms(query)
+    if not terms:
+        return None
+    return {
+        table: search_table(conn, table, terms, limit, rank_max_matches)
+        for table in (tables or SEARCH_COLUMNS)
+    }
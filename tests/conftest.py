@@ -0,0 +1,20 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# The app is a set of top-level modules in the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrations  # noqa: E402
+
+
+@pytest.fixture
+def conn():
+    """A migrated in-memory database."""
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    migrations.migrate(conn)
+    yield conn
+    conn.close()
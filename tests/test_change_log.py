@@ -0,0 +1,54 @@
+"""Compacting the change log must not break full or incremental sync."""
+import pytest
+
+from change_log import ChangesExpired, changes_since, compact, current_version
+
+
+@pytest.fixture
+def compacted(conn):
+    """Three employees, two deleted two days ago, compacted with a one day window."""
+    conn.executemany('''
+        INSERT INTO employees (emp_id, first_name, last_name, email, position, department, start_date)
+        VALUES (?, 'First', 'Last', 'employee@example.com', 'Engineer', 'Engineering', '2024-01-01')
+    ''', [('EMP001',), ('EMP002',), ('EMP003',)])
+    conn.commit()
+    synced = current_version(conn)
+    conn.execute("DELETE FROM employees WHERE emp_id IN ('EMP001', 'EMP002')")
+    conn.execute("UPDATE change_log SET changed_at = datetime('now', '-2 days') WHERE op = 'delete'")
+    conn.commit()
+    return conn, synced, compact(conn, 1)
+
+
+def test_compact_removes_old_tombstones(compacted):
+    conn, synced, removed = compacted
+    assert removed == 2
+    assert compact(conn, 1) == 0
+
+
+def test_full_sync_still_allowed(compacted):
+    conn, synced, removed = compacted
+    full = changes_since(conn, 0, 100)
+    employees = [(change['op'], change['key']) for change in full['changes']
+                 if change['table'] == 'employees']
+    assert employees == [('upsert', 'EMP003')]
+    assert full['version'] == current_version(conn)
+
+
+def test_sync_from_before_compaction_expires(compacted):
+    conn, synced, removed = compacted
+    with pytest.raises(ChangesExpired):
+        changes_since(conn, synced, 100)
+
+
+def test_recent_tombstones_are_kept(conn):
+    conn.execute('''
+        INSERT INTO employees (emp_id, first_name, last_name, email, position, department, start_date)
+        VALUES ('EMP001', 'First', 'Last', 'employee@example.com', 'Engineer', 'Engineering', '2024-01-01')
+    ''')
+    conn.commit()
+    synced = current_version(conn)
+    conn.execute("DELETE FROM employees WHERE emp_id = 'EMP001'")
+    conn.commit()
+    assert compact(conn, 1) == 0
+    changes = changes_since(conn, synced, 100)['changes']
+    assert [(change['op'], change['key']) for change in changes] == [('delete', 'EMP001')]
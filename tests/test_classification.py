@@ -0,0 +1,76 @@
+"""The Python and SQL forms of the auto_status rule must agree."""
+import random
+import sqlite3
+from datetime import date
+
+import pytest
+
+from classification import (AUTO_STATUSES, DEFAULT_STATUS, DELAYED_AFTER_DAYS, NEEDS_REMINDER,
+                            auto_status_filter, auto_status_sql, classify_task)
+
+STATUSES = (None, '', DEFAULT_STATUS, 'In Progress', 'Completed', 'completed')
+MALFORMED_DATES = ('abc', '2024-13-01', '2024-02-30', '2024-1-05', ' 2024-01-05',
+                   '2024-01-05 10:00', '2024/01/05', '20240105')
+TODAYS = [date(2026, 3, 1), date(2024, 2, 29), date(2024, 12, 31)]
+
+
+def sample_tasks(rng, today, n=5000):
+    tasks = []
+    for _ in range(n):
+        kind = rng.random()
+        if kind < 0.1:
+            assigned = rng.choice((None, ''))
+        elif kind < 0.2:
+            assigned = rng.choice(MALFORMED_DATES)
+        else:
+            # Around every boundary, in the past and the future.
+            offset = rng.randint(-DELAYED_AFTER_DAYS - 5, 10)
+            assigned = date.fromordinal(today.toordinal() + offset).isoformat()
+        tasks.append({'status': rng.choice(STATUSES), 'assigned_date': assigned})
+    return tasks
+
+
+@pytest.fixture(params=TODAYS, ids=str)
+def classified(request):
+    """(tasks table, tasks, classify_task results, today) for a pinned date."""
+    today = request.param
+    tasks = sample_tasks(random.Random(today.toordinal()), today)
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY, status TEXT, assigned_date TEXT)")
+    conn.executemany("INSERT INTO tasks (id, status, assigned_date) VALUES (?, ?, ?)",
+                     [(i, task['status'], task['assigned_date']) for i, task in enumerate(tasks)])
+    yield conn, tasks, [classify_task(task, today) for task in tasks], today
+    conn.close()
+
+
+def test_sql_rule_matches_classify_task(classified):
+    conn, tasks, expected, today = classified
+    rows = conn.execute(f"SELECT id, {auto_status_sql(today=today)} FROM tasks ORDER BY id")
+    mismatches = [(tasks[i], expected[i], got) for i, got in rows if got != expected[i]]
+    assert not mismatches, mismatches[:5]
+
+
+@pytest.mark.parametrize('statuses', [(status,) for status in AUTO_STATUSES] + [NEEDS_REMINDER],
+                         ids=','.join)
+def test_filter_selects_the_classified_tasks(classified, statuses):
+    conn, tasks, expected, today = classified
+    where, params = auto_status_filter(statuses, today=today)
+    got = {row[0] for row in conn.execute(f"SELECT id FROM tasks WHERE {' AND '.join(where)}", params)}
+    want = {i for i, status in enumerate(expected) if status in statuses}
+    assert got == want, [tasks[i] for i in sorted(got ^ want)][:5]
+
+
+@pytest.mark.parametrize('task, status', [
+    ({'status': 'Completed', 'assigned_date': 'abc'}, 'Completed'),
+    ({'status': 'Completed', 'assigned_date': '2999-01-01'}, 'Completed'),
+    ({'status': None, 'assigned_date': None}, 'On Track'),
+    ({'status': '', 'assigned_date': ''}, 'On Track'),
+    ({'status': 'In Progress', 'assigned_date': '2024-02-30'}, 'Unknown'),
+    ({'status': 'In Progress', 'assigned_date': '2026-03-02'}, 'Not yet started'),
+])
+def test_edge_cases(task, status):
+    today = date(2026, 3, 1)
+    conn = sqlite3.connect(':memory:')
+    sql = conn.execute(f"SELECT {auto_status_sql(today=today)} FROM (SELECT ? AS status, ? AS assigned_date)",
+                       (task['status'], task['assigned_date'])).fetchone()[0]
+    assert classify_task(task, today) == sql == status
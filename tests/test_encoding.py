@@ -0,0 +1,47 @@
+"""Streamed responses are compressed without holding back their output."""
+import zlib
+
+import pytest
+from flask import Flask
+
+import encoding
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    encoding.init_app(app)
+    return app
+
+
+def decompressor(name):
+    if name == 'br':
+        return encoding.brotli.Decompressor().process
+    return zlib.decompressobj(31).decompress
+
+
+@pytest.mark.parametrize('name', encoding.ENCODINGS)
+def test_stream_is_flushed_as_it_goes(app, name):
+    block = b'{"employee_name": "First Last", "tasks": []},' * 100
+    received = []
+
+    def body():
+        # The client has everything before a block by the time it is produced.
+        for i in range(20):
+            received.append(len(b''.join(decompressed)))
+            yield block
+
+    decompressed = []
+    decompress = decompressor(name)
+    for data in encoding._compress_stream(body(), name, app):
+        decompressed.append(decompress(data))
+    assert b''.join(decompressed) == block * 20
+    flush_bytes = app.config['COMPRESS_FLUSH_BYTES']
+    assert all(got >= i * len(block) - flush_bytes for i, got in enumerate(received))
+
+
+@pytest.mark.parametrize('name', encoding.ENCODINGS)
+def test_compress_round_trips(app, name):
+    data = b'x' * 10000
+    with app.app_context():
+        assert decompressor(name)(encoding.compress(data, name)) == data
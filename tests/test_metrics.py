@@ -0,0 +1,46 @@
+"""SQL statements are recorded however their rows are read."""
+import sqlite3
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:', factory=metrics.InstrumentedConnection)
+    conn.execute("CREATE TABLE numbers (n INTEGER)")
+    conn.executemany("INSERT INTO numbers (n) VALUES (?)", [(i,) for i in range(1000)])
+    yield conn
+    conn.close()
+
+
+def recorded(sql):
+    label, _ = metrics.query_label(sql)
+    counts = metrics.SQL_SECONDS._series.get((label,), [None, 0.0, 0])[2]
+    return counts, metrics.SQL_ROWS._values.get((label,), 0)
+
+
+@pytest.mark.parametrize('read, rows', [
+    (lambda cursor: cursor.fetchall(), 1000),
+    (lambda cursor: [cursor.fetchmany(300) for _ in range(4)], 1000),
+    (lambda cursor: cursor.fetchone(), 1),
+    (lambda cursor: list(cursor), 0),
+], ids=['fetchall', 'fetchmany', 'fetchone', 'iterated'])
+def test_select_recorded(conn, read, rows):
+    sql = f"SELECT n FROM numbers WHERE n >= 0 -- {id(read)}"
+    before = recorded(sql)
+    cursor = conn.execute(sql)
+    read(cursor)
+    cursor.close()
+    count, total_rows = recorded(sql)
+    assert count == before[0] + 1
+    # Iterated rows are not counted one by one.
+    assert total_rows - before[1] == rows
+
+
+def test_write_counts_changed_rows(conn):
+    sql = "UPDATE numbers SET n = n + 1 WHERE n < 10"
+    before = recorded(sql)
+    conn.execute(sql).close()
+    assert recorded(sql) == (before[0] + 1, before[1] + 10)
@@ -0,0 +1,46 @@
+"""Queries on request paths must stay on an index."""
+import pytest
+
+from app import report_sql
+from classification import NEEDS_REMINDER, auto_status_filter
+
+_reminder_where, _reminder_params = auto_status_filter(NEEDS_REMINDER, table='t')
+
+# name: (sql, params, tables the query is expected to read in full).
+HOT_QUERIES = {
+    'tasks_by_employee': ("SELECT * FROM tasks WHERE emp_id = ?", ('EMP001',), ()),
+    'reminder_candidates': (
+        "SELECT * FROM tasks t WHERE " + " AND ".join(_reminder_where), _reminder_params, (),
+    ),
+    'overdue_buckets': (
+        "SELECT COALESCE(SUM(open_count), 0) FROM open_task_buckets WHERE due_date < date('now')",
+        (),
+        (),
+    ),
+    # The report lists every employee, so it scans them; tasks must come by index.
+    'report': (*report_sql(), ('e',)),
+    'report_delayed': (*report_sql(['Delayed']), ('e',)),
+}
+
+
+def plan_problems(conn, sql, params, allow_scan):
+    """Plan steps that scan a table not in ``allow_scan``, build a throwaway index or sort."""
+    problems = []
+    for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params):
+        detail = row[3]
+        if detail.startswith('SCAN ') and detail.split()[1] not in allow_scan:
+            problems.append(detail)
+        elif 'AUTOMATIC' in detail or 'TEMP B-TREE' in detail:
+            problems.append(detail)
+    return problems
+
+
+@pytest.mark.parametrize('name', HOT_QUERIES)
+def test_query_uses_an_index(conn, name):
+    problems = plan_problems(conn, *HOT_QUERIES[name])
+    assert not problems, f"{name}: {'; '.join(problems)}"
+
+
+def test_report_without_task_index_is_caught(conn):
+    conn.execute("DROP INDEX idx_tasks_emp_id")
+    assert plan_problems(conn, *HOT_QUERIES['report'])
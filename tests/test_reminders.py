@@ -0,0 +1,166 @@
+"""The reminder worker against a fake SMTP server: delivery, retry and backoff."""
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from db import ConnectionPool
+from migrations import migrate
+from reminders import ReminderDispatcher, SmtpSender, enqueue_reminders
+
+REJECTED = 'bounce@example.com'
+
+
+class FakeSmtpServer(socketserver.ThreadingTCPServer):
+    """
+    Just enough SMTP for smtplib: accepts every message except those to
+    ``REJECTED``, and records the pool's checked-out connections whenever
+    a message is being delivered.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, pool):
+        super().__init__(('127.0.0.1', 0), FakeSmtpHandler)
+        self.pool = pool
+        self.recipients = []
+        self.in_use_during_send = []
+
+
+class FakeSmtpHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 fake ESMTP')
+        recipient = None
+        for raw in self.rfile:
+            command = raw.decode().strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb == 'EHLO':
+                self.reply('250-fake')
+                self.reply('250 8BITMIME')
+            elif verb == 'RCPT':
+                recipient = command.split(':', 1)[1].strip('<> ')
+                self.server.in_use_during_send.append(self.server.pool.stats()['in_use'])
+                if recipient == REJECTED:
+                    self.reply('550 mailbox unavailable')
+                else:
+                    self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 go ahead')
+                for line in self.rfile:
+                    if line in (b'.\r\n', b'.\n'):
+                        break
+                self.server.recipients.append(recipient)
+                self.reply('250 queued')
+            elif verb == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                # MAIL, RSET, NOOP
+                self.reply('250 OK')
+
+
+@pytest.fixture
+def pool(tmp_path):
+    database = str(tmp_path / 'reminders.db')
+    conn = sqlite3.connect(database)
+    migrate(conn)
+    conn.executemany('''
+        INSERT INTO employees (emp_id, first_name, last_name, email, position, department, start_date)
+        VALUES (?, 'First', 'Last', ?, 'Engineer', 'Engineering', '2024-01-01')
+    ''', [('EMP001', 'one@example.com'), ('EMP002', REJECTED)])
+    conn.executemany('''
+        INSERT INTO tasks (emp_id, emp_name, task_name, category, assigned_by, assigned_date, due_date)
+        VALUES (?, 'First Last', 'Sign contract', 'Forms', 'HR', date('now', '-10 days'), date('now'))
+    ''', [('EMP001',), ('EMP002',)])
+    conn.commit()
+    job_id, queued = enqueue_reminders(conn)
+    assert queued == 2
+    conn.close()
+    pool = ConnectionPool(database)
+    yield pool
+    pool.close_all()
+
+
+@pytest.fixture
+def smtp_server(pool):
+    server = FakeSmtpServer(pool)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def outbox(pool):
+    conn = pool.acquire()
+    try:
+        return {row['recipient']: dict(row) for row in conn.execute("SELECT * FROM reminder_outbox")}
+    finally:
+        pool.release(conn)
+
+
+def make_due(pool):
+    conn = pool.acquire()
+    try:
+        conn.execute("UPDATE reminder_outbox SET next_attempt_at = 0 WHERE status = 'pending'")
+        conn.commit()
+    finally:
+        pool.release(conn)
+
+
+def test_rejected_reminders_back_off_then_fail(pool, smtp_server):
+    dispatcher = ReminderDispatcher(pool, SmtpSender('127.0.0.1', smtp_server.server_address[1]),
+                                    max_attempts=3, backoff_seconds=10)
+
+    start = time.time()
+    assert dispatcher.run_once() == 2
+    rows = outbox(pool)
+    assert smtp_server.recipients == ['one@example.com']
+    assert rows['one@example.com']['status'] == 'sent'
+    bounced = rows[REJECTED]
+    assert (bounced['status'], bounced['attempts']) == ('pending', 1)
+    assert '550' in bounced['last_error']
+    assert start + 10 <= bounced['next_attempt_at'] <= time.time() + 10
+
+    # Not due again until the backoff has passed.
+    assert dispatcher.run_once() == 0
+
+    make_due(pool)
+    start = time.time()
+    assert dispatcher.run_once() == 1
+    bounced = outbox(pool)[REJECTED]
+    assert (bounced['status'], bounced['attempts']) == ('pending', 2)
+    assert start + 20 <= bounced['next_attempt_at'] <= time.time() + 20
+
+    make_due(pool)
+    assert dispatcher.run_once() == 1
+    bounced = outbox(pool)[REJECTED]
+    assert (bounced['status'], bounced['attempts']) == ('failed', 3)
+    assert '550' in bounced['last_error']
+
+    make_due(pool)
+    assert dispatcher.run_once() == 0
+    assert smtp_server.recipients == ['one@example.com']
+    # The worker had no pooled connection checked out while talking to the server.
+    assert smtp_server.in_use_during_send and set(smtp_server.in_use_during_send) == {0}
+
+
+def test_unreachable_server_retries_every_reminder(pool):
+    with socket.socket() as listener:
+        listener.bind(('127.0.0.1', 0))
+        port = listener.getsockname()[1]
+    dispatcher = ReminderDispatcher(pool, SmtpSender('127.0.0.1', port, timeout=1),
+                                    max_attempts=3, backoff_seconds=10)
+
+    assert dispatcher.run_once() == 2
+    rows = outbox(pool).values()
+    assert [(row['status'], row['attempts']) for row in rows] == [('pending', 1)] * 2
+    assert all(row['last_error'] for row in rows)
+    assert pool.stats()['in_use'] == 0
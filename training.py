@@ -0,0 +1,252 @@
+"""
+Training pipeline for the progress model.
+
+Features come from the ``tasks`` table in one set-based query: every task
+whose outcome is known (completed, or still open past its due date) with
+its category and its assignment, due and completion dates as Julian day
+numbers, ordered by employee and assignment. Labels and the remaining
+features are whole-array NumPy operations on those columns:
+
+- ``WillDelay``: completed after the due date, or still open past it
+- ``time_spent_hours``: working hours from assignment to completion (or
+  today for open tasks), at ``HOURS_PER_DAY`` per calendar day
+- ``previous_delays``: how many of the employee's earlier tasks were
+  delayed, a per-employee running count
+
+Trees are fitted on every core (``n_jobs=-1``). ``publish`` writes each
+model as a new timestamped version with its metadata, pre-builds the
+compiled artifact the server loads, and then atomically renames a copy
+over ``MODEL_PATH``. Running ``ModelStore``s notice the new file on their
+next stat and swap it in, so there is no restart. Older versions are kept
+for rollback with ``activate``.
+"""
+import glob
+import json
+import os
+import shutil
+import time
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+from db import OPEN_TASK
+from inference import CATEGORY_FEATURE, CompiledForest, compiled_path, save_compiled
+
+HOURS_PER_DAY = 8
+FETCH_SIZE = 50000
+KEEP_VERSIONS = 5
+
+FEATURE_QUERY = f'''
+    SELECT e.id, t.category, julianday(t.assigned_date), julianday(t.due_date),
+           CASE WHEN t.status = 'Completed' THEN julianday(t.completed_date) ELSE 0 END
+    FROM tasks t
+    JOIN employees e ON e.emp_id = t.emp_id
+    WHERE julianday(t.assigned_date) IS NOT NULL
+      AND julianday(t.due_date) IS NOT NULL
+      AND ((t.status = 'Completed' AND julianday(t.completed_date) IS NOT NULL)
+           OR ({OPEN_TASK} AND t.due_date < ?))
+    ORDER BY e.id, t.assigned_date, t.id
+'''
+
+
+def fetch_outcomes(conn, today=None):
+    """
+    Column arrays (employee, category, assigned, due, completed) for tasks
+    with a known outcome, plus today's Julian day. ``completed`` is 0 for
+    open tasks.
+    """
+    today = (today or date.today()).isoformat()
+    today_jd = conn.execute("SELECT julianday(?)", (today,)).fetchone()[0]
+    cursor = conn.execute(FEATURE_QUERY, (today,))
+    parts = []
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            break
+        group, category, assigned, due, completed = zip(*rows)
+        parts.append((np.array(group, dtype=np.int64), np.array(category, dtype=object),
+                      np.array(assigned), np.array(due), np.array(completed, dtype=np.float64)))
+    if not parts:
+        parts = [(np.empty(0, dtype=np.int64), np.empty(0, dtype=object),
+                  np.empty(0), np.empty(0), np.empty(0))]
+    return tuple(np.concatenate(column) for column in zip(*parts)) + (today_jd,)
+
+
+def label_outcomes(group, assigned, due, completed, today_jd):
+    """Vectorized (time_spent_hours, previous_delays, WillDelay) for rows sorted by group."""
+    done = completed > 0
+    delayed = np.where(done, completed > due, True)
+    end = np.where(done, completed, today_jd)
+    hours = np.maximum(end - assigned, 0) * HOURS_PER_DAY
+
+    # Running count of earlier delays within each employee's rows.
+    n = len(group)
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]]) if n else np.empty(0, dtype=np.intp)
+    before = np.cumsum(delayed) - delayed
+    previous = before - np.repeat(before[starts], np.diff(np.r_[starts, n]))
+    return hours, previous.astype(np.int64), delayed.astype(np.int64)
+
+
+def label_rule(hours, previous_delays):
+    """The original synthetic rule (few hours logged or repeated delays), vectorized."""
+    return ((hours < 5) | (previous_delays > 2)).astype(np.int64)
+
+
+def synthetic_outcomes(n, seed=42):
+    """Random inputs in the shape the original progress_predictor.py generated, with rule labels."""
+    rng = np.random.RandomState(seed)
+    hours = rng.randint(1, 20, n)
+    task_types = rng.choice(['Onboarding', 'Training', 'Documentation'], n)
+    previous = rng.randint(0, 5, n)
+    return hours, task_types, previous, label_rule(hours, previous)
+
+
+def build_frame(hours, task_types, previous_delays):
+    """The model's input frame: numeric columns plus drop-first one-hot task types."""
+    import pandas as pd
+
+    frame = pd.DataFrame({
+        'time_spent_hours': hours,
+        CATEGORY_FEATURE: task_types,
+        'previous_delays': previous_delays,
+    })
+    return pd.get_dummies(frame, columns=[CATEGORY_FEATURE], drop_first=True)
+
+
+def train(frame, labels, n_estimators=100, n_jobs=-1, random_state=42, test_size=0.2):
+    """Fit a RandomForestClassifier; returns (model, metrics)."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score
+    from sklearn.model_selection import train_test_split
+
+    if len(np.unique(labels)) < 2:
+        raise ValueError("training data needs both delayed and on-track examples")
+    X_train, X_test, y_train, y_test = train_test_split(
+        frame, labels, test_size=test_size, random_state=random_state)
+    model = RandomForestClassifier(n_estimators=n_estimators, n_jobs=n_jobs, random_state=random_state)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    # Serving is single-request; do not spin up a worker pool per prediction.
+    model.set_params(n_jobs=None)
+    return model, {
+        'rows': int(len(frame)),
+        'delayed_share': round(float(np.mean(labels)), 4),
+        'fit_seconds': round(fit_seconds, 3),
+        'accuracy': round(float(accuracy_score(y_test, model.predict(X_test))), 4),
+    }
+
+
+def versions_dir(model_path):
+    return os.path.join(os.path.dirname(os.path.abspath(model_path)), 'models')
+
+
+def _version_prefix(model_path):
+    return os.path.splitext(os.path.basename(model_path))[0] + '-'
+
+
+def list_versions(model_path, directory=None):
+    """Versioned pickles for ``model_path``, oldest first."""
+    directory = directory or versions_dir(model_path)
+    return sorted(glob.glob(os.path.join(directory, _version_prefix(model_path) + '*.pkl')))
+
+
+def latest_metadata(model_path, directory=None):
+    versions = list_versions(model_path, directory)
+    if not versions:
+        return None
+    try:
+        with open(os.path.splitext(versions[-1])[0] + '.json') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def activate(version_path, model_path):
+    """
+    Make ``version_path`` the live model. A copy is staged next to
+    ``model_path`` and renamed over it, so readers see the old file or the
+    new one, never a partial write; the compiled artifact for the staged
+    file is written first, so servers pick it up without scikit-learn.
+    """
+    import joblib
+
+    staged = f"{model_path}.{os.getpid()}.tmp"
+    shutil.copy2(version_path, staged)
+    try:
+        st = os.stat(staged)
+        forest = CompiledForest.from_sklearn(joblib.load(staged))
+        # ModelStore keys the artifact on the live file's (mtime_ns, size),
+        # which the rename preserves.
+        save_compiled(forest, compiled_path(model_path), (st.st_mtime_ns, st.st_size))
+        os.replace(staged, model_path)
+    except BaseException:
+        if os.path.exists(staged):
+            os.remove(staged)
+        raise
+
+
+def publish(model, model_path, metadata, directory=None, keep=KEEP_VERSIONS):
+    """
+    Save ``model`` as a new version with ``metadata``, make it live and
+    prune all but the newest ``keep`` versions. Returns the version path.
+    """
+    import joblib
+
+    directory = directory or versions_dir(model_path)
+    os.makedirs(directory, exist_ok=True)
+    version = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+    path = os.path.join(directory, f"{_version_prefix(model_path)}{version}.pkl")
+
+    tmp = f"{path}.tmp"
+    joblib.dump(model, tmp)
+    os.replace(tmp, path)
+    with open(os.path.splitext(path)[0] + '.json', 'w') as f:
+        json.dump(dict(metadata, version=version, feature_names=list(model.feature_names_in_)), f, indent=2)
+
+    activate(path, model_path)
+
+    for old in list_versions(model_path, directory)[:-keep] if keep else ():
+        for stale in (old, os.path.splitext(old)[0] + '.json'):
+            if os.path.exists(stale):
+                os.remove(stale)
+    return path
+
+
+def data_version(conn):
+    """Combined data_versions counter of the tables features are read from."""
+    return conn.execute(
+        "SELECT COALESCE(SUM(version), 0) FROM data_versions WHERE table_name IN ('tasks', 'employees')"
+    ).fetchone()[0]
+
+
+def train_from_database(conn, model_path, n_estimators=100, n_jobs=-1, if_changed=False,
+                        directory=None, today=None):
+    """
+    Build features from the database, train and publish. With
+    ``if_changed``, skip (and return None) when tasks and employees have
+    not changed since the latest version was trained.
+    """
+    version = data_version(conn)
+    if if_changed:
+        latest = latest_metadata(model_path, directory)
+        if latest and latest.get('data_version') == version:
+            return None
+
+    timings = {}
+    start = time.perf_counter()
+    group, category, assigned, due, completed, today_jd = fetch_outcomes(conn, today)
+    timings['query_seconds'] = round(time.perf_counter() - start, 3)
+
+    start = time.perf_counter()
+    hours, previous, labels = label_outcomes(group, assigned, due, completed, today_jd)
+    frame = build_frame(hours, category, previous)
+    timings['features_seconds'] = round(time.perf_counter() - start, 3)
+
+    model, metrics = train(frame, labels, n_estimators=n_estimators, n_jobs=n_jobs)
+
+    start = time.perf_counter()
+    path = publish(model, model_path, dict(metrics, **timings, source='database', data_version=version),
+                   directory)
+    timings['publish_seconds'] = round(time.perf_counter() - start, 3)
+    return dict(metrics, **timings, path=path)